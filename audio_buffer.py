@@ -0,0 +1,103 @@
+from speech_recognition import AudioData
+
+
+class AudioRingBuffer():
+    """
+    Preallocated PCM ring buffer for accumulating an utterance chunk by chunk.
+
+    Every byte is written into the buffer twice (at ``pos`` and ``pos + capacity``)
+    so that any window of up to ``capacity`` bytes is contiguous. Appending copies
+    each chunk twice, but handing out the utterance does not copy it again: segments
+    are read-only memoryviews into the buffer.
+    A segment stays valid until its first byte has been overwritten, after that
+    reading its ``frame_data`` raises BufferError.
+    """
+
+    def __init__(self, sample_rate, sample_width, max_seconds=12, capacity_seconds=60):
+        self.sample_rate = sample_rate
+        self.sample_width = sample_width
+        frame_bytes = sample_rate * sample_width
+        self.capacity = int(capacity_seconds * frame_bytes)
+        self.max_bytes = min(int(max_seconds * frame_bytes), self.capacity)
+        # keep the window aligned to whole samples
+        self.max_bytes -= self.max_bytes % sample_width
+
+        self._buf = bytearray(self.capacity * 2)
+        self._view = memoryview(self._buf)
+        self._written = 0
+        self._start = 0
+        self.bytes_copied = 0
+
+    def __len__(self):
+        return self._written - self._start
+
+    def append(self, data):
+        """
+        Append raw PCM frames to the current utterance.
+        If the utterance grows past ``max_bytes`` the oldest audio is dropped.
+        """
+        data = memoryview(data).cast('B')
+        if len(data) > self.capacity:
+            data = data[-self.capacity:]
+
+        pos = self._written % self.capacity
+        first = min(len(data), self.capacity - pos)
+        rest = len(data) - first
+        self._view[pos:pos + first] = data[:first]
+        self._view[pos + self.capacity:pos + self.capacity + first] = data[:first]
+        if rest:
+            self._view[:rest] = data[first:]
+            self._view[self.capacity:self.capacity + rest] = data[first:]
+        self.bytes_copied += len(data) * 2
+
+        self._written += len(data)
+        if len(self) > self.max_bytes:
+            self._start = self._written - self.max_bytes
+
+    def view(self):
+        """
+        Read-only view of the current utterance, only valid until the next append.
+        """
+        pos = self._start % self.capacity
+        return self._view[pos:pos + len(self)].toreadonly()
+
+    def segment(self):
+        """
+        Current utterance as AudioData backed by a read-only view.
+        """
+        return RingSegment(self, self._start, self.view(), self.sample_rate, self.sample_width)
+
+    def overwritten(self, start):
+        """
+        Whether the byte written at position ``start`` has been overwritten since.
+        """
+        return self._written - start > self.capacity
+
+    def reset(self):
+        """
+        Start a new utterance. Previously returned segments stay readable.
+        """
+        self._start = self._written
+
+
+class RingSegment(AudioData):
+    """
+    AudioData over a window of an AudioRingBuffer. ``start`` is the buffer's
+    write count when the window began, so later reads can tell whether the
+    ring has wrapped over it.
+    """
+
+    def __init__(self, ring, start, frame_data, sample_rate, sample_width):
+        self._ring = ring
+        self._start = start
+        super().__init__(frame_data, sample_rate, sample_width)
+
+    @property
+    def frame_data(self):
+        if self._ring.overwritten(self._start):
+            raise BufferError("audio segment was overwritten by newer audio")
+        return self._frame_data
+
+    @frame_data.setter
+    def frame_data(self, frame_data):
+        self._frame_data = frame_data
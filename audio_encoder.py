@@ -0,0 +1,94 @@
+"""Audio preparation for speech recognition requests
+
+Captures are resampled to 16 kHz mono with NumPy before they are handed to
+AudioData.get_flac_data, so 44.1/48 kHz microphones upload a third of the
+bytes. Encoded segments are cached, so retries do not run ``flac`` again.
+"""
+import threading
+import weakref
+
+import numpy as np
+from speech_recognition import AudioData
+
+TARGET_RATE = 16000
+
+
+def to_int16(data, sample_width):
+    """
+    Convert signed little-endian PCM of 1 to 4 bytes per sample to an int16 array.
+    """
+    if sample_width == 1:
+        return np.frombuffer(data, dtype=np.int8).astype(np.int16) << 8
+    if sample_width == 2:
+        return np.frombuffer(data, dtype="<i2")
+    if sample_width == 3:
+        raw = np.frombuffer(data, dtype=np.uint8).reshape(-1, 3)
+        # top two bytes of each 24 bit sample
+        return (raw[:, 1].astype(np.uint16) | (raw[:, 2].astype(np.uint16) << 8)).view(np.int16)
+    if sample_width == 4:
+        return (np.frombuffer(data, dtype="<i4") >> 16).astype(np.int16)
+    raise ValueError(f"Unsupported sample width: {sample_width}")
+
+
+def resample(samples, from_rate, to_rate=TARGET_RATE):
+    """
+    Resample int16 samples by linear interpolation. When downsampling, a
+    windowed-sinc low-pass filter runs first so speech above the new Nyquist
+    frequency does not alias.
+    """
+    if from_rate == to_rate or len(samples) == 0:
+        return samples
+    x = samples.astype(np.float32)
+    if to_rate < from_rate:
+        cutoff = 0.45 * to_rate / from_rate
+        n = np.arange(-16 * (from_rate // to_rate + 1), 16 * (from_rate // to_rate + 1) + 1)
+        taps = (2 * cutoff * np.sinc(2 * cutoff * n) * np.hamming(len(n))).astype(np.float32)
+        x = np.convolve(x, taps / taps.sum(), mode="same")
+    count = int(len(x) * to_rate / from_rate)
+    positions = np.arange(count) * (from_rate / to_rate)
+    left = positions.astype(np.int64)
+    right = np.minimum(left + 1, len(x) - 1)
+    weight = (positions - left).astype(np.float32)
+    out = x[left] + weight * (x[right] - x[left])
+    return np.clip(np.rint(out), -32768, 32767).astype(np.int16)
+
+
+def prepare(audio, rate=TARGET_RATE):
+    """
+    AudioData -> int16 mono samples at ``rate``.
+    """
+    return resample(to_int16(audio.frame_data, audio.sample_width), audio.sample_rate, rate)
+
+
+class AudioEncoder():
+    """
+    Encodes AudioData segments to 16 kHz mono FLAC and keeps the result for as
+    long as the segment is alive, so retries and repeated recognitions of the
+    same segment are not encoded twice.
+    """
+
+    def __init__(self, rate=TARGET_RATE):
+        self.rate = rate
+        self.hits = 0
+        self.misses = 0
+        self._cache = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def encode(self, audio):
+        """
+        Return ``(flac_data, sample_rate)`` for an AudioData segment.
+        """
+        with self._lock:
+            flac_data = self._cache.get(audio)
+            if flac_data is not None:
+                self.hits += 1
+                return flac_data, self.rate
+            self.misses += 1
+
+        flac_data = AudioData(prepare(audio, self.rate).tobytes(), self.rate, 2).get_flac_data()
+        with self._lock:
+            self._cache[audio] = flac_data
+        return flac_data, self.rate
+
+
+encoder = AudioEncoder()
@@ -0,0 +1,105 @@
+"""Bounded hand-off between the audio thread and the processing thread
+
+The VAD emits a partial segment every second of speech, each one holding the
+whole utterance so far, plus one final segment per utterance. Only the newest
+partial matters (it drives the typing indicator), so a newer segment always
+replaces a queued partial. What happens when the queue is full of finals
+depends on the policy:
+
+    drop-stale-partials  put() waits for space, finals are never dropped
+    keep-latest-final    the oldest final is dropped, put() never waits
+    block                plain bounded FIFO, nothing is replaced or dropped
+
+With ``max_age`` segments that waited longer than that are dropped by get()
+instead of being recognized late.
+"""
+from collections import deque
+import queue
+import threading
+import time
+
+DROP_STALE_PARTIALS = "drop-stale-partials"
+KEEP_LATEST_FINAL = "keep-latest-final"
+BLOCK = "block"
+POLICIES = (DROP_STALE_PARTIALS, KEEP_LATEST_FINAL, BLOCK)
+
+
+class AudioQueue():
+    def __init__(self, maxsize=8, policy=DROP_STALE_PARTIALS, max_age=None, clock=time.monotonic):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown audio queue policy: {policy}")
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1")
+        self.maxsize = maxsize
+        self.policy = policy
+        self.max_age = max_age
+        self.clock = clock
+        self._entries = deque()
+        self._bytes = 0
+        self._cond = threading.Condition()
+        self._stats = {"put": 0, "get": 0, "superseded": 0, "overflow": 0, "expired": 0,
+                       "high_water": 0, "high_water_bytes": 0}
+
+    def put(self, audio, final, context=None):
+        """
+        Queue one VAD segment (``audio`` may be None).
+        """
+        size = len(audio.frame_data) if audio is not None else 0
+        with self._cond:
+            self._stats["put"] += 1
+            # partials only ever sit at the tail, since every put replaces them
+            if self.policy != BLOCK and self._entries and not self._entries[-1][1]:
+                self._remove(self._entries.pop(), "superseded")
+            if self.policy == KEEP_LATEST_FINAL:
+                while len(self._entries) >= self.maxsize:
+                    self._remove(self._entries.popleft(), "overflow")
+            else:
+                while len(self._entries) >= self.maxsize:
+                    self._cond.wait()
+
+            self._entries.append((audio, final, context, self.clock(), size))
+            self._bytes += size
+            if len(self._entries) > self._stats["high_water"]:
+                self._stats["high_water"] = len(self._entries)
+                print(f"[AudioQueue] New high-water mark: {len(self._entries)}/{self.maxsize} segments")
+            self._stats["high_water_bytes"] = max(self._stats["high_water_bytes"], self._bytes)
+            self._cond.notify_all()
+
+    def get(self, timeout=None):
+        """
+        Return the oldest ``(audio, final, context)`` that is not older than
+        ``max_age``. Raises queue.Empty after ``timeout`` seconds.
+        """
+        with self._cond:
+            while True:
+                if not self._cond.wait_for(lambda: self._entries, timeout):
+                    raise queue.Empty
+                entry = self._entries.popleft()
+                self._bytes -= entry[4]
+                self._cond.notify_all()
+                if self.max_age is not None and self.clock() - entry[3] > self.max_age:
+                    self._count_drop(entry, "expired")
+                    continue
+                self._stats["get"] += 1
+                return entry[:3]
+
+    def __len__(self):
+        with self._cond:
+            return len(self._entries)
+
+    def stats(self):
+        with self._cond:
+            stats = dict(self._stats)
+            stats["size"] = len(self._entries)
+            stats["bytes"] = self._bytes
+        return stats
+
+    def _remove(self, entry, reason):
+        self._bytes -= entry[4]
+        self._count_drop(entry, reason)
+
+    def _count_drop(self, entry, reason):
+        self._stats[reason] += 1
+        if reason != "superseded":
+            kind = "final" if entry[1] else "partial"
+            print(f"[AudioQueue] Dropped {kind} audio ({reason}), {self._stats[reason]} so far")
@@ -0,0 +1,65 @@
+"""Micro-benchmark for utterance accumulation
+
+Compares the old `frame_data + frame_data` concatenation in collect_audio
+against AudioRingBuffer, reporting bytes copied and time per utterance.
+
+Usage: python bench_audio_buffer.py [--seconds 10] [--utterances 200]
+"""
+import argparse
+import os
+import time
+
+from audio_buffer import AudioRingBuffer
+
+SAMPLE_RATE = 48000
+SAMPLE_WIDTH = 2
+
+
+def concat_utterance(chunks):
+    audio_buf = None
+    buf_size = 0
+    copied = 0
+    for chunk in chunks:
+        if audio_buf is None:
+            audio_buf = chunk
+        else:
+            buf_size += 1
+            if buf_size > 10:
+                audio_buf = chunk
+                buf_size = 0
+            else:
+                audio_buf = audio_buf + chunk
+                copied += len(audio_buf)
+    return copied
+
+
+def ring_utterance(buf, chunks):
+    before = buf.bytes_copied
+    for chunk in chunks:
+        buf.append(chunk)
+        buf.view()
+    buf.reset()
+    return buf.bytes_copied - before
+
+
+def run(name, fn, utterances):
+    start = time.perf_counter()
+    copied = 0
+    for _ in range(utterances):
+        copied += fn()
+    elapsed = time.perf_counter() - start
+    print(f"{name:<8} {copied / utterances / 1024:>10.1f} KiB copied/utterance  {elapsed / utterances * 1000:>8.3f} ms/utterance")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=int, default=10, help="Utterance length in 1 second chunks")
+    parser.add_argument("--utterances", type=int, default=200, help="Number of utterances to accumulate")
+    args = parser.parse_args()
+
+    chunks = [os.urandom(SAMPLE_RATE * SAMPLE_WIDTH) for _ in range(args.seconds)]
+    buf = AudioRingBuffer(SAMPLE_RATE, SAMPLE_WIDTH)
+
+    print(f"{args.seconds}s utterances, {SAMPLE_RATE} Hz, {SAMPLE_WIDTH * 8} bit")
+    run("concat", lambda: concat_utterance(chunks), args.utterances)
+    run("ring", lambda: ring_utterance(buf, chunks), args.utterances)
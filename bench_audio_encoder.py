@@ -0,0 +1,89 @@
+"""Benchmark for audio preparation before recognition
+
+Compares speech_recognition's AudioData.get_flac_data at the capture rate
+(what recognize_google sends) with audio_encoder, which resamples to 16 kHz
+with NumPy first and then uses the same ``flac`` process, cold and cached. It
+also checks that the FLAC decodes back to the resampled samples. The last
+column is encode plus upload time at ``--uplink`` Mbit/s for both paths.
+
+Usage: python bench_audio_encoder.py [--seconds 1 3 8] [--rates 16000 48000] [--wav speech.wav] [--uplink 10]
+"""
+import argparse
+import subprocess
+import time
+import wave
+
+import numpy as np
+from speech_recognition import AudioData
+from speech_recognition.audio import get_flac_converter
+
+from audio_encoder import AudioEncoder, prepare, resample
+
+
+def synthetic_speech(seconds, rate, seed=0):
+    # voiced harmonics with a syllable-rate envelope over a little noise
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * rate)) / rate
+    pitch = 140 + 30 * np.sin(2 * np.pi * 0.7 * t)
+    phase = 2 * np.pi * np.cumsum(pitch) / rate
+    voiced = sum(np.sin(h * phase) / h for h in range(1, 8))
+    envelope = np.clip(np.sin(2 * np.pi * 4 * t), 0, None)
+    return (3000 * voiced * envelope + rng.normal(0, 60, len(t))).astype(np.int16)
+
+
+def load_wav(path, seconds, rate):
+    with wave.open(path, "rb") as wav:
+        if wav.getsampwidth() != 2:
+            raise ValueError(f"{path}: only 16 bit WAV files are supported")
+        samples = np.frombuffer(wav.readframes(wav.getnframes()), dtype="<i2")
+        samples = samples.reshape(-1, wav.getnchannels()).mean(axis=1).astype(np.int16)
+        samples = resample(samples, wav.getframerate(), rate)
+    return np.resize(samples, int(seconds * rate))
+
+
+def timed(fn, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def decode(flac_data):
+    out = subprocess.run([get_flac_converter(), "-d", "-s", "-c", "--force-raw-format", "--endian=little",
+                          "--sign=signed", "-"], input=flac_data, capture_output=True, check=True)
+    return np.frombuffer(out.stdout, dtype="<i2")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, nargs="+", default=[1, 3, 8], help="Utterance lengths")
+    parser.add_argument("--rates", type=int, nargs="+", default=[16000, 44100, 48000], help="Capture sample rates")
+    parser.add_argument("--wav", help="Use this recording instead of synthetic speech")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--uplink", type=float, default=10, help="Upload bandwidth in Mbit/s")
+    args = parser.parse_args()
+
+    print(f"{'rate':>6} {'sec':>4} | {'capture rate ms':>15} {'KiB':>6} | {'16 kHz ms':>13} {'KiB':>6} | "
+          f"{'cached ms':>9} | {'+upload ms old/new':>18}")
+    for rate in args.rates:
+        for seconds in args.seconds:
+            samples = load_wav(args.wav, seconds, rate) if args.wav else synthetic_speech(seconds, rate)
+            audio = AudioData(samples.tobytes(), rate, 2)
+
+            old_time, old_data = timed(lambda: audio.get_flac_data(convert_rate=None if rate >= 8000 else 8000,
+                                                                   convert_width=2), args.repeat)
+            new_time, (new_data, _) = timed(lambda: AudioEncoder().encode(audio), args.repeat)
+            encoder = AudioEncoder()
+            encoder.encode(audio)
+            cached_time, _ = timed(lambda: encoder.encode(audio), args.repeat)
+
+            assert np.array_equal(decode(new_data), prepare(audio)), "FLAC did not round-trip"
+            old_total = old_time + len(old_data) * 8 / (args.uplink * 1e6)
+            new_total = new_time + len(new_data) * 8 / (args.uplink * 1e6)
+            print(f"{rate:>6} {seconds:>4g} | {old_time * 1000:>15.2f} {len(old_data) / 1024:>6.1f} | "
+                  f"{new_time * 1000:>13.2f} {len(new_data) / 1024:>6.1f} | {cached_time * 1000:>9.4f} | "
+                  f"{old_total * 1000:>8.0f} /{new_total * 1000:>8.0f}")
+    print("16 kHz output decodes to the resampled samples with the reference flac decoder")
@@ -0,0 +1,204 @@
+"""Continuous mode with a fake microphone: sequential loop vs SpeechPipeline
+
+A scripted microphone says ``--phrases`` numbered phrases in real time. Each
+phrase is a tone whose pitch encodes its number, so the fake recognizer can
+tell which phrase it got. Recognition takes ``--recognize-ms`` plus up to
+``--jitter-ms``, so results finish out of order, and translation takes
+``--translate-ms``.
+
+The sequential loop (the old continuous_translation_loop) recognizes and
+translates each phrase before reading the microphone again; the pipeline
+keeps capturing while earlier phrases are in flight. For both, reports how
+many phrases came out, whether they came out in speaking order and the
+latency from the end of each phrase to its chatbox output.
+
+Usage: python bench_continuous.py [--phrases 12] [--phrase-seconds 1.2] [--pause-seconds 0.6]
+"""
+import argparse
+import contextlib
+import io
+import random
+import threading
+import time
+
+import numpy as np
+
+from metrics import Metrics
+from mic_service import MicrophoneService
+from noise_floor import NoiseFloor
+from pipeline import SpeechPipeline
+from translator import BatchTranslator
+from vad import StreamingVAD, VAD_END
+
+SAMPLE_RATE = 16000
+BASE_HZ = 300
+STEP_HZ = 40
+
+
+class ScriptedMicrophone():
+    """
+    MicrophoneStream stand-in that speaks numbered phrases in real time and
+    records when each phrase ended.
+    """
+    phrases = 12
+    phrase_seconds = 1.2
+    pause_seconds = 0.6
+    phrase_ends = []
+
+    def __init__(self, sample_rate=SAMPLE_RATE, chunk_size=1024, device_index=None, on_chunk=None):
+        self.sample_rate = sample_rate
+        self.chunk_size = chunk_size
+        self.on_chunk = on_chunk
+        self._running = False
+
+    def device_name(self):
+        return "scripted microphone"
+
+    def __enter__(self):
+        self._running = True
+        threading.Thread(target=self._run, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._running = False
+
+    def _run(self):
+        rng = np.random.default_rng(0)
+        t = np.arange(int(self.phrase_seconds * self.sample_rate)) / self.sample_rate
+        pause = int(self.pause_seconds * self.sample_rate)
+        script = [rng.normal(0, 30, self.sample_rate)]
+        ends = []
+        for i in range(self.phrases):
+            script.append(3000 * np.sin(2 * np.pi * (BASE_HZ + STEP_HZ * i) * t))
+            ends.append(sum(len(part) for part in script))
+            script.append(rng.normal(0, 30, pause))
+        # silence after the script, so the microphone keeps running
+        audio = np.concatenate(script).astype("<i2").tobytes()
+        period = self.chunk_size / self.sample_rate
+        chunk_bytes = self.chunk_size * 2
+        start = next_time = time.monotonic()
+        position = 0
+        while self._running:
+            next_time += period
+            time.sleep(max(0.0, next_time - time.monotonic()))
+            data = audio[position:position + chunk_bytes]
+            if len(data) < chunk_bytes:
+                data = rng.normal(0, 30, self.chunk_size).astype("<i2").tobytes()
+            position += chunk_bytes
+            samples = position // 2
+            while ends and samples >= ends[0]:
+                ScriptedMicrophone.phrase_ends.append(start + ends.pop(0) / self.sample_rate)
+            self.on_chunk(data)
+
+
+def phrase_number(audio):
+    samples = np.frombuffer(audio.frame_data, dtype="<i2").astype(np.float32)
+    spectrum = np.abs(np.fft.rfft(samples))
+    peak = np.argmax(spectrum) * audio.sample_rate / len(samples)
+    return int(round((peak - BASE_HZ) / STEP_HZ))
+
+
+class FakeRecognizer():
+    def __init__(self, latency, jitter):
+        self.latency = latency
+        self.jitter = jitter
+        self._random = random.Random(0)
+
+    def __call__(self, audio):
+        time.sleep(self.latency + self._random.uniform(0, self.jitter))
+        return f"phrase {phrase_number(audio)}"
+
+
+class FakeTranslator():
+    def __init__(self, latency):
+        self.latency = latency
+
+    def translate_batch(self, source_lang, target_lang, texts):
+        time.sleep(self.latency)
+        return [text.upper() for text in texts]
+
+
+class RecordingChatbox():
+    def __init__(self):
+        self.outputs = []
+
+    def set_typing(self, speaking):
+        pass
+
+    def send(self, text, on_sent=None):
+        self.outputs.append((time.monotonic(), text))
+
+
+def run_sequential(service, recognizer, translator, chatbox, deadline):
+    # listen, recognize, translate, send, listen again
+    with service.subscribe() as stream:
+        vad = StreamingVAD(stream.sample_rate, hangover_ms=600, partial_ms=0)
+        while time.monotonic() < deadline:
+            chunk = stream.read()
+            if chunk is None:
+                return
+            for event in vad.process(chunk):
+                if event.kind == VAD_END:
+                    text = recognizer(event.audio)
+                    translation = translator.translate_batch("en-US", "ja-JP", [text])[0]
+                    chatbox.send(f"{translation} ({text})")
+
+
+def run_pipelined(service, recognizer, translator, chatbox, deadline):
+    pipeline = SpeechPipeline(service.subscribe, recognizer, chatbox, BatchTranslator(translator),
+                              from_lang="en-US", to_lang="ja-JP", metrics=Metrics(),
+                              vad_options={"hangover_ms": 600, "partial_ms": 0},
+                              format_output=lambda text, translation: f"{translation} ({text})",
+                              dedupe=False, send_untranslated=False)
+    pipeline.start(daemon=True)
+    time.sleep(max(0.0, deadline - time.monotonic()))
+
+
+def run(mode, args):
+    ScriptedMicrophone.phrase_ends = []
+    service = MicrophoneService(open_stream=ScriptedMicrophone, metrics=Metrics(),
+                                noise_floor=NoiseFloor(SAMPLE_RATE, path=None))
+    chatbox = RecordingChatbox()
+    script_seconds = 1 + args.phrases * (args.phrase_seconds + args.pause_seconds)
+    deadline = time.monotonic() + script_seconds + args.drain_seconds
+    target = run_sequential if mode == "sequential" else run_pipelined
+    with contextlib.redirect_stdout(io.StringIO()):
+        thread = threading.Thread(target=target, daemon=True, args=(
+            service, FakeRecognizer(args.recognize_ms / 1000, args.jitter_ms / 1000), FakeTranslator(args.translate_ms / 1000),
+            chatbox, deadline))
+        thread.start()
+        while time.monotonic() < deadline and len(chatbox.outputs) < args.phrases:
+            time.sleep(0.05)
+        service.close()
+
+    numbers = [int(text.split()[-1].rstrip(")")) for _, text in chatbox.outputs]
+    latencies = [at - ScriptedMicrophone.phrase_ends[n] for (at, _), n in zip(chatbox.outputs, numbers)
+                 if n < len(ScriptedMicrophone.phrase_ends)]
+    in_order = numbers == sorted(numbers) and len(set(numbers)) == len(numbers)
+    latencies.sort()
+    print(f"{mode:<10} {len(numbers):>3}/{args.phrases} phrases  in order: {'yes' if in_order else 'NO'}  "
+          f"latency p50 {latencies[len(latencies) // 2] * 1000 if latencies else 0:7.0f}ms  "
+          f"max {latencies[-1] * 1000 if latencies else 0:7.0f}ms")
+    return in_order and len(numbers) == args.phrases
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--phrases", type=int, default=12)
+    parser.add_argument("--phrase-seconds", type=float, default=1.2)
+    parser.add_argument("--pause-seconds", type=float, default=0.6)
+    parser.add_argument("--recognize-ms", type=float, default=1500)
+    parser.add_argument("--jitter-ms", type=float, default=1000)
+    parser.add_argument("--translate-ms", type=float, default=500)
+    parser.add_argument("--drain-seconds", type=float, default=30, help="How long to wait for results after the script")
+    args = parser.parse_args()
+
+    ScriptedMicrophone.phrases = args.phrases
+    ScriptedMicrophone.phrase_seconds = args.phrase_seconds
+    ScriptedMicrophone.pause_seconds = args.pause_seconds
+    run("sequential", args)
+    if not run("pipelined", args):
+        raise SystemExit("pipelined mode lost or reordered phrases")
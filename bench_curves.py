@@ -0,0 +1,97 @@
+"""Axis ramps: vectorized sample tables vs per-message Python math
+
+Ramps ``--axes`` axes over ``--seconds`` at ``--rate`` Hz. Once the way it
+would be done without the curve engine (compute every value in Python,
+send_message per axis per tick), once with a Ramp compiled by
+compile_sequence and replayed. Checks that both send the same bytes and
+reports the compile time and the sending CPU per tick.
+
+Usage: python bench_curves.py [--axes 3] [--seconds 10] [--rate 120] [--curve ease-in-out]
+"""
+import argparse
+import math
+import socket
+import time
+
+from pythonosc import udp_client
+
+from curves import CURVES, Ramp, compile_sequence
+from osc_sender import OSCSender
+
+AXES = ["/input/Vertical", "/input/Horizontal", "/input/LookHorizontal", "/input/LookVertical",
+        "/input/MoveHoldFB", "/input/SpinHoldLR"]
+
+
+def ease(curve, t):
+    # the same curves, one value at a time
+    if curve == "linear":
+        return t
+    if curve == "ease-in":
+        return t * t * t
+    if curve == "ease-out":
+        return 1 - (1 - t) ** 3
+    if curve == "ease-in-out":
+        return 4 * t * t * t if t < 0.5 else 1 - (-2 * t + 2) ** 3 / 2
+    return 0.5 - 0.5 * math.cos(math.pi * t)
+
+
+def per_message(client, targets, count, curve):
+    cpu = time.thread_time()
+    for i in range(1, count + 1):
+        weight = ease(curve, i / count)
+        for address, target in targets.items():
+            client.send_message(address, target * weight)
+    return time.thread_time() - cpu
+
+
+def replay(sender, steps):
+    cpu = time.thread_time()
+    for _, datagrams, _ in steps:
+        sender.send(datagrams)
+    return time.thread_time() - cpu
+
+
+def receive(sock):
+    received = []
+    while True:
+        try:
+            received.append(sock.recv(65536))
+        except BlockingIOError:
+            return received
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--axes", type=int, default=3)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--rate", type=float, default=120)
+    parser.add_argument("--curve", choices=list(CURVES), default="ease-in-out")
+    args = parser.parse_args()
+
+    targets = {address: 1.0 - 0.25 * i for i, address in enumerate(AXES[:args.axes])}
+    count = round(args.seconds * args.rate)
+
+    receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    receiver.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1 << 24)
+    receiver.bind(("127.0.0.1", 0))
+    receiver.setblocking(False)
+    port = receiver.getsockname()[1]
+
+    start = time.perf_counter()
+    # sequences loop, so start from a step that zeroes the axes; only the ramp is replayed
+    zero = (0.01, [(address, 0.0) for address in targets])
+    steps = compile_sequence([zero, Ramp(args.seconds, targets, curve=args.curve)], rate=args.rate)[1:]
+    compile_seconds = time.perf_counter() - start
+
+    old_cpu = per_message(udp_client.SimpleUDPClient("127.0.0.1", port), targets, count, args.curve)
+    time.sleep(0.1)
+    old = receive(receiver)
+    new_cpu = replay(OSCSender("127.0.0.1", port), steps)
+    time.sleep(0.1)
+    new = receive(receiver)
+
+    same = sum(a == b for a, b in zip(old, new))
+    print(f"{args.axes} axes, {count} samples at {args.rate:.0f}Hz ({args.curve}), "
+          f"{len(new)} messages, {same}/{len(old)} byte-identical to per-message sends")
+    print(f"per-message   {old_cpu / count * 1e6:7.2f}us CPU per tick")
+    print(f"Ramp table    {new_cpu / count * 1e6:7.2f}us CPU per tick, compiled once in {compile_seconds * 1000:.1f}ms")
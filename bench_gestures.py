@@ -0,0 +1,178 @@
+"""Stress test for GestureRecognizer
+
+1. Pattern phase: a random script of single toggles, double taps and triple
+   taps (with ``--tap-ms`` scaled down so it runs fast). Checks that every
+   scripted gesture is recognized once (a triple tap also runs the double
+   tap on its second toggle) and reports the delay from the toggle that
+   completed a tap to its action starting.
+2. Flood phase: several threads toggle MuteSelf as fast as they can. Reports
+   toggles/sec, the peak number of threads and scheduler entries, and how
+   many gestures were dropped because actions were still running; the same
+   flood is run through the old thread-per-toggle handler for comparison.
+
+Usage: python bench_gestures.py [--gestures 300] [--tap-ms 40] [--flood-seconds 2] [--flood-threads 4]
+"""
+import argparse
+import contextlib
+import io
+import random
+import threading
+import time
+
+from gestures import GestureRecognizer, DOUBLE_TAP, TRIPLE_TAP, HOLD
+
+SINGLE = "single"
+
+
+class PeakThreads():
+    def __init__(self, interval=0.005):
+        self.peak = threading.active_count()
+        self._running = True
+        self._thread = threading.Thread(target=self._run, args=(interval,), daemon=True)
+        self._thread.start()
+
+    def _run(self, interval):
+        while self._running:
+            self.peak = max(self.peak, threading.active_count())
+            time.sleep(interval)
+
+    def stop(self):
+        self._running = False
+        self._thread.join()
+        return self.peak
+
+
+def pattern_phase(args):
+    tap = args.tap_ms / 1000
+    started = []
+    lock = threading.Lock()
+
+    def action(gesture, at):
+        with lock:
+            started.append((gesture, time.monotonic() - at))
+        time.sleep(tap / 2)
+
+    recognizer = GestureRecognizer({DOUBLE_TAP: action, TRIPLE_TAP: action, HOLD: action},
+                                   tap_seconds=tap, hold_seconds=tap * 3, max_pending=4)
+    rng = random.Random(0)
+    script = [rng.choice([SINGLE, DOUBLE_TAP, TRIPLE_TAP]) for _ in range(args.gestures)]
+    state = True
+    recognizer.toggle(state)
+    time.sleep(tap * 2)
+    for gesture in script:
+        toggles = {SINGLE: 1, DOUBLE_TAP: 2, TRIPLE_TAP: 3}[gesture]
+        for i in range(toggles):
+            if i:
+                time.sleep(rng.uniform(0.1, 0.5) * tap)
+            state = not state
+            recognizer.toggle(state)
+        # singles are held long enough to count as a hold
+        time.sleep((4 if gesture == SINGLE else 1.5) * tap)
+    time.sleep(tap * 4)
+    recognizer.close()
+
+    expected = {DOUBLE_TAP: script.count(DOUBLE_TAP) + script.count(TRIPLE_TAP), TRIPLE_TAP: script.count(TRIPLE_TAP),
+                HOLD: script.count(SINGLE)}
+    got = {gesture: sum(1 for g, _ in started if g == gesture) for gesture in expected}
+    delays = sorted(delay for gesture, delay in started if gesture != HOLD)
+    print(f"patterns: {args.gestures} scripted, expected {expected}, recognized {got}")
+    print(f"          toggle to action p50 {delays[len(delays) // 2] * 1000:.1f}ms  "
+          f"max {delays[-1] * 1000:.1f}ms (tap window {args.tap_ms:.0f}ms)")
+    return expected == got
+
+
+def flood(toggle, seconds, threads):
+    counts = [0] * threads
+
+    def run(n):
+        state = bool(n % 2)
+        end = time.monotonic() + seconds
+        while time.monotonic() < end:
+            state = not state
+            toggle(state)
+            counts[n] += 1
+
+    workers = [threading.Thread(target=run, args=(n,)) for n in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return sum(counts)
+
+
+def flood_phase(args):
+    ran = []
+
+    def action(gesture, at):
+        ran.append(gesture)
+        time.sleep(0.05)
+
+    recognizer = GestureRecognizer({DOUBLE_TAP: action, TRIPLE_TAP: action}, tap_seconds=0.5)
+    baseline = threading.active_count()
+    peak = PeakThreads()
+    peak_entries = [0]
+
+    def toggle(state):
+        recognizer.toggle(state)
+        peak_entries[0] = max(peak_entries[0], recognizer.scheduler.pending())
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        toggles = flood(toggle, args.flood_seconds, args.flood_threads)
+        while recognizer.scheduler.pending() > 1:
+            time.sleep(0.01)
+        time.sleep(0.6)
+    threads = peak.stop() - baseline - args.flood_threads - 1
+    stats = recognizer.stats()
+    recognizer.close()
+    print(f"flood:    {toggles / args.flood_seconds:,.0f} toggles/s from {args.flood_threads} threads, "
+          f"peak {threads} extra threads, {peak_entries[0]} scheduler entries, "
+          f"{len(ran)} actions run, {stats['dropped']} gestures dropped")
+    return threads
+
+
+def old_flood_phase(args):
+    # the handler this replaced: a sleeping thread per unmute, another per double toggle
+    received = [False]
+    ran = []
+
+    def reset():
+        time.sleep(0.5)
+        received[0] = False
+
+    def action():
+        ran.append(1)
+        time.sleep(0.05)
+
+    def handle_mute(is_mute):
+        if not is_mute and not received[0]:
+            received[0] = True
+            threading.Thread(target=reset).start()
+        elif is_mute and received[0]:
+            received[0] = False
+            threading.Thread(target=action).start()
+
+    baseline = threading.active_count()
+    peak = PeakThreads()
+    seconds = min(args.flood_seconds, 0.5)
+    toggles = flood(handle_mute, seconds, args.flood_threads)
+    threads = peak.stop() - baseline - args.flood_threads - 1
+    time.sleep(0.6)
+    print(f"old:      {toggles / seconds:,.0f} toggles/s from {args.flood_threads} threads, "
+          f"peak {threads} extra threads, {len(ran)} actions run")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--gestures", type=int, default=300)
+    parser.add_argument("--tap-ms", type=float, default=40)
+    parser.add_argument("--flood-seconds", type=float, default=2)
+    parser.add_argument("--flood-threads", type=int, default=4)
+    args = parser.parse_args()
+
+    with contextlib.redirect_stdout(io.StringIO()) as log:
+        ok = pattern_phase(args)
+    print("\n".join(line for line in log.getvalue().splitlines() if not line.startswith("[Gestures]")))
+    flood_phase(args)
+    old_flood_phase(args)
+    if not ok:
+        raise SystemExit("scripted gestures were missed or misrecognized")
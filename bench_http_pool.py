@@ -0,0 +1,151 @@
+"""Connection reuse benchmark for HttpPool
+
+Starts a local stand-in for the Google speech and DeepL endpoints and sends
+the same recognition + translation sequence twice: once with a new urllib
+connection per request (the old recognize_google behaviour) and once through
+GoogleRecognizer on a shared HttpPool plus the DeepL SDK with its own
+keep-alive session. The server sleeps
+``--handshake-ms`` on every new connection to stand in for TCP+TLS setup and
+can fail a share of requests with 503 to exercise the retries.
+
+Usage: python bench_http_pool.py [--requests 30] [--handshake-ms 80] [--latency-ms 20] [--fail-rate 0.1]
+"""
+import argparse
+import json
+import random
+import statistics
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.request import Request, urlopen
+
+import deepl
+import numpy as np
+from speech_recognition import AudioData
+
+from audio_encoder import AudioEncoder
+from google_speech import GoogleRecognizer
+from http_pool import HttpPool
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        # runs once per connection, like a TCP+TLS handshake
+        time.sleep(self.server.handshake)
+        self.server.connections += 1
+        super().setup()
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        time.sleep(self.server.latency)
+        if self.server.random.random() < self.server.fail_rate:
+            return self._reply(503, b"busy", "text/plain")
+
+        if self.path.startswith("/speech-api/v2/recognize"):
+            result = {"result": [{"alternative": [{"transcript": f"{len(body)} bytes"}], "final": True}],
+                      "result_index": 0}
+            self._reply(200, b'{"result":[]}\n' + json.dumps(result).encode(), "application/json")
+        elif self.path == "/v2/translate":
+            texts = json.loads(body)["text"]
+            translations = [{"detected_source_language": "EN", "text": text[::-1], "billed_characters": len(text)}
+                            for text in texts]
+            self._reply(200, json.dumps({"translations": translations}).encode(), "application/json")
+        else:
+            self._reply(404, b"not found", "text/plain")
+
+    def _reply(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def start_server(handshake, latency, fail_rate):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    server.daemon_threads = True
+    server.handshake = handshake
+    server.latency = latency
+    server.fail_rate = fail_rate
+    server.random = random.Random(0)
+    server.connections = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def utterance(i):
+    rng = np.random.default_rng(i)
+    return AudioData(rng.normal(0, 1000, 16000).astype("<i2").tobytes(), 16000, 2)
+
+
+def run_fresh(base, flac_data, requests):
+    # new connection per request, no retries
+    times = []
+    failures = 0
+    for i in range(requests):
+        start = time.perf_counter()
+        try:
+            urlopen(Request(f"{base}/speech-api/v2/recognize?lang=en-US", data=flac_data,
+                            headers={"Content-Type": "audio/x-flac; rate=16000"}), timeout=10).read()
+            urlopen(Request(f"{base}/v2/translate", data=json.dumps({"text": [str(i)], "target_lang": "JA"}).encode(),
+                            headers={"Content-Type": "application/json"}), timeout=10).read()
+        except OSError:
+            failures += 1
+        times.append(time.perf_counter() - start)
+    return times, failures
+
+
+def run_pooled(base, requests):
+    pool = HttpPool(http2=False)
+    recognizer = GoogleRecognizer(pool=pool, encoder=AudioEncoder(), endpoint=f"{base}/speech-api/v2/recognize")
+    translator = deepl.Translator("key", server_url=base)
+    times = []
+    failures = 0
+    for i in range(requests):
+        audio = utterance(i % 4)
+        start = time.perf_counter()
+        try:
+            text = recognizer.recognize(audio)
+            translator.translate_text([text], source_lang="EN", target_lang="JA")
+        except Exception:
+            failures += 1
+        times.append(time.perf_counter() - start)
+    stats = pool.stats()
+    pool.close()
+    translator.close()
+    return times, failures, stats
+
+
+def summary(times):
+    ordered = sorted(times)
+    return (f"mean {statistics.mean(times) * 1000:6.1f}ms  p50 {ordered[len(ordered) // 2] * 1000:6.1f}ms  "
+            f"p95 {ordered[int(len(ordered) * 0.95)] * 1000:6.1f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=30, help="Recognition + translation pairs")
+    parser.add_argument("--handshake-ms", type=float, default=80, help="Server side delay per new connection")
+    parser.add_argument("--latency-ms", type=float, default=20, help="Server side delay per request")
+    parser.add_argument("--fail-rate", type=float, default=0.1, help="Share of requests answered with 503")
+    args = parser.parse_args()
+
+    server = start_server(args.handshake_ms / 1000, args.latency_ms / 1000, args.fail_rate)
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    flac_data, _ = AudioEncoder().encode(utterance(0))
+
+    fresh, fresh_failures = run_fresh(base, flac_data, args.requests)
+    fresh_connections = server.connections
+    pooled, pooled_failures, stats = run_pooled(base, args.requests)
+    pooled_connections = server.connections - fresh_connections
+
+    print(f"new connection per request: {summary(fresh)}  {fresh_connections} connections, {fresh_failures} failed")
+    print(f"HttpPool + DeepL session:  {summary(pooled)}  {pooled_connections} connections, {pooled_failures} failed")
+    print("pool stats:", stats)
+    server.shutdown()
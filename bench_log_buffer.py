@@ -0,0 +1,180 @@
+"""Hold-loop logging: after(0, _log) per line vs LogBuffer + LogView
+
+A producer thread logs lines as fast as a hold loop at its minimum interval
+would allow (``--lines-per-tick`` every ``--tick-ms``, or flat out with
+``--tick-ms 0``).
+
+- Old: one ``after(0, _log, line)`` per line. tkinter marshals calls from
+  other threads to the Tk thread and waits for them, so the sender waits
+  on a Tk thread that is busy inserting lines one at a time.
+- New: the line goes into the LogBuffer, and LogView inserts batches 10
+  times per second.
+
+Tk needs a display, so the Tk thread and the text widget are simulated:
+an insert costs ``--insert-us`` plus ``--line-us`` per line.
+
+Reports lines/sec the producer got through, how busy the Tk thread was, its
+backlog and how many lines the widget holds at the end.
+
+Usage: python bench_log_buffer.py [--seconds 2] [--tick-ms 0] [--lines-per-tick 3]
+"""
+import argparse
+import heapq
+import itertools
+import queue
+import threading
+import time
+
+from log_buffer import LogBuffer, LogView
+
+
+def busy(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+class SimulatedTk():
+    """
+    One thread serving marshalled calls and after() timers.
+    """
+
+    def __init__(self):
+        self._events = queue.Queue()
+        self._timers = []
+        self._counter = itertools.count()
+        self._cancelled = set()
+        self._running = True
+        self.busy = 0.0
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def call(self, fn, *args):
+        # like tkinter from another thread: run on the Tk thread and wait
+        done = threading.Event()
+        self._events.put((lambda: fn(*args), done))
+        done.wait()
+
+    def after(self, ms, fn, *args):
+        timer = next(self._counter)
+        heapq.heappush(self._timers, (time.monotonic() + ms / 1000, timer, lambda: fn(*args)))
+        return timer
+
+    def after_cancel(self, timer):
+        self._cancelled.add(timer)
+
+    def backlog(self):
+        return self._events.qsize() + len(self._timers)
+
+    def stop(self):
+        self._running = False
+        self._thread.join()
+
+    def _run(self):
+        while self._running:
+            if self._timers and self._timers[0][0] <= time.monotonic():
+                _, timer, fn = heapq.heappop(self._timers)
+                if timer not in self._cancelled:
+                    self._timed(fn)
+                continue
+            try:
+                fn, done = self._events.get(timeout=0.001)
+            except queue.Empty:
+                continue
+            self._timed(fn)
+            done.set()
+
+    def _timed(self, fn):
+        start = time.perf_counter()
+        fn()
+        self.busy += time.perf_counter() - start
+
+
+class SimulatedText():
+    insert_us = 60
+    line_us = 2
+
+    def __init__(self, tk):
+        self.tk = tk
+        self.lines = []
+
+    def after(self, ms, fn, *args):
+        return self.tk.after(ms, fn, *args)
+
+    def after_cancel(self, timer):
+        self.tk.after_cancel(timer)
+
+    def config(self, **options):
+        pass
+
+    def insert(self, index, text):
+        new = text.split("\n")[:-1]
+        busy((self.insert_us + self.line_us * len(new)) / 1e6)
+        self.lines.extend(new)
+
+    def delete(self, start, end):
+        if end == "end":
+            self.lines.clear()
+        else:
+            del self.lines[:int(end.split(".")[0]) - 1]
+
+    def index(self, index):
+        return f"{len(self.lines) + 1}.0"
+
+    def see(self, index):
+        pass
+
+
+def produce(seconds, tick, per_tick, log):
+    count = 0
+    end = time.monotonic() + seconds
+    while time.monotonic() < end:
+        for i in range(per_tick):
+            log(f"[Hold:Run Circle] /input/Vertical  {count}")
+            count += 1
+        if tick:
+            time.sleep(tick)
+    return count
+
+
+def old(args):
+    tk = SimulatedTk()
+    text = SimulatedText(tk)
+
+    def _log(msg):
+        text.insert("end", msg + "\n")
+
+    lines = produce(args.seconds, args.tick_ms / 1000, args.lines_per_tick,
+                    lambda line: tk.call(tk.after, 0, _log, line))
+    backlog = tk.backlog()
+    tk.stop()
+    return lines, tk.busy, backlog, len(text.lines)
+
+
+def new(args):
+    tk = SimulatedTk()
+    text = SimulatedText(tk)
+    view = LogView(text, LogBuffer(capacity=2000), max_lines=500)
+    tk.call(view.start)
+    lines = produce(args.seconds, args.tick_ms / 1000, args.lines_per_tick, view.buffer.append)
+    backlog = len(view.buffer._lines)
+    time.sleep(0.2)
+    tk.stop()
+    return lines, tk.busy, backlog, len(text.lines), view.stats()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=2)
+    parser.add_argument("--tick-ms", type=float, default=0, help="Hold interval, 0 to log flat out")
+    parser.add_argument("--lines-per-tick", type=int, default=3)
+    parser.add_argument("--insert-us", type=float, default=60, help="Simulated cost of one insert")
+    args = parser.parse_args()
+    SimulatedText.insert_us = args.insert_us
+
+    for name, result in (("after(0)", old(args)), ("LogBuffer", new(args))):
+        lines, tk_busy, backlog, kept = result[:4]
+        print(f"{name:10s} {lines / args.seconds:10,.0f} lines/s  Tk thread {tk_busy / args.seconds * 100:5.1f}% busy  "
+              f"backlog {backlog:6d}  widget holds {kept} lines")
+        if len(result) > 4:
+            print(f"           {result[4]}")
@@ -0,0 +1,119 @@
+"""Press-to-first-sample latency: new microphone per press vs MicrophoneService
+
+For every simulated push-to-talk press, measures the time until the first
+audio chunk recorded after the press arrives. Once with a new
+MicrophoneStream opened per press (what sr.Microphone did), once with a
+subscription to the shared, already open MicrophoneService. Speech starting
+at the press is lost for the whole gap when the device is opened per press;
+the service also hands out the pre-roll from before the press.
+
+Without PyAudio (or with --simulate) the device is simulated: opening it takes
+``--open-ms`` and chunks arrive in real time.
+
+Usage: python bench_mic_service.py [--presses 10] [--preroll 0.5] [--simulate --open-ms 250]
+"""
+import argparse
+import importlib.util
+import statistics
+import threading
+import time
+
+import numpy as np
+
+from metrics import Metrics
+from mic_service import MicrophoneService, FIRST_SAMPLE
+from noise_floor import NoiseFloor
+from vad import MicrophoneStream
+
+
+class SimulatedMicrophone():
+    """
+    MicrophoneStream stand-in: opening takes ``open_ms``, then noise chunks arrive in real time.
+    """
+    open_ms = 250
+
+    def __init__(self, sample_rate=16000, chunk_size=1024, device_index=None, on_chunk=None):
+        self.sample_rate = sample_rate
+        self.chunk_size = chunk_size
+        self.on_chunk = on_chunk
+        self._running = False
+
+    def device_name(self):
+        return "simulated microphone"
+
+    def __enter__(self):
+        time.sleep(self.open_ms / 1000)
+        self._running = True
+        threading.Thread(target=self._run, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._running = False
+
+    def _run(self):
+        rng = np.random.default_rng(0)
+        period = self.chunk_size / self.sample_rate
+        next_time = time.monotonic() + period
+        while self._running:
+            time.sleep(max(0.0, next_time - time.monotonic()))
+            next_time += period
+            if self._running:
+                self.on_chunk(rng.normal(0, 100, self.chunk_size).astype("<i2").tobytes())
+
+
+def per_press(open_stream, presses):
+    times = []
+    for _ in range(presses):
+        first = threading.Event()
+        press = time.monotonic()
+        stream = open_stream(on_chunk=lambda data: first.set())
+        with stream:
+            first.wait()
+            times.append(time.monotonic() - press)
+        time.sleep(0.2)
+    return times
+
+
+def shared(open_stream, presses, preroll):
+    metrics = Metrics()
+    service = MicrophoneService(open_stream=open_stream, metrics=metrics, noise_floor=NoiseFloor(16000, path=None))
+    service.start()
+    time.sleep(preroll + 0.2)
+    preroll_seconds = []
+    for _ in range(presses):
+        with service.subscribe(preroll_seconds=preroll) as stream:
+            data = stream.read()
+            preroll_seconds.append(len(data) / (service.sample_rate * service.sample_width) if preroll else 0.0)
+            stream.read()
+        time.sleep(0.2)
+    service.close()
+    summary = metrics.snapshot()[FIRST_SAMPLE]
+    return summary, statistics.mean(preroll_seconds)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--presses", type=int, default=10)
+    parser.add_argument("--preroll", type=float, default=0.5, help="Seconds of audio from before the press")
+    parser.add_argument("--simulate", action="store_true", help="Use a simulated device instead of PyAudio")
+    parser.add_argument("--open-ms", type=float, default=250, help="Device open time of the simulated device")
+    args = parser.parse_args()
+
+    open_stream = MicrophoneStream
+    if not args.simulate:
+        if importlib.util.find_spec("pyaudio") is None:
+            print("PyAudio is not installed, using a simulated device")
+            args.simulate = True
+    if args.simulate:
+        SimulatedMicrophone.open_ms = args.open_ms
+        open_stream = SimulatedMicrophone
+
+    times = sorted(per_press(open_stream, args.presses))
+    print(f"new stream per press: p50 {times[len(times) // 2] * 1000:6.1f}ms  max {times[-1] * 1000:6.1f}ms  "
+          f"speech lost after press: {statistics.mean(times) * 1000:.0f}ms")
+    summary, preroll = shared(open_stream, args.presses, args.preroll)
+    print(f"MicrophoneService:    p50 {summary['p50'] * 1000:6.1f}ms  max {summary['max'] * 1000:6.1f}ms  "
+          f"speech lost after press: 0ms, {preroll:.2f}s pre-roll from before the press")
@@ -0,0 +1,116 @@
+"""UDP flood load test for OSCReceiver
+
+A separate process floods a local port with VRChat-like avatar parameter
+messages, of which only ``--mapped-share`` go to a mapped address. The same
+flood hits pythonosc's ThreadingOSCUDPServer and then OSCReceiver. Reports
+packets/sec received, handled and dropped by the address filter, packets
+lost in the kernel buffer and the receiving process's CPU time.
+
+Usage: python bench_osc_receiver.py [--seconds 3] [--rate 20000] [--mapped-share 0.005]
+"""
+import argparse
+import multiprocessing
+import random
+import socket
+import threading
+import time
+
+from pythonosc import osc_server
+from pythonosc.dispatcher import Dispatcher
+from pythonosc.osc_message_builder import OscMessageBuilder
+
+from osc_receiver import OSCReceiver
+
+MAPPED = "/avatar/parameters/MuteSelf"
+
+
+def build_packets(mapped_share, count=1000, seed=0):
+    rng = random.Random(seed)
+    names = [f"/avatar/parameters/{name}" for name in
+             ("VelocityX", "VelocityY", "VelocityZ", "AngularY", "Grounded", "Upright", "GestureLeft",
+              "GestureRight", "GestureLeftWeight", "GestureRightWeight", "Viseme", "Voice", "InStation",
+              "Seated", "AFK", "TrackingType", "VRMode", "Earmuffs", "IsOnFriendsList", "IsLocal")]
+    packets = []
+    for _ in range(count):
+        builder = OscMessageBuilder(MAPPED if rng.random() < mapped_share else rng.choice(names))
+        builder.add_arg(rng.random())
+        packets.append(builder.build().dgram)
+    return packets
+
+
+def flood(port, packets, seconds, rate, sent):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    interval = 1 / rate if rate else 0
+    start = time.perf_counter()
+    count = 0
+    while time.perf_counter() - start < seconds:
+        sock.sendto(packets[count % len(packets)], ("127.0.0.1", port))
+        count += 1
+        if interval:
+            delay = start + count * interval - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+    sent.value = count
+
+
+def run_flood(port, args):
+    sent = multiprocessing.Value("q", 0)
+    process = multiprocessing.Process(target=flood, args=(port, build_packets(args.mapped_share),
+                                                          args.seconds, args.rate, sent))
+    cpu_start = time.process_time()
+    process.start()
+    process.join()
+    time.sleep(0.5)  # let the receiver drain its buffer
+    return sent.value, time.process_time() - cpu_start
+
+
+def bench_threading(args):
+    counts = {"handled": 0, "dropped": 0}
+    lock = threading.Lock()
+
+    def count(key):
+        with lock:
+            counts[key] += 1
+
+    dispatcher = Dispatcher()
+    dispatcher.map(MAPPED, lambda address, *values: count("handled"))
+    dispatcher.set_default_handler(lambda address, *values: count("dropped"))
+    server = osc_server.ThreadingOSCUDPServer(("127.0.0.1", 0), dispatcher)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    sent, cpu = run_flood(server.server_address[1], args)
+    server.shutdown()
+    server.server_close()
+    counts["received"] = counts["handled"] + counts["dropped"]
+    return sent, cpu, counts
+
+
+def bench_receiver(args):
+    handled = []
+    server = OSCReceiver(("127.0.0.1", 0))
+    server.map(MAPPED, lambda address, value: handled.append(value))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    sent, cpu = run_flood(server.server_address[1], args)
+    server.shutdown()
+    thread.join()
+    return sent, cpu, server.stats()
+
+
+def report(name, sent, cpu, counts, seconds):
+    lost = sent - counts["received"]
+    print(f"{name:<26} sent {sent / seconds:8.0f}/s  received {counts['received'] / seconds:8.0f}/s  "
+          f"handled {counts['handled'] / seconds:6.1f}/s  dropped {counts['dropped'] / seconds:8.0f}/s  "
+          f"lost {lost:6d} ({100 * lost / max(1, sent):4.1f}%)  CPU {cpu:5.2f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=3)
+    parser.add_argument("--rate", type=float, default=20000, help="Packets/sec to send, 0 for as fast as possible")
+    parser.add_argument("--mapped-share", type=float, default=0.005, help="Share of packets sent to a mapped address")
+    args = parser.parse_args()
+
+    report("ThreadingOSCUDPServer", *bench_threading(args), args.seconds)
+    report("OSCReceiver", *bench_receiver(args), args.seconds)
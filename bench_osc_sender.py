@@ -0,0 +1,106 @@
+"""Hold-loop send cost: SimpleUDPClient.send_message vs pre-encoded OSCSender
+
+Replays every vrc-auto action and timed sequence step as fast as possible,
+once encoding each message per tick like the old hold loop, once sending the
+datagrams compiled at startup and once as one bundle per step. Reports OSC
+messages/sec and sending-thread CPU per tick. A receiving socket checks that
+all three deliver the same messages.
+
+Usage: python bench_osc_sender.py [--seconds 1]
+"""
+import argparse
+import importlib.util
+import os
+import socket
+import time
+
+from pythonosc import udp_client
+from pythonosc.osc_bundle import OscBundle
+
+from curves import Ramp
+from osc_sender import OSCSender, compile_actions
+
+spec = importlib.util.spec_from_file_location("vrc_auto", os.path.join(os.path.dirname(__file__) or ".", "vrc-auto.py"))
+vrc_auto = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(vrc_auto)
+
+STEPS = dict(vrc_auto.ACTIONS)
+for name, steps in vrc_auto.TIMED_SEQUENCES.items():
+    for i, step in enumerate(steps):
+        # ramps are covered by bench_curves.py
+        if not isinstance(step, Ramp):
+            STEPS[f"{name} #{i + 1}"] = step[1]
+
+
+def receive_all(sock):
+    messages = []
+    while True:
+        try:
+            dgram = sock.recv(65536)
+        except BlockingIOError:
+            return messages
+        if OscBundle.dgram_is_bundle(dgram):
+            messages.extend(content.dgram for content in OscBundle(dgram))
+        else:
+            messages.append(dgram)
+
+
+def old_tick(client):
+    def tick(name):
+        for address, value in STEPS[name]:
+            client.send_message(address, value)
+    return tick
+
+
+def new_tick(sender, packets):
+    def tick(name):
+        sender.send(packets[name])
+    return tick
+
+
+def run(tick, seconds):
+    ticks = 0
+    messages = 0
+    cpu = time.thread_time()
+    end = time.perf_counter() + seconds
+    names = list(STEPS)
+    while time.perf_counter() < end:
+        for name in names:
+            tick(name)
+            messages += len(STEPS[name])
+        ticks += len(names)
+    return ticks, messages, time.thread_time() - cpu
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=1)
+    args = parser.parse_args()
+
+    receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    receiver.bind(("127.0.0.1", 0))
+    receiver.setblocking(False)
+    port = receiver.getsockname()[1]
+
+    sender = OSCSender("127.0.0.1", port)
+    modes = {
+        "send_message": old_tick(udp_client.SimpleUDPClient("127.0.0.1", port)),
+        "datagrams": new_tick(sender, compile_actions(STEPS)),
+        "bundles": new_tick(sender, compile_actions(STEPS, bundle=True)),
+    }
+
+    received = {}
+    for mode, tick in modes.items():
+        for name in STEPS:
+            tick(name)
+        time.sleep(0.05)
+        received[mode] = receive_all(receiver)
+    reference = received["send_message"]
+    for mode, messages in received.items():
+        assert messages == reference, f"{mode} sent different messages"
+
+    # not drained from here on, the kernel drops what does not fit
+    print(f"{len(STEPS)} steps, {len(reference)} messages per round, same bytes in all modes")
+    for mode, tick in modes.items():
+        ticks, messages, cpu = run(tick, args.seconds)
+        print(f"{mode:13s} {messages / args.seconds:10,.0f} msgs/s  {cpu / ticks * 1e6:6.2f}us CPU per tick")
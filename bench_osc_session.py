@@ -0,0 +1,152 @@
+"""OSC session recorder and replayer
+
+1. Records ``--records`` datagrams of VRChat-like traffic (avatar
+   parameters received, chatbox and input messages sent) and reports the
+   cost per record() and the file size.
+2. Cuts the file off in the middle of a record, like a crash would, and
+   checks that the session reopens with a rebuilt index.
+3. Replays ``--replay-seconds`` of received traffic in real time into an
+   OSCReceiver listening on a local port (MuteSelf mapped, like
+   vrc-chatbot.py), comparing arrival times with the recorded ones.
+4. Replays all received traffic as fast as possible as a load test.
+
+Usage: python bench_osc_session.py [--records 200000] [--replay-seconds 5] [--rate 200]
+"""
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from metrics import LatencyHistogram
+from osc_receiver import OSCReceiver
+from osc_sender import OSCSender, encode_message
+from osc_session import OSCRecorder, OSCSession, RECEIVED, SENT, index_path
+
+MAPPED = "/avatar/parameters/MuteSelf"
+PARAMETERS = ["VelocityX", "VelocityY", "VelocityZ", "AngularY", "Grounded", "Upright", "GestureLeft",
+              "GestureRight", "GestureLeftWeight", "GestureRightWeight", "Viseme", "Voice", "AFK"]
+
+
+def traffic(count, rate, seed=0):
+    """
+    ``count`` (ns since start, direction, datagram) at ``rate`` packets/sec.
+    """
+    rng = random.Random(seed)
+    packets = [encode_message(f"/avatar/parameters/{name}", rng.random()).dgram for name in PARAMETERS]
+    mute = [encode_message(MAPPED, value).dgram for value in (True, False)]
+    sent = [encode_message("/chatbox/typing", True).dgram,
+            encode_message("/chatbox/input", ["Hello there (Hallo)", True]).dgram,
+            encode_message("/input/Vertical", 1.0).dgram]
+    at = 0
+    for i in range(count):
+        at += int(rng.expovariate(rate) * 1e9)
+        roll = rng.random()
+        if roll < 0.01:
+            yield at, RECEIVED, mute[i % 2]
+        elif roll < 0.05:
+            yield at, SENT, rng.choice(sent)
+        else:
+            yield at, RECEIVED, rng.choice(packets)
+
+
+def record(path, args):
+    recorder = OSCRecorder(path, clock_ns=lambda: 0)
+    records = list(traffic(args.records, args.rate))
+    start = time.perf_counter()
+    for at, direction, data in records:
+        recorder.record(data, direction, at_ns=at + recorder._base)
+    seconds = time.perf_counter() - start
+    recorder.close()
+    size = os.path.getsize(path) + os.path.getsize(index_path(path))
+    print(f"record:  {len(records)} datagrams, {seconds / len(records) * 1e6:.2f}us per record(), "
+          f"{size / len(records):.1f} bytes per record with index")
+
+
+def crash(path):
+    size = os.path.getsize(path)
+    with open(path, "r+b") as f:
+        f.truncate(size - 7)
+    start = time.perf_counter()
+    session = OSCSession(path)
+    rebuilt = time.perf_counter() - start
+    count = len(session)
+    session.close()
+    recorder = OSCRecorder(path)
+    recorder.received(encode_message(MAPPED, True).dgram)
+    recorder.close()
+    start = time.perf_counter()
+    session = OSCSession(path)
+    opened = time.perf_counter() - start
+    assert len(session) == count + 1, "the appended record is missing"
+    print(f"crash:   cut mid-record, index rebuilt from {count} records in {rebuilt * 1000:.0f}ms, "
+          f"appended 1 record, reopened with the index in {opened * 1000:.1f}ms")
+    return session
+
+
+def receiver():
+    server = OSCReceiver(("127.0.0.1", 0), recv_buffer=1 << 24)
+    arrivals = []
+    server.map(MAPPED, lambda address, value: None)
+    handle = server.handle_packet
+
+    def on_packet(data):
+        arrivals.append(time.monotonic_ns())
+        handle(data)
+
+    server.handle_packet = on_packet
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    return server, arrivals, thread
+
+
+def realtime(session, seconds):
+    server, arrivals, thread = receiver()
+    sender = OSCSender(*server.server_address)
+    entries = session.select(RECEIVED, end=seconds)
+    stats = session.replay(lambda data: sender.send((data,)), end=seconds)
+    time.sleep(0.2)
+    server.shutdown()
+    thread.join()
+
+    # arrival time vs recorded time, relative to the first packet
+    recorded = (entries["time"].astype(np.int64) - int(entries["time"][0]))[:len(arrivals)]
+    arrived = np.array(arrivals, dtype=np.int64) - arrivals[0]
+    errors = LatencyHistogram()
+    for error in np.abs(arrived - recorded) / 1e9:
+        errors.record(error)
+    summary = errors.summary()
+    print(f"replay:  {stats['sent']} datagrams over {seconds:.0f}s in real time, {len(arrivals)} arrived, "
+          f"arrival vs recorded time p50 {summary['p50'] * 1e6:.0f}us  p99 {summary['p99'] * 1e6:.0f}us  "
+          f"max {summary['max'] * 1e6:.0f}us, end drift {(arrived[-1] - recorded[-1]) / 1e6:.2f}ms")
+
+
+def load(session):
+    server, arrivals, thread = receiver()
+    sender = OSCSender(*server.server_address)
+    stats = session.replay(lambda data: sender.send((data,)), speed=0)
+    time.sleep(0.5)
+    server.shutdown()
+    thread.join()
+    counts = server.stats()
+    print(f"load:    {stats['sent']} datagrams at {stats['per_second']:,.0f}/s, receiver handled {counts['handled']} "
+          f"and dropped {counts['dropped']} unmapped, {stats['sent'] - counts['received']} lost in the socket buffer")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--records", type=int, default=200000)
+    parser.add_argument("--rate", type=float, default=200, help="Packets/sec of the recorded traffic")
+    parser.add_argument("--replay-seconds", type=float, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "session.osc")
+        record(path, args)
+        session = crash(path)
+        realtime(session, args.replay_seconds)
+        load(session)
+        session.close()
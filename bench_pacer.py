@@ -0,0 +1,69 @@
+"""Achieved vs requested timing of the vrc-auto hold loop
+
+Runs thousands of steps with the old ``send; time.sleep(interval)`` loop and
+with Pacer, each step spending ``--work-ms`` on sending and logging. Steps
+alternate between the two "Large Circle" step lengths (scaled by
+``--scale`` to keep the run short). Reports the total drift from the
+requested schedule, the error of every step's length and the CPU the loop
+used. Exits non-zero if Pacer drifts by more than a millisecond.
+
+Usage: python bench_pacer.py [--steps 2000] [--scale 0.01] [--work-ms 0.3]
+"""
+import argparse
+import importlib.util
+import os
+import time
+
+from metrics import LatencyHistogram
+from pacer import Pacer
+
+spec = importlib.util.spec_from_file_location("vrc_auto", os.path.join(os.path.dirname(__file__) or ".", "vrc-auto.py"))
+vrc_auto = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(vrc_auto)
+
+
+def work(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def run(durations, work_seconds, wait):
+    errors = LatencyHistogram()
+    cpu = time.process_time()
+    start = last = time.monotonic_ns()
+    for duration in durations:
+        work(work_seconds)
+        wait(duration)
+        now = time.monotonic_ns()
+        errors.record(abs((now - last) / 1e9 - duration))
+        last = now
+    drift = (last - start) / 1e9 - sum(durations)
+    return drift, errors.summary(), time.process_time() - cpu
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--steps", type=int, default=2000)
+    parser.add_argument("--scale", type=float, default=0.01, help="Factor applied to the sequence step lengths")
+    parser.add_argument("--work-ms", type=float, default=0.3, help="Time each step spends sending")
+    args = parser.parse_args()
+
+    pattern = [duration * args.scale for duration, _ in vrc_auto.TIMED_SEQUENCES["Large Circle"]]
+    durations = [pattern[i % len(pattern)] for i in range(args.steps)]
+    print(f"{args.steps} steps of {', '.join(f'{d * 1000:.1f}ms' for d in pattern)}, "
+          f"{sum(durations):.1f}s requested")
+
+    results = {"time.sleep": run(durations, args.work_ms / 1000, time.sleep)}
+    pacer = Pacer()
+    pacer.start()
+    results["Pacer"] = run(durations, args.work_ms / 1000, pacer.wait)
+    for name, (drift, errors, cpu) in results.items():
+        print(f"{name:10s} drift {drift * 1000:8.2f}ms  step error p50 {errors['p50'] * 1e6:7.1f}us  "
+              f"p99 {errors['p99'] * 1e6:7.1f}us  max {errors['max'] * 1e6:7.1f}us  "
+              f"CPU {cpu / sum(durations) * 100:4.1f}%")
+    stats = pacer.stats()
+    print(f"Pacer lateness p50 {stats['p50'] * 1e6:.1f}us  p99 {stats['p99'] * 1e6:.1f}us  "
+          f"max {stats['max'] * 1e6:.1f}us  resyncs {stats['resyncs']}")
+    if abs(results["Pacer"][0]) > 0.001:
+        raise SystemExit("Pacer drifted from the requested schedule")
@@ -0,0 +1,274 @@
+"""Offline replay benchmark for the voice pipeline
+
+Streams a directory of 16 bit WAV files through the same SpeechPipeline that
+main.py runs, with the recognizer, translator and OSC client replaced by local
+stand-ins. Chatbox output goes over real UDP to a local OSC sink.
+Reports per-stage and end-to-end latency percentiles, utterances/sec, CPU time
+and peak memory.
+
+Latency distributions are given as const:S, uniform:A,B, normal:MU,SIGMA or
+lognormal:MEDIAN,SIGMA (all in seconds).
+
+Usage:
+  python bench_pipeline.py fixtures/                     # as fast as possible
+  python bench_pipeline.py fixtures/ --speed 1           # real time
+  python bench_pipeline.py fixtures/ --speed 4 --to-lang ja-JP --recognize-latency lognormal:0.6,0.4
+"""
+import argparse
+import contextlib
+import io
+import json
+import math
+import os
+import random
+import socket
+import threading
+import time
+
+from pythonosc import udp_client
+from pythonosc.osc_message import OscMessage
+
+from audio_queue import POLICIES, DROP_STALE_PARTIALS
+from chatbox import ChatboxScheduler
+from metrics import Metrics
+from pipeline import SpeechPipeline
+from translator import BatchTranslator
+from vad import WavStream
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def parse_latency(spec, seed=0):
+    """
+    Turn a distribution spec like "lognormal:0.5,0.3" into a function returning seconds.
+    """
+    kind, _, params = spec.partition(":")
+    values = [float(v) for v in params.split(",")] if params else []
+    rng = random.Random(seed)
+    lock = threading.Lock()
+    if kind == "const":
+        sample = lambda: values[0]
+    elif kind == "uniform":
+        sample = lambda: rng.uniform(values[0], values[1])
+    elif kind == "normal":
+        sample = lambda: rng.gauss(values[0], values[1])
+    elif kind == "lognormal":
+        sample = lambda: rng.lognormvariate(math.log(values[0]), values[1])
+    else:
+        raise argparse.ArgumentTypeError(f"Unknown latency distribution: {spec}")
+
+    def draw():
+        with lock:
+            return max(0.0, sample())
+    return draw
+
+
+class DirectoryStream():
+    """
+    Plays every WAV file in a directory back to back, separated by ``gap``
+    seconds of silence, through the MicrophoneStream interface.
+    """
+
+    def __init__(self, directory, speed=None, gap=1.0, chunk_size=1024):
+        self.paths = sorted(os.path.join(directory, name) for name in os.listdir(directory)
+                            if name.lower().endswith(".wav"))
+        if not self.paths:
+            raise ValueError(f"No WAV files in {directory}")
+        self.speed = speed
+        self.chunk_size = chunk_size
+        self.sample_width = 2
+        rates = {WavStream(path).sample_rate for path in self.paths}
+        if len(rates) != 1:
+            raise ValueError(f"All WAV files need the same sample rate, found {sorted(rates)}")
+        self.sample_rate = rates.pop()
+        self.gap = bytes(int(gap * self.sample_rate) * self.sample_width)
+        self.audio_seconds = 0.0
+
+    def device_name(self):
+        return f"{len(self.paths)} WAV files"
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+    def __iter__(self):
+        for path in self.paths:
+            with WavStream(path, self.chunk_size, realtime=self.speed is not None, speed=self.speed or 1.0) as wav:
+                for chunk in wav:
+                    self.audio_seconds += len(chunk) / (self.sample_rate * self.sample_width)
+                    yield chunk
+            for i in range(0, len(self.gap), self.chunk_size * self.sample_width):
+                chunk = self.gap[i:i + self.chunk_size * self.sample_width]
+                self.audio_seconds += len(chunk) / (self.sample_rate * self.sample_width)
+                if self.speed is not None:
+                    time.sleep(len(chunk) / (self.sample_rate * self.sample_width) / self.speed)
+                yield chunk
+
+
+class FakeRecognizer():
+    def __init__(self, latency):
+        self.latency = latency
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, audio):
+        with self._lock:
+            self.calls += 1
+            n = self.calls
+        time.sleep(self.latency())
+        seconds = len(audio.frame_data) / (audio.sample_rate * audio.sample_width)
+        return f"utterance {n} ({seconds:.1f}s)"
+
+
+class FakeTranslator():
+    def __init__(self, latency):
+        self.latency = latency
+        self.requests = 0
+
+    def translate_batch(self, source_lang, target_lang, texts):
+        self.requests += 1
+        time.sleep(self.latency())
+        return [f"<{target_lang}> {text}" for text in texts]
+
+
+class LatencyClient(udp_client.SimpleUDPClient):
+    def __init__(self, address, port, latency):
+        super().__init__(address, port)
+        self.latency = latency
+
+    def send_message(self, address, value):
+        time.sleep(self.latency())
+        super().send_message(address, value)
+
+
+class OSCSink():
+    """
+    Local UDP endpoint standing in for VRChat; counts received OSC messages per address.
+    """
+
+    def __init__(self, ip="127.0.0.1"):
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._sock.bind((ip, 0))
+        self.address = self._sock.getsockname()
+        self.counts = {}
+        self._thread = threading.Thread(target=self._run, name="OSCSink", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                data, _ = self._sock.recvfrom(65535)
+            except OSError:
+                return
+            address = OscMessage(data).address
+            self.counts[address] = self.counts.get(address, 0) + 1
+
+    def close(self):
+        self._sock.close()
+
+
+def peak_memory_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / 1024 / 1024 if os.uname().sysname == "Darwin" else peak / 1024
+
+
+def run(args):
+    metrics = Metrics()
+    recognizer = FakeRecognizer(parse_latency(args.recognize_latency, seed=1))
+    translator = FakeTranslator(parse_latency(args.translate_latency, seed=2))
+    sink = OSCSink()
+    client = LatencyClient(*sink.address, parse_latency(args.osc_latency, seed=3))
+    chatbox = ChatboxScheduler(client, min_page_seconds=args.page_seconds, max_page_seconds=args.page_seconds)
+    stream = DirectoryStream(args.directory, speed=args.speed, gap=args.gap)
+
+    pipeline = SpeechPipeline(lambda: stream, recognizer, chatbox, BatchTranslator(translator),
+                              from_lang=args.from_lang, to_lang=args.to_lang,
+                              recognize_workers=args.workers, recognize_timeout=args.recognize_timeout,
+                              metrics=metrics, audio_queue_size=args.queue_size, audio_queue_policy=args.queue_policy)
+
+    log = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+    cpu_start = time.process_time()
+    start = time.perf_counter()
+    with log:
+        threads = pipeline.start(daemon=True)
+        threads[1].join()
+        deadline = time.monotonic() + args.drain_timeout
+        while time.monotonic() < deadline:
+            delivered = metrics.snapshot().get("end_to_end", {}).get("count", 0)
+            if delivered >= recognizer.calls and not pipeline.recognition_pool.pending():
+                break
+            time.sleep(0.01)
+    elapsed = time.perf_counter() - start
+    cpu = time.process_time() - cpu_start
+    sink.close()
+
+    snapshot = metrics.snapshot()
+    delivered = snapshot.get("end_to_end", {}).get("count", 0)
+    report = {
+        "files": len(stream.paths),
+        "audio_seconds": stream.audio_seconds,
+        "wall_seconds": elapsed,
+        "utterances": recognizer.calls,
+        "delivered": delivered,
+        "utterances_per_second": delivered / elapsed if elapsed else 0.0,
+        "translation_requests": translator.requests,
+        "osc_messages": sink.counts,
+        "audio_queue": pipeline.audio_queue.stats(),
+        "cpu_seconds": cpu,
+        "cpu_percent": 100 * cpu / elapsed if elapsed else 0.0,
+        "peak_memory_mb": peak_memory_mb(),
+        "stages": snapshot,
+    }
+    return report
+
+
+def print_report(report):
+    print(f"{report['files']} files, {report['audio_seconds']:.1f}s audio in {report['wall_seconds']:.2f}s wall")
+    print(f"{report['delivered']}/{report['utterances']} utterances delivered, "
+          f"{report['utterances_per_second']:.2f} utterances/s, {report['translation_requests']} translation requests")
+    memory = report["peak_memory_mb"]
+    print(f"CPU {report['cpu_seconds']:.2f}s ({report['cpu_percent']:.1f}%), peak RSS "
+          + (f"{memory:.1f} MB" if memory is not None else "n/a"))
+    print(f"OSC sink received {report['osc_messages']}")
+    queue_stats = report["audio_queue"]
+    print(f"Audio queue high-water {queue_stats['high_water']} segments / {queue_stats['high_water_bytes'] / 1024:.0f} KB, "
+          f"dropped {queue_stats['superseded']} superseded, {queue_stats['overflow']} overflow, {queue_stats['expired']} expired")
+    print(f"{'stage':<12} {'count':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for stage, summary in report["stages"].items():
+        print(f"{stage:<12} {summary['count']:>6} {summary['p50'] * 1000:>9.1f} {summary['p95'] * 1000:>9.1f} "
+              f"{summary['p99'] * 1000:>9.1f} {summary['max'] * 1000:>9.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("directory", help="Directory of 16 bit WAV files to replay")
+    parser.add_argument("--speed", type=float, default=None, help="Playback speed relative to real time (default: unpaced)")
+    parser.add_argument("--gap", type=float, default=1.0, help="Seconds of silence between files")
+    parser.add_argument("--from-lang", default="en-US")
+    parser.add_argument("--to-lang", default="en-US")
+    parser.add_argument("--workers", type=int, default=4, help="Parallel recognition requests")
+    parser.add_argument("--recognize-timeout", type=float, default=10)
+    parser.add_argument("--queue-size", type=int, default=8, help="Audio queue size")
+    parser.add_argument("--queue-policy", choices=POLICIES, default=DROP_STALE_PARTIALS, help="Audio queue policy")
+    parser.add_argument("--recognize-latency", default="lognormal:0.5,0.3")
+    parser.add_argument("--translate-latency", default="lognormal:0.2,0.3")
+    parser.add_argument("--osc-latency", default="const:0")
+    parser.add_argument("--page-seconds", type=float, default=0.0, help="Chatbox page display time")
+    parser.add_argument("--drain-timeout", type=float, default=30, help="Seconds to wait for queued utterances after the audio ends")
+    parser.add_argument("--json", help="Also write the report to this JSON file")
+    parser.add_argument("--verbose", action="store_true", help="Show the pipeline's log output")
+    args = parser.parse_args()
+
+    report = run(args)
+    print_report(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
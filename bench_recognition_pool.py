@@ -0,0 +1,72 @@
+"""Throughput benchmark for RecognitionPool
+
+Feeds utterances to a fake recognizer with random latency, once sequentially
+(the old process_sound behaviour) and once through the pool, and checks that
+results still arrive in speaking order.
+
+Usage: python bench_recognition_pool.py [--utterances 40] [--workers 4]
+"""
+import argparse
+import random
+import threading
+import time
+
+from recognition_pool import RecognitionPool
+
+
+class FakeRecognizer():
+    def __init__(self, min_latency, max_latency, seed=0):
+        self.min_latency = min_latency
+        self.max_latency = max_latency
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def recognize(self, audio):
+        with self._lock:
+            latency = self._random.uniform(self.min_latency, self.max_latency)
+        time.sleep(latency)
+        return f"utterance {audio}"
+
+
+def run_sequential(recognizer, utterances):
+    start = time.perf_counter()
+    for i in range(utterances):
+        recognizer.recognize(i)
+    return time.perf_counter() - start
+
+
+def run_pool(recognizer, utterances, workers, timeout):
+    delivered = []
+    errors = []
+
+    def on_result(seq, text, error, context):
+        delivered.append(seq)
+        if error is not None:
+            errors.append(error)
+
+    pool = RecognitionPool(recognizer.recognize, on_result, workers=workers, timeout=timeout)
+    start = time.perf_counter()
+    for i in range(utterances):
+        pool.submit(i)
+    pool.close()
+    elapsed = time.perf_counter() - start
+
+    assert delivered == sorted(delivered), "results were delivered out of order"
+    return elapsed, len(errors)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--utterances", type=int, default=40)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--min-latency", type=float, default=0.05)
+    parser.add_argument("--max-latency", type=float, default=0.5)
+    parser.add_argument("--timeout", type=float, default=0.4, help="Per-utterance recognition timeout")
+    args = parser.parse_args()
+
+    seq_time = run_sequential(FakeRecognizer(args.min_latency, args.max_latency), args.utterances)
+    pool_time, timeouts = run_pool(FakeRecognizer(args.min_latency, args.max_latency), args.utterances,
+                                   args.workers, args.timeout)
+
+    print(f"sequential  {args.utterances / seq_time:6.2f} utterances/s  ({seq_time:.2f}s)")
+    print(f"pool x{args.workers:<4} {args.utterances / pool_time:6.2f} utterances/s  ({pool_time:.2f}s, {timeouts} timed out, in order)")
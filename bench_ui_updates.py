@@ -0,0 +1,138 @@
+"""GUI work under a chatty pipeline: direct widget.config() vs UIUpdates
+
+Worker threads report status and output as fast as they can. Direct calls
+touch the widgets once per report (from the wrong thread); through UIUpdates
+the Tk thread applies at most ``--fps`` rounds per second, each carrying the
+latest value. Reports widget updates per second, time spent on the Tk thread
+and how stale the shown text gets.
+
+Tk needs a display, so the mainloop and widgets are simulated: every
+config() costs ``--config-us`` like a relayout would.
+
+Usage: python bench_ui_updates.py [--seconds 2] [--threads 4] [--fps 20] [--config-us 200]
+"""
+import argparse
+import heapq
+import itertools
+import threading
+import time
+
+from ui_updates import UIUpdates
+
+
+class SimulatedWidget():
+    cost = 0.0002
+
+    def __init__(self):
+        self.calls = 0
+        self.busy = 0.0
+        self.value = None
+        self.threads = set()
+
+    def config(self, text=None, **options):
+        start = time.perf_counter()
+        while time.perf_counter() - start < self.cost:
+            pass
+        self.calls += 1
+        self.busy += time.perf_counter() - start
+        self.value = text
+        self.threads.add(threading.get_ident())
+
+
+class SimulatedRoot():
+    """
+    Single-threaded after() loop, like Tk's mainloop.
+    """
+
+    def __init__(self):
+        self._timers = []
+        self._counter = itertools.count()
+        self._cancelled = set()
+
+    def after(self, ms, fn):
+        timer = next(self._counter)
+        heapq.heappush(self._timers, (time.monotonic() + ms / 1000, timer, fn))
+        return timer
+
+    def after_cancel(self, timer):
+        self._cancelled.add(timer)
+
+    def mainloop(self, until, before_timer=None):
+        while time.monotonic() < until:
+            if self._timers and self._timers[0][0] <= time.monotonic():
+                _, timer, fn = heapq.heappop(self._timers)
+                if timer not in self._cancelled:
+                    if before_timer:
+                        before_timer()
+                    fn()
+            else:
+                time.sleep(0.001)
+
+
+def report(workers, seconds, update):
+    posts = [0] * workers
+    end = time.monotonic() + seconds
+
+    def run(n):
+        while time.monotonic() < end:
+            posts[n] += 1
+            update(n, f"{time.monotonic():.6f}")
+            time.sleep(0)
+
+    threads = [threading.Thread(target=run, args=(n,), daemon=True) for n in range(workers)]
+    for thread in threads:
+        thread.start()
+    return threads, posts, end
+
+
+def staleness(widgets):
+    shown = [float(w.value) for w in widgets if w.value]
+    return max(time.monotonic() - value for value in shown) if shown else 0.0
+
+
+def direct(args):
+    widgets = [SimulatedWidget(), SimulatedWidget()]
+    threads, posts, end = report(args.threads, args.seconds,
+                                 lambda n, text: widgets[n % 2].config(text=text))
+    for thread in threads:
+        thread.join()
+    return widgets, sum(posts), 0.0
+
+
+def queued(args):
+    widgets = [SimulatedWidget(), SimulatedWidget()]
+    root = SimulatedRoot()
+    ui = UIUpdates(fps=args.fps)
+    ui.attach(root)
+    stale = []
+    threads, posts, end = report(args.threads, args.seconds,
+                                 lambda n, text: ui.config(widgets[n % 2], text=text))
+    root.mainloop(end, before_timer=lambda: stale.append(staleness(widgets)))
+    for thread in threads:
+        thread.join()
+    ui.close()
+    return widgets, sum(posts), max(stale), ui.stats()
+
+
+def line(name, widgets, posts, seconds):
+    calls = sum(w.calls for w in widgets)
+    busy = sum(w.busy for w in widgets)
+    threads = len(set().union(*(w.threads for w in widgets)))
+    return (f"{name:10s} {posts / seconds:10,.0f} reports/s  {calls / seconds:8,.0f} widget updates/s  "
+            f"{busy / seconds * 100:5.1f}% busy  touched from {threads} thread(s)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=2)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--fps", type=float, default=20)
+    parser.add_argument("--config-us", type=float, default=200, help="Simulated cost of one config() call")
+    args = parser.parse_args()
+    SimulatedWidget.cost = args.config_us / 1e6
+
+    widgets, posts, _ = direct(args)
+    print(line("direct", widgets, posts, args.seconds))
+    widgets, posts, stale, stats = queued(args)
+    print(line("UIUpdates", widgets, posts, args.seconds) + f", shown text at most {stale * 1000:.0f}ms old")
+    print(f"           {stats}")
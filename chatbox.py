@@ -0,0 +1,146 @@
+"""Chatbox output scheduling
+
+ChatboxScheduler owns /chatbox/input and /chatbox/typing. Long text is split
+into numbered pages of at most 144 characters, each page stays on screen long
+enough to be read, and text that arrives while a page is showing is merged
+into the next one instead of flooding the chatbox.
+"""
+from collections import deque
+import textwrap
+import threading
+import time
+
+from rate_limiter import CHATBOX
+
+CHATBOX_WIDTH = 144
+
+
+def paginate(text, width=CHATBOX_WIDTH):
+    """
+    Split ``text`` into pages of at most ``width`` characters, numbered "(1/3)"
+    when there is more than one.
+    """
+    text = " ".join(text.split())
+    if len(text) <= width:
+        return [text] if text else []
+
+    count = len(textwrap.wrap(text, width=width))
+    # The marker length depends on the page count, so wrap until it is stable
+    while True:
+        marker_len = len(f" ({count}/{count})")
+        pages = textwrap.wrap(text, width=width - marker_len)
+        if len(pages) <= count:
+            break
+        count = len(pages)
+    return [f"{page} ({i}/{len(pages)})" for i, page in enumerate(pages, 1)]
+
+
+class ChatboxScheduler():
+    def __init__(self, client, limiter=None, width=CHATBOX_WIDTH, min_page_seconds=2.0,
+                 max_page_seconds=6.0, chars_per_second=20):
+        self.client = client
+        self.limiter = limiter
+        self.width = width
+        self.min_page_seconds = min_page_seconds
+        self.max_page_seconds = max_page_seconds
+        self.chars_per_second = chars_per_second
+
+        self._pending = []
+        self._pages = deque()
+        self._next_at = 0.0
+        self._speaking = False
+        self._typing = None
+        self._closed = False
+        self._cond = threading.Condition()
+        self._typing_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="ChatboxScheduler", daemon=True)
+        self._thread.start()
+
+    def send(self, text, on_sent=None):
+        """
+        Queue text for the chatbox. Returns immediately; ``on_sent()`` is called
+        once the first page containing the text has been sent.
+        """
+        if not text:
+            return
+        with self._cond:
+            self._pending.append((text, on_sent))
+            self._cond.notify()
+        self._update_typing()
+
+    def set_typing(self, speaking):
+        """
+        Tell the scheduler whether the user is currently speaking. The typing
+        indicator stays on while speaking or while pages are still queued.
+        """
+        with self._cond:
+            self._speaking = speaking
+        self._update_typing()
+
+    def close(self, wait=True):
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        if wait:
+            self._thread.join()
+
+    def page_seconds(self, page):
+        return min(self.max_page_seconds, max(self.min_page_seconds, len(page) / self.chars_per_second))
+
+    def _update_typing(self):
+        # _typing_lock keeps typing messages in order, _cond is not held while sending
+        with self._typing_lock:
+            with self._cond:
+                typing = self._speaking or bool(self._pending or self._pages)
+                if typing == self._typing:
+                    return
+                self._typing = typing
+            if not self._send("/chatbox/typing", typing):
+                with self._cond:
+                    self._typing = None
+
+    def _send(self, address, value):
+        try:
+            self.client.send_message(address, value)
+            return True
+        except Exception as e:
+            print(f"[Chatbox] Failed to send {address}:", e)
+            return False
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not (self._pending or self._pages or self._closed):
+                    self._cond.wait()
+                if not (self._pending or self._pages):
+                    return
+
+                # Keep the current page up; anything sent meanwhile is merged below
+                delay = self._next_at - time.monotonic()
+                if delay > 0 and not self._closed:
+                    self._cond.wait(delay)
+                    continue
+
+                if not self._pages:
+                    if len(self._pending) > 1:
+                        print("[Chatbox] Merging", len(self._pending), "messages")
+                    pages = paginate(" ".join(text for text, _ in self._pending), self.width)
+                    callbacks = [on_sent for _, on_sent in self._pending if on_sent is not None]
+                    self._pending.clear()
+                    if not pages:
+                        continue
+                    self._pages.append((pages[0], callbacks))
+                    self._pages.extend((page, []) for page in pages[1:])
+                page, callbacks = self._pages.popleft()
+
+            if self.limiter is not None:
+                delay = self.limiter.wait_until(CHATBOX) - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+            if self._send("/chatbox/input", [page, True]):
+                print("[Chatbox] Sent:", page)
+                for on_sent in callbacks:
+                    on_sent()
+            with self._cond:
+                self._next_at = time.monotonic() + self.page_seconds(page)
+            self._update_typing()
@@ -0,0 +1,87 @@
+"""Smooth axis ramps for timed sequences
+
+A Ramp step moves one or more axis inputs from their current value to a
+target over ``duration`` seconds along an easing curve, instead of jumping.
+compile_sequence() samples every ramp once at ``rate`` Hz: the curve is
+evaluated for all samples with NumPy, all axes of the ramp are interpolated
+in one broadcast, and each column is encoded with encode_floats. Playing a
+ramp is then one pre-encoded step per sample, like any other step.
+"""
+import numpy as np
+
+from osc_sender import bundle_datagrams, compile_step, encode_floats
+
+# Easing curves, mapping progress t in [0, 1] to [0, 1]
+CURVES = {
+    "linear": lambda t: t,
+    "ease-in": lambda t: t * t * t,
+    "ease-out": lambda t: 1 - (1 - t) ** 3,
+    "ease-in-out": lambda t: np.where(t < 0.5, 4 * t * t * t, 1 - (-2 * t + 2) ** 3 / 2),
+    "sine": lambda t: 0.5 - 0.5 * np.cos(np.pi * t),
+}
+
+# Shortest step a sequence plays, so a zero duration does not spin
+MIN_STEP_SECONDS = 0.01
+
+
+class Ramp():
+    def __init__(self, duration, targets, curve="ease-in-out"):
+        """
+        ``targets`` maps axis addresses to the value reached after ``duration`` seconds.
+        """
+        if curve not in CURVES:
+            raise ValueError(f"Unknown curve {curve!r}, expected one of {', '.join(CURVES)}")
+        self.duration = duration
+        self.targets = dict(targets)
+        self.curve = curve
+
+    def sample(self, start, rate):
+        """
+        Values for every axis at each of the ``rate`` Hz sample times,
+        ending exactly on the targets: an array of shape (samples, axes).
+        """
+        count = max(1, round(self.duration * rate))
+        t = np.arange(1, count + 1, dtype=np.float64) / count
+        weights = CURVES[self.curve](t)[:, None]
+        begin = np.array([start.get(address, 0.0) for address in self.targets])
+        end = np.array(list(self.targets.values()))
+        return begin + (end - begin) * weights
+
+
+def compile_sequence(steps, rate=60, bundle=False):
+    """
+    Compile (duration, [(address, value), ...]) and Ramp steps into
+    (duration, datagrams, log_lines) steps. Sequences repeat, so ramps start
+    from the values the previous pass ended with (0.0 for unset axes).
+    """
+    state = {}
+    for step in steps:
+        if isinstance(step, Ramp):
+            state.update(step.targets)
+        else:
+            state.update(step[1])
+
+    compiled = []
+    for step in steps:
+        if not isinstance(step, Ramp):
+            duration, messages = step
+            state.update(messages)
+            compiled.append((max(MIN_STEP_SECONDS, duration), compile_step(messages, bundle),
+                             [f"{address}  {value}" for address, value in messages]))
+            continue
+
+        addresses = list(step.targets)
+        table = step.sample(state, rate)
+        columns = [encode_floats(address, table[:, i]) for i, address in enumerate(addresses)]
+        interval = step.duration / len(table)
+        lines = [f"{address}  {state.get(address, 0.0)} -> {target} ({step.curve}, {step.duration}s)"
+                 for address, target in step.targets.items()]
+        for row in zip(*columns):
+            compiled.append((interval, bundle_datagrams(row, addresses, bundle), lines))
+            lines = []
+        state.update(step.targets)
+    return compiled
+
+
+def compile_sequences(sequences, rate=60, bundle=False):
+    return {name: compile_sequence(steps, rate, bundle) for name, steps in sequences.items()}
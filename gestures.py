@@ -0,0 +1,138 @@
+"""Gestures made by toggling the in-game mute
+
+VRChat only reports MuteSelf changes, so quick toggles are the only input
+the avatar gives us. A run of toggles, each within ``tap_seconds`` of the
+previous one, is a tap gesture: two toggles (unmute and mute again) are a
+double tap, three a triple tap. Taps fire on the toggle that completes them,
+without waiting to see whether more follow, so a triple tap is a double tap
+followed up by a third toggle: both actions run. A single toggle whose state
+is kept for ``hold_seconds`` is a hold, so every plain mute or unmute is one;
+``muted`` tells them apart.
+
+Toggles are handed to one Scheduler thread, which keeps all recognizer
+state, so nothing races and no thread is started per toggle. Recognized
+gestures run on a fixed executor; while ``max_pending`` of them are still
+queued or running, new ones are dropped.
+"""
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
+
+from scheduler import Scheduler
+
+DOUBLE_TAP = "double-tap"
+TRIPLE_TAP = "triple-tap"
+HOLD = "hold"
+
+TAP_COUNTS = {2: DOUBLE_TAP, 3: TRIPLE_TAP}
+
+
+class GestureRecognizer():
+    def __init__(self, actions, tap_seconds=0.5, hold_seconds=1.0, workers=2, max_pending=2,
+                 scheduler=None, clock=time.monotonic):
+        """
+        ``actions`` maps gestures to ``action(gesture, at)``, where ``at`` is
+        the clock time of the toggle that completed the gesture.
+        """
+        self.actions = dict(actions)
+        self.tap_seconds = tap_seconds
+        self.hold_seconds = hold_seconds
+        self.max_pending = max_pending
+        self.clock = clock
+        self.scheduler = scheduler or Scheduler(clock=clock, name="GestureScheduler")
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="GestureAction")
+        self._max_taps = max([count for count, gesture in TAP_COUNTS.items() if gesture in self.actions], default=0)
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._stats = {"toggles": 0, "ignored": 0, "dropped": 0, DOUBLE_TAP: 0, TRIPLE_TAP: 0, HOLD: 0}
+
+        # only touched on the scheduler thread
+        self._state = None
+        self._taps = 0
+        self._single = False
+        self._last = None
+        self._deadlines = {}
+        self._timers = {}
+
+    @property
+    def muted(self):
+        """
+        The last MuteSelf value, None before the first toggle.
+        """
+        return self._state
+
+    def toggle(self, is_mute, at=None):
+        """
+        Feed a MuteSelf value, e.g. from the OSC handler. Returns immediately.
+        """
+        at = self.clock() if at is None else at
+        self.scheduler.call_soon(self._on_toggle, bool(is_mute), at)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["pending"] = self._pending
+        return stats
+
+    def close(self, wait=True):
+        self._executor.shutdown(wait=wait)
+
+    def _on_toggle(self, is_mute, at):
+        self._stats["toggles"] += 1
+        if is_mute == self._state:
+            # repeated value, e.g. sent again after an avatar change
+            self._stats["ignored"] += 1
+            return
+        self._state = is_mute
+
+        if self._last is None or at - self._last > self.tap_seconds or self._taps >= self._max_taps:
+            self._taps = 0
+        self._taps += 1
+        self._single = self._taps == 1
+        self._last = at
+
+        if self._taps in TAP_COUNTS:
+            self._fire(TAP_COUNTS[self._taps], at)
+        if HOLD in self.actions:
+            self._arm("hold", at + self.hold_seconds)
+
+    def _arm(self, kind, deadline):
+        # one timer per kind: deadlines only move later, an early timer re-arms itself
+        self._deadlines[kind] = deadline
+        timer = self._timers.get(kind)
+        if timer is None or timer.done():
+            self._timers[kind] = self.scheduler.call_at(deadline, self._on_timer, kind)
+
+    def _on_timer(self, kind):
+        deadline = self._deadlines.get(kind)
+        if deadline is None:
+            return
+        if self.clock() < deadline:
+            self._timers[kind] = self.scheduler.call_at(deadline, self._on_timer, kind)
+            return
+        del self._deadlines[kind]
+        if kind == "hold" and self._single:
+            self._fire(HOLD, self._last)
+
+    def _fire(self, gesture, at):
+        action = self.actions.get(gesture)
+        if action is None:
+            return
+        with self._lock:
+            self._stats[gesture] += 1
+            if self._pending >= self.max_pending:
+                self._stats["dropped"] += 1
+                print(f"[Gestures] Dropped {gesture}, {self._pending} actions still running")
+                return
+            self._pending += 1
+        print(f"[Gestures] Recognized {gesture}")
+        self._executor.submit(self._run, action, gesture, at)
+
+    def _run(self, action, gesture, at):
+        try:
+            action(gesture, at)
+        except Exception as e:
+            print(f"[Gestures] Action for {gesture} failed!", e)
+        finally:
+            with self._lock:
+                self._pending -= 1
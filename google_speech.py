@@ -0,0 +1,48 @@
+"""Google Speech Recognition over the shared connection pool
+
+Same request and response handling as ``Recognizer.recognize_google``, but the
+audio is resampled to 16 kHz and cached by audio_encoder, and requests go over
+the shared keep-alive connection pool instead of a new urllib connection each
+time.
+"""
+import httpx
+from speech_recognition import RequestError
+from speech_recognition.recognizers import google
+
+from audio_encoder import encoder as default_encoder
+from http_pool import pool as default_pool
+
+ENDPOINT = "https://www.google.com/speech-api/v2/recognize"
+
+
+class GoogleRecognizer():
+    def __init__(self, language="en-US", key=None, pfilter=0, timeout=None, encoder=default_encoder,
+                 pool=default_pool, endpoint=ENDPOINT):
+        self.language = language
+        self.key = key
+        self.pfilter = pfilter
+        self.timeout = timeout
+        self.encoder = encoder
+        self.pool = pool
+        self.endpoint = endpoint
+
+    def recognize(self, audio, language=None, show_all=False):
+        """
+        Drop-in for ``Recognizer.recognize_google(audio, language=...)``.
+        Raises UnknownValueError and RequestError like speech_recognition does.
+        """
+        builder = google.create_request_builder(endpoint=self.endpoint, key=self.key,
+                                                language=language or self.language, filter_level=self.pfilter)
+        flac_data, rate = self.encoder.encode(audio)
+        try:
+            response = self.pool.post(builder.build_url(), content=flac_data, timeout=self.timeout,
+                                      headers={"Content-Type": f"audio/x-flac; rate={rate}"})
+        except httpx.TimeoutException as e:
+            raise TimeoutError(f"recognition request timed out: {e!r}")
+        except httpx.HTTPError as e:
+            raise RequestError(f"recognition connection failed: {e!r}")
+        if response.is_error:
+            raise RequestError(f"recognition request failed: {response.reason_phrase}")
+        return google.OutputParser(show_all=show_all, with_confidence=False).parse(response.text)
+
+    __call__ = recognize
@@ -0,0 +1,113 @@
+"""Shared keep-alive HTTP client for the speech recognition API
+
+One httpx client with a connection pool (HTTP/2 when h2 is installed), so
+consecutive utterances reuse the TCP+TLS connection instead of paying the
+handshake every time. Failed requests are retried with jittered exponential
+backoff, and every request records whether it opened a new connection.
+"""
+import importlib.util
+import random
+import threading
+import time
+
+import httpx
+
+HTTP2 = importlib.util.find_spec("h2") is not None
+
+RETRY_STATUS = (429, 500, 502, 503, 504)
+
+
+class HttpPool():
+    def __init__(self, http2=HTTP2, max_connections=10, max_keepalive=5, keepalive_expiry=90,
+                 connect_timeout=3.0, read_timeout=10.0, retries=2, backoff=0.2, max_backoff=2.0):
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeout = httpx.Timeout(read_timeout, connect=connect_timeout, pool=connect_timeout)
+        self._client = httpx.Client(
+            http2=http2,
+            timeout=self.timeout,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_keepalive,
+                                keepalive_expiry=keepalive_expiry),
+        )
+        self._random = random.Random()
+        self._lock = threading.Lock()
+        self._stats = {"requests": 0, "new_connections": 0, "reused_connections": 0, "retries": 0,
+                       "errors": 0, "http/1.1": 0, "http/2": 0}
+
+    def request(self, method, url, timeout=None, **kwargs):
+        """
+        Like ``httpx.Client.request`` with retries. ``timeout`` is the read
+        timeout in seconds. Raises httpx.HTTPError once the retries are used
+        up; responses with other error statuses are returned as they are.
+        """
+        if timeout is not None:
+            kwargs["timeout"] = httpx.Timeout(timeout, connect=self.timeout.connect, pool=self.timeout.pool)
+        for attempt in range(self.retries + 1):
+            connected = []
+            extensions = {"trace": lambda event, info: connected.append(event)
+                          if event == "connection.connect_tcp.complete" else None}
+            try:
+                response = self._client.request(method, url, extensions=extensions, **kwargs)
+            except (httpx.TransportError, httpx.TimeoutException) as e:
+                self._count(connected, None, error=True)
+                if attempt == self.retries:
+                    raise
+                print(f"[HttpPool] {method} {_redact(url)} failed ({e!r}), retrying...")
+                self._sleep(attempt, None)
+                continue
+
+            self._count(connected, response)
+            if response.status_code not in RETRY_STATUS or attempt == self.retries:
+                return response
+            print(f"[HttpPool] {method} {_redact(url)} returned {response.status_code}, retrying...")
+            self._sleep(attempt, response.headers.get("Retry-After"))
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        total = stats["new_connections"] + stats["reused_connections"]
+        stats["reuse_ratio"] = stats["reused_connections"] / total if total else 0.0
+        return stats
+
+    def close(self):
+        self._client.close()
+
+    def _count(self, connected, response, error=False):
+        with self._lock:
+            self._stats["requests"] += 1
+            if connected:
+                self._stats["new_connections"] += 1
+            elif not error:
+                self._stats["reused_connections"] += 1
+            if error:
+                self._stats["errors"] += 1
+            else:
+                version = "http/2" if response.http_version == "HTTP/2" else "http/1.1"
+                self._stats[version] += 1
+
+    def _sleep(self, attempt, retry_after):
+        # Full jitter, so clients that failed together do not retry together
+        delay = self._random.uniform(0, min(self.max_backoff, self.backoff * (2 ** attempt)))
+        if retry_after is not None:
+            try:
+                delay = max(delay, min(self.max_backoff, float(retry_after)))
+            except ValueError:
+                pass
+        with self._lock:
+            self._stats["retries"] += 1
+        time.sleep(delay)
+
+
+def _redact(url):
+    # query strings carry API keys
+    return str(url).split("?")[0]
+
+
+pool = HttpPool()
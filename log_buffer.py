@@ -0,0 +1,101 @@
+"""Bounded log lines for a Tk text widget
+
+Posting every log line to the Tk event queue with ``after(0, ...)`` costs
+one event, one insert and one scroll per line. A hold loop can produce lines
+faster than Tk renders them, and the widget keeps every line forever.
+Writers append to a LogBuffer instead: a deque with a fixed capacity whose
+append and popleft are atomic, so neither side takes a lock and the oldest
+lines are dropped once it is full. LogView moves what has accumulated into
+the widget with a single insert at most ``fps`` times per second, and trims
+the widget to ``max_lines``.
+"""
+from collections import deque
+import itertools
+
+
+class LogBuffer():
+    def __init__(self, capacity=1000):
+        self.capacity = capacity
+        self._lines = deque(maxlen=capacity)
+        self._seq = itertools.count(1)
+        self._last = 0
+
+    def append(self, line):
+        """
+        Add a line, from any thread. Never blocks.
+        """
+        self._lines.append((next(self._seq), line))
+
+    def take(self):
+        """
+        Remove and return the buffered lines and how many were dropped
+        since the last take(). Call from one consumer thread only.
+        """
+        popleft = self._lines.popleft
+        taken = [popleft() for _ in range(len(self._lines))]
+        if not taken:
+            return [], 0
+        # lines pushed out of the full deque leave gaps in the sequence numbers
+        last = max(seq for seq, _ in taken)
+        dropped = max(0, last - self._last - len(taken))
+        self._last = max(self._last, last)
+        return [line for _, line in taken], dropped
+
+    def clear(self):
+        self.take()
+
+
+class LogView():
+    def __init__(self, widget, buffer, max_lines=500, fps=10):
+        self.widget = widget
+        self.buffer = buffer
+        self.max_lines = max_lines
+        self.interval_ms = max(1, int(1000 / fps))
+        self._after = None
+        self._stats = {"flushes": 0, "lines": 0, "dropped": 0, "trimmed": 0}
+
+    def start(self):
+        """
+        Flush periodically on the widget's mainloop. Call from the Tk thread.
+        """
+        self._after = self.widget.after(self.interval_ms, self._tick)
+
+    def stop(self):
+        if self._after is not None:
+            self.widget.after_cancel(self._after)
+            self._after = None
+
+    def clear(self):
+        self.buffer.clear()
+        self.widget.config(state="normal")
+        self.widget.delete("1.0", "end")
+        self.widget.config(state="disabled")
+
+    def flush(self):
+        lines, dropped = self.buffer.take()
+        if not lines:
+            return
+        if dropped:
+            lines.insert(0, f"... {dropped} lines dropped")
+        text = "\n".join(lines[-self.max_lines:]) + "\n"
+
+        self.widget.config(state="normal")
+        self.widget.insert("end", text)
+        count = int(self.widget.index("end-1c").split(".")[0]) - 1
+        if count > self.max_lines:
+            self.widget.delete("1.0", f"{count - self.max_lines + 1}.0")
+            self._stats["trimmed"] += count - self.max_lines
+        self.widget.see("end")
+        self.widget.config(state="disabled")
+        self._stats["flushes"] += 1
+        self._stats["lines"] += len(lines)
+        self._stats["dropped"] += dropped
+
+    def stats(self):
+        return dict(self._stats)
+
+    def _tick(self):
+        try:
+            self.flush()
+        finally:
+            self._after = self.widget.after(self.interval_ms, self._tick)
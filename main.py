@@ -3,91 +3,33 @@
 This program listens to several addresses, and prints some information about
 received packets.
 """
-from speech_recognition import UnknownValueError, WaitTimeoutError, AudioData
-import speech_recognition as sr
-import queue
-import threading
-import datetime
+from speech_recognition import UnknownValueError
+import asyncio
+import atexit
 import os
 import time
-import textwrap
-from translator import DeepLTranslator
+from translator import DeepLTranslator, BatchTranslator
+from google_speech import GoogleRecognizer
+from pipeline import SpeechPipeline
+from audio_queue import POLICIES, KEEP_LATEST_FINAL
+from rate_limiter import limiter, RECOGNITION_API
+from chatbox import ChatboxScheduler
+from vad import StreamingVAD, VAD_START, VAD_END
+from mic_service import microphone
+from metrics import (metrics, CAPTURE_START, SPEECH_END, RECOGNIZE_REQUEST, RECOGNIZE_RESPONSE,
+                     TRANSLATE_REQUEST, TRANSLATE_RESPONSE, READY, OSC_SEND)
 import argparse
 from dotenv import load_dotenv
 
 
-from pythonosc.dispatcher import Dispatcher
-from pythonosc import osc_server, udp_client
+from pythonosc import udp_client
+from osc_receiver import OSCReceiver
+from osc_session import OSCRecorder, RecordingClient
 
 load_dotenv()
-state = {'selfMuted': True}
-state_lock = threading.Lock()
 
-r = sr.Recognizer()
-audio_queue = queue.Queue()
+r = GoogleRecognizer()
 translator = DeepLTranslator(os.getenv('DEEPL_API'))
-rate_limit = 2000  # milliseconds
-
-'''
-STATE MANAGEMENT
-This should be thread safe
-'''
-
-
-def get_state(key):
-    global state, state_lock
-    state_lock.acquire()
-    result = None
-    if key in state:
-        result = state[key]
-    state_lock.release()
-    return result
-
-
-def set_state(key, value):
-    global state, state_lock
-    state_lock.acquire()
-    state[key] = value
-    state_lock.release()
-
-
-'''
-AUDIO COLLECTION THREAD
-'''
-
-
-def collect_audio():
-    global audio_queue, r, config
-    mic = sr.Microphone()
-    print("[AudioThread] Starting audio collection!")
-    did = mic.get_pyaudio().PyAudio().get_default_input_device_info()
-    print("[AudioThread] Using", did.get('name'), "as Microphone!")
-    with mic as source:
-        audio_buf = None
-        buf_size = 0
-        while True:
-            audio = None
-            try:
-                audio = r.listen(source, phrase_time_limit=1, timeout=0.1)
-            except WaitTimeoutError:
-                if audio_buf is not None:
-                    audio_queue.put((audio_buf, True))
-                    audio_buf = None
-                    buf_size = 0
-                continue
-
-            if audio is not None:
-                if audio_buf is None:
-                    audio_buf = audio
-                else:
-                    buf_size += 1
-                    if buf_size > 10:
-                        audio_buf = audio
-                        buf_size = 0
-                    else:
-                        audio_buf = AudioData(audio_buf.frame_data + audio.frame_data, audio.sample_rate, audio.sample_width)
-
-                audio_queue.put((audio_buf, False))
 
 
 if __name__ == "__main__":
@@ -99,87 +41,36 @@ if __name__ == "__main__":
 
     parser.add_argument("--from-lang", default="en-US", help="The language to translate from")
     parser.add_argument("--to-lang", default="en-US", help="The language to translate to")
+    parser.add_argument("--recognize-workers", type=int, default=4, help="Number of parallel speech recognition requests")
+    parser.add_argument("--recognize-timeout", type=float, default=10, help="Seconds before a recognition request is given up")
+    parser.add_argument("--audio-queue-size", type=int, default=8, help="Maximum audio segments waiting for recognition")
+    parser.add_argument("--audio-queue-policy", choices=POLICIES, default=KEEP_LATEST_FINAL,
+                        help="What to do when the audio queue is full")
+    parser.add_argument("--audio-max-age", type=float, default=15, help="Seconds after which queued audio is dropped instead of recognized")
+    parser.add_argument("--async", dest="use_async", action="store_true", help="Run the pipeline on a single asyncio event loop")
+    parser.add_argument("--metrics-json", help="Periodically write per-stage latency percentiles to this JSON file")
+    parser.add_argument("--metrics-prom", help="Periodically write per-stage latency metrics to this Prometheus text file")
+    parser.add_argument("--metrics-interval", type=float, default=10, help="Seconds between metrics exports")
+    parser.add_argument("--osc-stats", type=float, default=None, help="Print received OSC packets/sec every this many seconds")
+    parser.add_argument("--record-osc", help="Append all OSC packets sent and received to this session file, see osc_session.py")
 
     args = parser.parse_args()
 
+    metrics.start_export(args.metrics_json, args.metrics_prom, args.metrics_interval)
     client = udp_client.SimpleUDPClient(args.send_ip, args.send_port)
+    recorder = None
+    if args.record_osc:
+        recorder = OSCRecorder(args.record_osc)
+        atexit.register(recorder.close)
+        client = RecordingClient(client, recorder)
+    chatbox = ChatboxScheduler(client, limiter=limiter)
 
-    def process_sound():
-        global audio_queue, r, config, methods
-        current_text = ""
-        last_text = ""
-        last_disp_time = datetime.datetime.now()
-
-        print("[ProcessThread] Starting audio processing!")
-        while True:
-            ad, final = audio_queue.get()
-
-            if not get_state("selfMuted"):
-                return
-
-            print("[ProcessThread] Received audio data, final:", final)
-            client.send_message("/chatbox/typing", (not final))
-            text = None
-
-            time_now = datetime.datetime.now()
-            difference = time_now - last_disp_time
-            # if difference.total_seconds() < 1 and not final:
-            if not final:
-                print("[ProcessThread] Not enough time passed since last message, skipping!")
-                continue
-
-            try:
-                text = r.recognize_google(ad)
-                print("[ProcessThread] Recognized text:", text)
-            except UnknownValueError:
-                print("[ProcessThread] Could not understand audio!")
-                continue
-            except TimeoutError:
-                print("[ProcessThread] Timeout Error when recognizing speech!")
-                continue
-            except Exception as e:
-                print("[ProcessThread] Exception!", e)
-                continue
-
-            if text is None or text == "":
-                print("[ProcessThread] No text recognized!")
-                continue
-
-            current_text = text
-
-            if last_text == current_text:
-                print("[ProcessThread] Text is the same as last time, skipping!")
-                continue
-
-            last_text = current_text
-
-            if args.from_lang.lower() != args.to_lang.lower():
-                print("[ProcessThread] Translating text:", current_text)
-                diff_in_milliseconds = difference.total_seconds() * 1000
-                if diff_in_milliseconds < rate_limit:
-                    ms_to_sleep = rate_limit - diff_in_milliseconds
-                    print("[ProcessThread] Sending too many messages! Delaying by", (ms_to_sleep / 1000.0), "sec to not hit rate limit!")
-                    time.sleep(ms_to_sleep / 1000.0)
-
-                try:
-                    trans = translator.translate(source_lang=args.from_lang, target_lang=args.to_lang, text=current_text)
-                    origin = current_text
-                    current_text = trans + " [%s->%s]" % (args.from_lang, args.to_lang)
-                    print("[ProcessThread] Recognized:",origin, "->", current_text)
-                except Exception as e:
-                    print("[ProcessThread] Translating ran into an error!", e)
-            else:
-                print("[ProcessThread] Recognized:", current_text)
-
-            if len(current_text) > 144:
-                current_text = textwrap.wrap(current_text, width=144)[-1]
-
-            last_disp_time = datetime.datetime.now()
-            client.send_message("/chatbox/input", [current_text, True])
+    batch_translator = BatchTranslator(translator, limiter=limiter)
+    r.timeout = args.recognize_timeout
 
     def handle_mute(url, is_mute):
         print(f"Received {url}: {is_mute}")
-        set_state("selfMuted", is_mute)
+        pipeline.set_active(is_mute)
 
         # if emote_id == 2:
         #   client.send_message("/input/Vertical", 1)
@@ -189,18 +80,154 @@ if __name__ == "__main__":
         #   print("Sending Vertical -1")
         # client.send_message("/input/Vertical", 0)
 
-    dispatcher = Dispatcher()
-    dispatcher.map("/avatar/parameters/MuteSelf", handle_mute)
-
-    pst = threading.Thread(target=process_sound)
-    pst.start()
-
-    cat = threading.Thread(target=collect_audio)
-    cat.start()
-
-    server = osc_server.ThreadingOSCUDPServer((args.ip, args.port), dispatcher)
-    print("Serving on {}".format(server.server_address))
-    server.serve_forever()
-
-    pst.join()
-    cat.join()
+    async def run_async():
+        """
+        Single event loop replacement for the capture/process/result/output threads.
+        Utterances are recognized as concurrent tasks and delivered in speaking order;
+        like RecognitionPool, at most ``--recognize-workers`` requests run at once and
+        each starts at the next RECOGNITION_API slot.
+        Switching capture off through MuteSelf pauses the microphone and cancels
+        everything still in flight.
+        """
+        loop = asyncio.get_running_loop()
+        chunks = asyncio.Queue()
+        recognized = asyncio.Queue()
+        translated = asyncio.Queue()
+        inflight = set()
+        recognize_slots = asyncio.Semaphore(args.recognize_workers)
+        active = asyncio.Event()
+        active.set()
+        stream = None
+
+        def track(awaitable):
+            task = asyncio.ensure_future(awaitable)
+            inflight.add(task)
+            task.add_done_callback(inflight.discard)
+            return task
+
+        def handle_mute_async(url, is_mute):
+            print(f"Received {url}: {is_mute}")
+            if is_mute:
+                active.set()
+                if stream is not None:
+                    stream.resume()
+                return
+            active.clear()
+            if stream is not None:
+                stream.pause()
+            for task in list(inflight):
+                task.cancel()
+            print("[Async] Capture inactive, cancelled", len(inflight), "pending tasks")
+
+        async def recognize_async(audio, trace):
+            async with recognize_slots:
+                delay = limiter.wait_until(RECOGNITION_API) - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                with trace.span(RECOGNIZE_REQUEST, RECOGNIZE_RESPONSE):
+                    return await asyncio.wait_for(asyncio.to_thread(r.recognize, audio), args.recognize_timeout)
+
+        async def result_loop():
+            last_text = ""
+            while True:
+                seq, task, trace = await recognized.get()
+                try:
+                    text = await task
+                except asyncio.CancelledError:
+                    if not task.cancelled():
+                        raise
+                    continue
+                except UnknownValueError:
+                    print("[Async] Could not understand audio", seq, "!")
+                    continue
+                except TimeoutError:
+                    print("[Async] Timeout Error when recognizing speech", seq, "!")
+                    continue
+                except Exception as e:
+                    print("[Async] Exception!", e)
+                    continue
+
+                print("[Async] Recognized text", seq, ":", text)
+                if not text or text == last_text:
+                    continue
+                last_text = text
+
+                future = None
+                if args.from_lang.lower() != args.to_lang.lower():
+                    trace.mark(TRANSLATE_REQUEST)
+                    future = track(asyncio.wrap_future(
+                        batch_translator.submit(source_lang=args.from_lang, target_lang=args.to_lang, text=text)))
+                    future.add_done_callback(lambda _, trace=trace: trace.mark(TRANSLATE_RESPONSE))
+                await translated.put((text, future, trace))
+
+        async def output_loop():
+            while True:
+                current_text, future, trace = await translated.get()
+                if future is not None:
+                    try:
+                        trans = await future
+                        current_text = trans + " [%s->%s]" % (args.from_lang, args.to_lang)
+                    except asyncio.CancelledError:
+                        if not future.cancelled():
+                            raise
+                        continue
+                    except Exception as e:
+                        print("[Async] Translating ran into an error!", e)
+                print("[Async] Recognized:", current_text)
+
+                trace.mark(READY)
+                chatbox.send(current_text, on_sent=lambda trace=trace: trace.mark(OSC_SEND))
+
+        server = OSCReceiver((args.ip, args.port), stats_interval=args.osc_stats, recorder=recorder)
+        server.map("/avatar/parameters/MuteSelf", handle_mute_async)
+        transport, _ = await server.create_serve_endpoint()
+        print("Serving on {}".format(server.server_address))
+
+        workers = [asyncio.create_task(result_loop()), asyncio.create_task(output_loop())]
+        seq = 0
+        try:
+            with microphone.subscribe(on_chunk=lambda data: loop.call_soon_threadsafe(chunks.put_nowait, data)) as stream:
+                print("[Async] Using", stream.device_name(), "as Microphone!")
+                vad = StreamingVAD(stream.sample_rate, noise_floor=stream.noise_floor)
+                trace = None
+                while True:
+                    chunk = await chunks.get()
+                    if not active.is_set():
+                        if vad.active:
+                            chatbox.set_typing(False)
+                        vad.reset()
+                        continue
+
+                    for event in vad.process(chunk):
+                        if event.kind == VAD_START:
+                            trace = metrics.trace().mark(CAPTURE_START)
+                            chatbox.set_typing(True)
+                        elif event.kind == VAD_END:
+                            trace.mark(SPEECH_END)
+                            chatbox.set_typing(False)
+                            await recognized.put((seq, track(recognize_async(event.audio, trace)), trace))
+                            seq += 1
+        finally:
+            for task in workers:
+                task.cancel()
+            transport.close()
+
+    if args.use_async:
+        asyncio.run(run_async())
+    else:
+        pipeline = SpeechPipeline(microphone.subscribe, r.recognize, chatbox, batch_translator,
+                                  from_lang=args.from_lang, to_lang=args.to_lang,
+                                  recognize_workers=args.recognize_workers, recognize_timeout=args.recognize_timeout,
+                                  limiter=limiter, audio_queue_size=args.audio_queue_size,
+                                  audio_queue_policy=args.audio_queue_policy, audio_max_age=args.audio_max_age)
+
+        server = OSCReceiver((args.ip, args.port), stats_interval=args.osc_stats, recorder=recorder)
+        server.map("/avatar/parameters/MuteSelf", handle_mute)
+
+        threads = pipeline.start()
+
+        print("Serving on {}".format(server.server_address))
+        server.serve_forever()
+
+        for thread in threads:
+            thread.join()
@@ -0,0 +1,194 @@
+"""Per-stage latency instrumentation for the speech-to-chatbox pipeline
+
+Every utterance gets a Trace that collects monotonic timestamps at fixed
+points (capture start, VAD end, recognition and translation request/response,
+OSC send). Whenever both ends of a stage are known its duration goes into an
+HDR-style histogram, which can be exported as a JSON snapshot or a
+Prometheus text file.
+"""
+from collections import Counter
+from contextlib import contextmanager
+import json
+import os
+import threading
+import time
+
+CAPTURE_START = "capture_start"
+SPEECH_END = "vad_end"
+RECOGNIZE_REQUEST = "recognize_request"
+RECOGNIZE_RESPONSE = "recognize_response"
+TRANSLATE_REQUEST = "translate_request"
+TRANSLATE_RESPONSE = "translate_response"
+READY = "ready"
+OSC_SEND = "osc_send"
+
+# (stage, start mark, end mark)
+STAGES = [
+    ("capture", CAPTURE_START, SPEECH_END),
+    ("queue", SPEECH_END, RECOGNIZE_REQUEST),
+    ("recognition", RECOGNIZE_REQUEST, RECOGNIZE_RESPONSE),
+    ("translation", TRANSLATE_REQUEST, TRANSLATE_RESPONSE),
+    ("output", READY, OSC_SEND),
+    ("end_to_end", SPEECH_END, OSC_SEND),
+]
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class LatencyHistogram():
+    """
+    Log-linear histogram of microsecond values, like HdrHistogram with two
+    significant digits: values below 128 us are exact, larger values land in
+    one of 64 buckets per power of two, each at most 1/64 (1.6%) wide, and
+    are reported as the bucket midpoint, within 0.8% of the recorded value.
+    """
+    SUB_BITS = 7
+
+    def __init__(self):
+        self._counts = Counter()
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    @classmethod
+    def _index(cls, value):
+        if value < (1 << cls.SUB_BITS):
+            return value
+        shift = value.bit_length() - cls.SUB_BITS
+        return (shift << (cls.SUB_BITS - 1)) + (value >> shift)
+
+    @classmethod
+    def _value(cls, index):
+        # midpoint of the bucket
+        if index < (1 << cls.SUB_BITS):
+            return index
+        shift = (index >> (cls.SUB_BITS - 1)) - 1
+        mantissa = index - (shift << (cls.SUB_BITS - 1))
+        return (mantissa << shift) + ((1 << shift) >> 1)
+
+    def record(self, seconds):
+        micros = max(0, int(seconds * 1_000_000))
+        self._counts[self._index(micros)] += 1
+        self.count += 1
+        self.total += seconds
+        self.min = seconds if self.min is None else min(self.min, seconds)
+        self.max = seconds if self.max is None else max(self.max, seconds)
+
+    def percentile(self, quantile):
+        if self.count == 0:
+            return 0.0
+        target = max(1, quantile * self.count)
+        seen = 0
+        for index in sorted(self._counts):
+            seen += self._counts[index]
+            if seen >= target:
+                return min(self.max, max(self.min, self._value(index) / 1_000_000))
+        return self.max
+
+    def summary(self):
+        result = {
+            "count": self.count,
+            "sum": self.total,
+            "min": self.min or 0.0,
+            "max": self.max or 0.0,
+            "mean": self.total / self.count if self.count else 0.0,
+        }
+        for quantile in QUANTILES:
+            result[f"p{int(quantile * 100)}"] = self.percentile(quantile)
+        return result
+
+
+class Trace():
+    def __init__(self, metrics):
+        self.metrics = metrics
+        self.marks = {}
+
+    def mark(self, name, at=None):
+        at = time.monotonic() if at is None else at
+        self.marks[name] = at
+        for stage, start, end in STAGES:
+            if end == name and start in self.marks:
+                self.metrics.record(stage, at - self.marks[start])
+        return self
+
+    @contextmanager
+    def span(self, request, response):
+        self.mark(request)
+        try:
+            yield self
+        finally:
+            self.mark(response)
+
+
+class Metrics():
+    def __init__(self):
+        self._histograms = {}
+        self._lock = threading.Lock()
+        self._exporter = None
+
+    def trace(self):
+        return Trace(self)
+
+    def record(self, stage, seconds):
+        with self._lock:
+            if stage not in self._histograms:
+                self._histograms[stage] = LatencyHistogram()
+            self._histograms[stage].record(seconds)
+
+    def snapshot(self):
+        with self._lock:
+            return {stage: histogram.summary() for stage, histogram in self._histograms.items()}
+
+    def prometheus(self):
+        lines = [
+            "# HELP vrc_stage_latency_seconds Latency of each speech-to-chatbox pipeline stage.",
+            "# TYPE vrc_stage_latency_seconds summary",
+        ]
+        for stage, summary in sorted(self.snapshot().items()):
+            for quantile in QUANTILES:
+                value = summary[f"p{int(quantile * 100)}"]
+                lines.append(f'vrc_stage_latency_seconds{{stage="{stage}",quantile="{quantile}"}} {value:.6f}')
+            lines.append(f'vrc_stage_latency_seconds_sum{{stage="{stage}"}} {summary["sum"]:.6f}')
+            lines.append(f'vrc_stage_latency_seconds_count{{stage="{stage}"}} {summary["count"]}')
+        return "\n".join(lines) + "\n"
+
+    def export(self, json_path=None, prometheus_path=None):
+        if json_path:
+            _write_atomic(json_path, json.dumps(self.snapshot(), indent=2))
+        if prometheus_path:
+            _write_atomic(prometheus_path, self.prometheus())
+
+    def start_export(self, json_path=None, prometheus_path=None, interval=10):
+        """
+        Export every ``interval`` seconds on a daemon thread.
+        """
+        if self._exporter is not None or not (json_path or prometheus_path):
+            return
+
+        def run():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.export(json_path, prometheus_path)
+                except OSError as e:
+                    print("[Metrics] Export failed!", e)
+
+        self._exporter = threading.Thread(target=run, name="MetricsExporter", daemon=True)
+        self._exporter.start()
+
+    def print_summary(self):
+        for stage, summary in self.snapshot().items():
+            print(f"[Metrics] {stage:<12} n={summary['count']:<5} p50={summary['p50'] * 1000:8.1f}ms "
+                  f"p95={summary['p95'] * 1000:8.1f}ms p99={summary['p99'] * 1000:8.1f}ms")
+
+
+def _write_atomic(path, content):
+    # Scrapers should never see a half written file
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+
+metrics = Metrics()
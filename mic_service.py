@@ -0,0 +1,252 @@
+"""Shared, always-open microphone
+
+Opening a PyAudio input stream takes hundreds of milliseconds, long enough
+to lose the first syllable after a push-to-talk press. MicrophoneService
+opens the device once and keeps the last few seconds in a ring buffer.
+Every consumer (push-to-talk, continuous mode, main.py) subscribes to the
+same stream and can start with some of the audio from before it subscribed.
+Every chunk also updates the device's NoiseFloor, which the speech detectors
+of all consumers share.
+"""
+import queue
+import threading
+import time
+
+from speech_recognition import WaitTimeoutError
+
+from audio_buffer import AudioRingBuffer
+from metrics import metrics as default_metrics
+from noise_floor import NoiseFloor
+from vad import MicrophoneStream, StreamingVAD, SAMPLE_WIDTH, VAD_END
+
+# Metrics stage: subscribe() until the first live chunk reaches the subscriber
+FIRST_SAMPLE = "press_to_first_sample"
+
+
+class MicrophoneService():
+    def __init__(self, open_stream=MicrophoneStream, sample_rate=16000, chunk_size=1024, device_index=None,
+                 preroll_seconds=3, metrics=default_metrics, noise_floor=None, save_interval=60):
+        """
+        ``open_stream(sample_rate=, chunk_size=, device_index=, on_chunk=)``
+        returns a MicrophoneStream-like context manager that calls
+        ``on_chunk(data)`` for every chunk.
+        The noise floor is stored every ``save_interval`` seconds and on close().
+        """
+        self.open_stream = open_stream
+        self.sample_rate = sample_rate
+        self.sample_width = SAMPLE_WIDTH
+        self.chunk_size = chunk_size
+        self.device_index = device_index
+        self.preroll_seconds = preroll_seconds
+        self.metrics = metrics
+        self.noise_floor = noise_floor or NoiseFloor(sample_rate)
+        self.save_interval = save_interval
+        self._ring = AudioRingBuffer(sample_rate, SAMPLE_WIDTH, max_seconds=preroll_seconds,
+                                     capacity_seconds=preroll_seconds * 2)
+        self._subscribers = []
+        self._stream = None
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+
+    @property
+    def running(self):
+        return self._stream is not None
+
+    def start(self):
+        """
+        Open the device, unless it is open already.
+        """
+        with self._lock:
+            if self._stream is not None:
+                return
+            start = time.monotonic()
+            stream = self.open_stream(sample_rate=self.sample_rate, chunk_size=self.chunk_size,
+                                      device_index=self.device_index, on_chunk=self._on_chunk)
+            self._stream = stream.__enter__()
+            self.noise_floor.load(self._stream.device_name())
+            self._closed.clear()
+        print(f"[Microphone] Opened {self.device_name()} in {(time.monotonic() - start) * 1000:.0f}ms")
+        threading.Thread(target=self._autosave, name="NoiseFloorSave", daemon=True).start()
+
+    def close(self):
+        with self._lock:
+            stream, self._stream = self._stream, None
+            subscribers, self._subscribers = self._subscribers, []
+        if stream is not None:
+            stream.close()
+            self._closed.set()
+            self._save_noise_floor()
+        for subscriber in subscribers:
+            subscriber._end()
+
+    def device_name(self):
+        return self._stream.device_name() if self._stream is not None else None
+
+    def subscribe(self, preroll_seconds=0.0, on_chunk=None):
+        """
+        Return a MicrophoneSubscription that starts with the last
+        ``preroll_seconds`` of audio. Opens the device if needed.
+        """
+        self.start()
+        subscription = MicrophoneSubscription(self, on_chunk)
+        with self._lock:
+            subscription._attach(self._preroll(preroll_seconds))
+            self._subscribers.append(subscription)
+        return subscription
+
+    def listen(self, timeout=None, phrase_time_limit=None, preroll_seconds=0.5, **vad_options):
+        """
+        Capture one phrase, like ``Recognizer.listen``: waits up to ``timeout``
+        seconds for speech to start (raising WaitTimeoutError) and returns
+        the phrase as AudioData once it ends.
+        """
+        vad = StreamingVAD(self.sample_rate, partial_ms=0, max_phrase_seconds=phrase_time_limit or 30,
+                           noise_floor=self.noise_floor, **vad_options)
+        deadline = time.monotonic() + timeout if timeout else None
+        with self.subscribe(preroll_seconds) as stream:
+            while True:
+                if deadline is not None and not vad.active and time.monotonic() > deadline:
+                    raise WaitTimeoutError("listening timed out while waiting for phrase to start")
+                try:
+                    chunk = stream.read(timeout=0.1)
+                except queue.Empty:
+                    continue
+                if chunk is None:
+                    events = vad.flush()
+                    if events:
+                        return events[0].audio
+                    raise WaitTimeoutError("microphone closed before a phrase was captured")
+                for event in vad.process(chunk):
+                    if event.kind == VAD_END:
+                        return event.audio
+
+    def _preroll(self, seconds):
+        wanted = int(seconds * self.sample_rate) * self.sample_width
+        view = self._ring.view()
+        return bytes(view[len(view) - min(wanted, len(view)):]) if wanted else b""
+
+    def _autosave(self):
+        while not self._closed.wait(self.save_interval):
+            self._save_noise_floor()
+
+    def _save_noise_floor(self):
+        try:
+            self.noise_floor.save()
+        except OSError as e:
+            print("[Microphone] Could not store the noise floor!", e)
+
+    def _unsubscribe(self, subscription):
+        with self._lock:
+            if subscription in self._subscribers:
+                self._subscribers.remove(subscription)
+
+    def _on_chunk(self, data):
+        # PyAudio callback thread
+        now = time.monotonic()
+        with self._lock:
+            self.noise_floor.update(data)
+            self._ring.append(data)
+            for subscriber in self._subscribers:
+                subscriber._deliver(data, now)
+
+
+class MicrophoneSubscription():
+    """
+    One consumer's view of the shared microphone, with the MicrophoneStream
+    interface. Chunks are queued for iteration or passed to ``on_chunk(data)``.
+    """
+
+    def __init__(self, service, on_chunk=None):
+        self.service = service
+        self.sample_rate = service.sample_rate
+        self.sample_width = service.sample_width
+        self.chunk_size = service.chunk_size
+        self.noise_floor = service.noise_floor
+        self.on_chunk = on_chunk
+        self._queue = queue.Queue()
+        self._paused = False
+        self._subscribed = time.monotonic()
+        self._first_sample = None
+
+    def device_name(self):
+        return self.service.device_name()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.service._unsubscribe(self)
+        self._end()
+
+    @property
+    def paused(self):
+        return self._paused
+
+    def pause(self):
+        """
+        Stop receiving chunks and drop the ones not consumed yet.
+        """
+        with self.service._lock:
+            self._paused = True
+            while True:
+                try:
+                    data = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if data is None:
+                    self._queue.put(None)
+                    break
+
+    def resume(self, preroll_seconds=0.3):
+        """
+        Receive chunks again, starting with the last ``preroll_seconds``.
+        """
+        with self.service._lock:
+            if not self._paused:
+                return
+            self._paused = False
+            self._attach(self.service._preroll(preroll_seconds))
+
+    def read(self, timeout=None):
+        """
+        Next chunk, None once closed. Raises queue.Empty after ``timeout`` seconds.
+        """
+        return self._queue.get(timeout=timeout)
+
+    def __iter__(self):
+        while True:
+            data = self._queue.get()
+            if data is None:
+                return
+            yield data
+
+    def _attach(self, preroll):
+        # called with the service lock held
+        self._subscribed = time.monotonic()
+        self._first_sample = None
+        if preroll:
+            self._put(preroll)
+
+    def _deliver(self, data, now):
+        if self._paused:
+            return
+        if self._first_sample is None:
+            self._first_sample = now - self._subscribed
+            self.service.metrics.record(FIRST_SAMPLE, self._first_sample)
+        self._put(data)
+
+    def _put(self, data):
+        if self.on_chunk is not None:
+            self.on_chunk(data)
+        else:
+            self._queue.put(data)
+
+    def _end(self):
+        if self.on_chunk is None:
+            self._queue.put(None)
+
+
+microphone = MicrophoneService()
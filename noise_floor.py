@@ -0,0 +1,121 @@
+"""Adaptive noise floor for the speech detector
+
+Instead of a blocking calibration pass whenever capture starts, the shared
+microphone feeds every chunk into a NoiseFloor. Frames are classified with
+the same rule as StreamingVAD, and only frames that follow at least
+``quiet_seconds`` of non-speech pull the floor towards their energy, so quiet
+speech or music that stays under the threshold does not lift it. If no frame
+qualifies (a fan was switched on) the floor rises slowly towards the quietest
+frame of the last few seconds, which speech with its pauses does not raise
+much. Either way the floor grows by at most ``max_rise`` per second.
+The energy threshold is the floor times ``ratio``; StreamingVAD also counts
+frames at half the threshold as speech when their crossing rate is high, so
+the ratio keeps that half well above the floor.
+
+The last floor of every input device is stored in a small JSON file, so the
+next session starts with a good threshold right away.
+"""
+from collections import deque
+from datetime import datetime
+import json
+import os
+
+import numpy as np
+
+from vad import frame_features, speech_frames, ZCR_THRESHOLD
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "noise_floor.json")
+
+
+class NoiseFloor():
+    def __init__(self, sample_rate, frame_ms=20, ratio=3.0, min_threshold=50.0, default_threshold=300.0,
+                 attack_seconds=1.0, release_seconds=10.0, window_seconds=5.0, quiet_seconds=0.5,
+                 max_rise=1.25, zcr_threshold=ZCR_THRESHOLD, path=DEFAULT_PATH):
+        """
+        ``attack_seconds`` is the time constant towards non-speech frames,
+        ``release_seconds`` the one towards louder background noise, which is
+        the quietest frame of the last ``window_seconds``. A non-speech frame
+        only counts once ``quiet_seconds`` of non-speech came before it, and
+        the floor grows by at most a factor ``max_rise`` per second.
+        With ``path`` None nothing is loaded or stored.
+        """
+        self.frame_len = int(sample_rate * frame_ms / 1000)
+        self.ratio = ratio
+        self.min_threshold = min_threshold
+        self.zcr_threshold = zcr_threshold
+        self.path = path
+        self.device = None
+        self.floor = default_threshold / ratio
+        frame_seconds = frame_ms / 1000
+        self._attack = 1 - np.exp(-frame_seconds / attack_seconds)
+        self._release = 1 - np.exp(-frame_seconds / release_seconds)
+        self._max_rise = max_rise ** frame_seconds
+        self._quiet_frames = max(1, round(quiet_seconds / frame_seconds))
+        self._quiet_run = 0
+        self._recent = deque(maxlen=max(1, round(window_seconds / frame_seconds)))
+        self._saved_floor = None
+
+    @property
+    def threshold(self):
+        return max(self.min_threshold, self.floor * self.ratio)
+
+    def update(self, data):
+        """
+        Feed raw 16 bit PCM; a trailing partial frame is ignored.
+        """
+        samples = np.frombuffer(data, dtype="<i2")
+        frames = len(samples) // self.frame_len
+        if frames == 0:
+            return self.threshold
+        rms, zcr = frame_features(samples[:frames * self.frame_len], self.frame_len)
+        self._recent.extend(rms.tolist())
+
+        # length of the non-speech run each frame ends
+        speech = speech_frames(rms, zcr, self.threshold, self.zcr_threshold)
+        starts = np.maximum.accumulate(np.where(speech, np.arange(frames), -1))
+        runs = np.arange(frames) - starts
+        runs[starts < 0] += self._quiet_run
+        self._quiet_run = int(runs[-1])
+
+        quiet = rms[runs > self._quiet_frames]
+        if len(quiet):
+            floor = self.floor + (1 - (1 - self._attack) ** len(quiet)) * (float(np.mean(quiet)) - self.floor)
+        else:
+            floor = self.floor + (1 - (1 - self._release) ** frames) * max(0.0, min(self._recent) - self.floor)
+        self.floor = min(floor, max(self.floor, self.min_threshold / self.ratio) * self._max_rise ** frames)
+        return self.threshold
+
+    def load(self, device):
+        """
+        Continue from the floor stored for ``device``, if there is one.
+        """
+        self.device = device
+        if self.path is None:
+            return
+        stored = self._read().get(device)
+        if stored is not None:
+            self.floor = float(stored["noise_floor"])
+            self._saved_floor = self.floor
+            print(f"[NoiseFloor] Loaded threshold {self.threshold:.0f} for {device}")
+
+    def save(self):
+        if self.path is None or self.device is None or self.floor == self._saved_floor:
+            return
+        devices = self._read()
+        devices[self.device] = {"noise_floor": round(self.floor, 2), "threshold": round(self.threshold, 2),
+                                "updated": datetime.now().isoformat(timespec="seconds")}
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(devices, f, indent=2)
+        os.replace(tmp_path, self.path)
+        self._saved_floor = self.floor
+
+    def _read(self):
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            print("[NoiseFloor] Could not read", self.path, e)
+            return {}
@@ -0,0 +1,138 @@
+"""Lightweight OSC receiver for VRChat parameters
+
+VRChat sends every avatar parameter to the OSC port many times per second,
+but only a handful of addresses are mapped. ThreadingOSCUDPServer starts a
+thread and fully decodes each datagram; OSCReceiver reads on one thread (or
+an asyncio endpoint), compares the raw address bytes against the mapped
+addresses and only decodes packets that match.
+"""
+import asyncio
+import socket
+import time
+
+from pythonosc.osc_bundle import OscBundle
+from pythonosc.osc_message import OscMessage, ParseError
+
+BUNDLE_PREFIX = b"#bundle\x00"
+
+
+class OSCReceiver():
+    def __init__(self, address, stats_interval=None, recv_buffer=1 << 20, recorder=None):
+        """
+        ``address`` is the (ip, port) to listen on. With ``stats_interval``
+        packets/sec handled and dropped are printed every that many seconds.
+        A ``recorder`` (osc_session.OSCRecorder) gets every packet, mapped or not.
+        """
+        self.stats_interval = stats_interval
+        self.recorder = recorder
+        self._handlers = {}
+        self._prefixes = ()
+        self._running = False
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, recv_buffer)
+        self._socket.bind(address)
+        self.server_address = self._socket.getsockname()
+        self._counts = {"received": 0, "handled": 0, "dropped": 0, "errors": 0}
+        self._started = time.monotonic()
+        self._last_report = (self._started, dict(self._counts))
+
+    def map(self, address, handler):
+        """
+        Call ``handler(address, *args)`` for messages sent to ``address``,
+        same as pythonosc's Dispatcher.map.
+        """
+        self._handlers.setdefault(address, []).append(handler)
+        # OSC strings are null terminated, so this only matches the exact address
+        self._prefixes = tuple(name.encode() + b"\x00" for name in self._handlers) + (BUNDLE_PREFIX,)
+
+    def handle_packet(self, data):
+        self._counts["received"] += 1
+        if self.recorder is not None:
+            self.recorder.received(data)
+        if not data.startswith(self._prefixes):
+            self._counts["dropped"] += 1
+            return
+        try:
+            if data.startswith(BUNDLE_PREFIX):
+                messages = list(_bundle_messages(OscBundle(data)))
+            else:
+                messages = [OscMessage(data)]
+        except ParseError as e:
+            self._counts["errors"] += 1
+            print("[OSC] Could not parse packet!", e)
+            return
+
+        handled = False
+        for message in messages:
+            for handler in self._handlers.get(message.address, ()):
+                handled = True
+                try:
+                    handler(message.address, *message.params)
+                except Exception as e:
+                    print("[OSC] Handler for", message.address, "failed!", e)
+        self._counts["handled" if handled else "dropped"] += 1
+
+    def serve_forever(self, poll_interval=0.5):
+        """
+        Receive and dispatch packets on the calling thread until shutdown().
+        """
+        self._socket.settimeout(poll_interval)
+        self._running = True
+        try:
+            while self._running:
+                try:
+                    data = self._socket.recv(65535)
+                except socket.timeout:
+                    data = None
+                if data:
+                    self.handle_packet(data)
+                self._maybe_report()
+        finally:
+            self._socket.close()
+
+    async def create_serve_endpoint(self, loop=None):
+        """
+        Serve on an asyncio datagram endpoint instead of a thread.
+        Returns ``(transport, protocol)``.
+        """
+        loop = loop or asyncio.get_running_loop()
+        receiver = self
+
+        class Protocol(asyncio.DatagramProtocol):
+            def datagram_received(self, data, addr):
+                receiver.handle_packet(data)
+                receiver._maybe_report()
+
+        return await loop.create_datagram_endpoint(Protocol, sock=self._socket)
+
+    def shutdown(self):
+        self._running = False
+
+    def stats(self):
+        """
+        Packet counts since start plus packets/sec over the whole run.
+        """
+        counts = dict(self._counts)
+        elapsed = max(1e-9, time.monotonic() - self._started)
+        for key in ("received", "handled", "dropped"):
+            counts[f"{key}_per_second"] = counts[key] / elapsed
+        return counts
+
+    def _maybe_report(self):
+        if not self.stats_interval:
+            return
+        now = time.monotonic()
+        last_time, last_counts = self._last_report
+        if now - last_time < self.stats_interval:
+            return
+        rates = {key: (self._counts[key] - last_counts[key]) / (now - last_time) for key in last_counts}
+        self._last_report = (now, dict(self._counts))
+        print(f"[OSC] {rates['received']:.0f} packets/s, {rates['handled']:.1f} handled, {rates['dropped']:.0f} dropped")
+
+
+def _bundle_messages(bundle):
+    for content in bundle:
+        if isinstance(content, OscBundle):
+            yield from _bundle_messages(content)
+        else:
+            yield content
@@ -0,0 +1,107 @@
+"""Pre-encoded OSC sends for fixed input actions
+
+The vrc-auto actions never change, but SimpleUDPClient.send_message builds
+and encodes a new OscMessage for every address on every hold tick, and
+resolves the target on every sendto. compile_step() encodes a step once into
+the datagrams to send. OSCSender keeps one socket and the resolved target,
+so replaying a step is just one sendto per datagram.
+
+With ``bundle=True`` a step becomes a single OSC bundle (one syscall per
+tick) when its addresses are all different. A step that repeats an address
+(e.g. /input/Voice 0 then 1 for a button press) is always sent as separate
+datagrams so the receiver sees every value in order.
+"""
+import socket
+
+import numpy as np
+from pythonosc.osc_bundle_builder import OscBundleBuilder, IMMEDIATELY
+from pythonosc.osc_message import OscMessage
+from pythonosc.osc_message_builder import OscMessageBuilder
+
+
+def encode_message(address, value):
+    """
+    The datagram SimpleUDPClient.send_message(address, value) would send.
+    """
+    builder = OscMessageBuilder(address=address)
+    if value is None:
+        pass
+    elif isinstance(value, (list, tuple)):
+        for arg in value:
+            builder.add_arg(arg)
+    else:
+        builder.add_arg(value)
+    return builder.build()
+
+
+def encode_floats(address, values):
+    """
+    One datagram per value, each a float message to ``address``. Encoded
+    in a single NumPy pass: the address and type tag are the same for
+    every message, only the big-endian float32 at the end differs.
+    """
+    prefix = encode_message(address, 0.0).dgram[:-4]
+    records = np.empty(len(values), dtype=[("prefix", f"S{len(prefix)}"), ("value", ">f4")])
+    records["prefix"] = prefix
+    records["value"] = values
+    data = records.tobytes()
+    size = records.itemsize
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+def bundle_datagrams(datagrams, addresses, bundle=False):
+    """
+    With ``bundle`` and no repeated address, pack the datagrams into one
+    bundle. Otherwise return them unchanged, as a tuple.
+    """
+    if bundle and len(datagrams) > 1 and len(set(addresses)) == len(addresses):
+        builder = OscBundleBuilder(IMMEDIATELY)
+        for dgram in datagrams:
+            builder.add_content(OscMessage(dgram))
+        return (builder.build().dgram,)
+    return tuple(datagrams)
+
+
+def compile_step(messages, bundle=False):
+    """
+    Encode a list of (address, value) into a tuple of ready-to-send datagrams.
+    """
+    datagrams = [encode_message(address, value).dgram for address, value in messages]
+    return bundle_datagrams(datagrams, [address for address, _ in messages], bundle)
+
+
+def compile_actions(actions, bundle=False):
+    return {name: compile_step(messages, bundle) for name, messages in actions.items()}
+
+
+class OSCSender():
+    def __init__(self, ip, port, recorder=None):
+        """
+        A ``recorder`` (osc_session.OSCRecorder) gets every datagram sent.
+        """
+        family, _, _, _, address = socket.getaddrinfo(ip, port, type=socket.SOCK_DGRAM)[0]
+        self.address = address
+        self.recorder = recorder
+        self._socket = socket.socket(family, socket.SOCK_DGRAM)
+        self._sent = 0
+
+    def send(self, datagrams):
+        """
+        Send pre-encoded datagrams, in order.
+        """
+        sendto, address = self._socket.sendto, self.address
+        for dgram in datagrams:
+            sendto(dgram, address)
+        if self.recorder is not None:
+            for dgram in datagrams:
+                self.recorder.sent(dgram)
+        self._sent += len(datagrams)
+
+    def send_message(self, address, value):
+        self.send((encode_message(address, value).dgram,))
+
+    def stats(self):
+        return {"sent": self._sent}
+
+    def close(self):
+        self._socket.close()
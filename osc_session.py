@@ -0,0 +1,308 @@
+"""Record OSC traffic and replay it later
+
+OSCRecorder appends every datagram the app receives (VRChat -> port 9001)
+or sends (-> port 9000) to a session file, with the time since the session
+started. OSCSession memory-maps a session file and re-emits its datagrams
+with the original timing, scaled or as fast as possible: to a UDP port, so
+vrc-chatbot.py or main.py can be load tested, or to any callable such as
+OSCReceiver.handle_packet.
+
+Session file (little-endian, append-only):
+    header   8s magic, uint64 wall-clock start in ns since the epoch
+    record   uint64 ns since start, uint8 direction, uint16 length, datagram
+
+Every record also gets a fixed-size entry in ``<path>.idx`` (time, offset,
+direction, length), so a replay can select records by time and direction
+with NumPy instead of walking the file. An index that is missing or does
+not match the session (e.g. after a crash) is rebuilt from the records.
+
+Usage:
+    python osc_session.py info session.osc
+    python osc_session.py replay session.osc [--to 127.0.0.1:9001] [--direction received] [--speed 1] [--loop 1]
+"""
+import argparse
+from collections import Counter
+import mmap
+import struct
+import threading
+import time
+
+import numpy as np
+
+from osc_sender import OSCSender, encode_message
+from pacer import Pacer
+
+MAGIC = b"OSCREC\x00\x01"
+HEADER = struct.Struct("<8sQ")
+RECORD = struct.Struct("<QBH")
+INDEX_ENTRY = struct.Struct("<QQBH")
+INDEX = np.dtype([("time", "<u8"), ("offset", "<u8"), ("direction", "u1"), ("length", "<u2")])
+
+RECEIVED = 0
+SENT = 1
+DIRECTIONS = {"received": RECEIVED, "sent": SENT}
+
+
+def index_path(path):
+    return path + ".idx"
+
+
+def scan(data, start=HEADER.size):
+    """
+    Index the records in ``data`` (the session file contents). Returns the
+    index and where the last complete record ends.
+    """
+    entries = []
+    offset = start
+    while offset + RECORD.size <= len(data):
+        at, direction, length = RECORD.unpack_from(data, offset)
+        if offset + RECORD.size + length > len(data):
+            break
+        entries.append((at, offset, direction, length))
+        offset += RECORD.size + length
+    return np.array(entries, dtype=INDEX), offset
+
+
+class OSCRecorder():
+    def __init__(self, path, flush_interval=1.0, clock_ns=time.monotonic_ns):
+        """
+        Record to ``path``. An existing session is continued: a partial
+        record at its end is cut off and its times keep counting from its
+        original start.
+        """
+        self.path = path
+        self.flush_interval = flush_interval
+        self.clock_ns = clock_ns
+        self._lock = threading.Lock()
+        self._count = 0
+        self._last = 0
+
+        started = time.time_ns()
+        self._file = open(path, "a+b")
+        self._file.seek(0)
+        data = self._file.read()
+        if data and data[:len(MAGIC)] != MAGIC:
+            self._file.close()
+            raise ValueError(f"{path} exists and is not an OSC session file")
+        if len(data) >= HEADER.size:
+            _, started = HEADER.unpack_from(data)
+            index, end = scan(data)
+            self._file.truncate(end)
+            self._offset = end
+            self._count = len(index)
+            self._last = int(index["time"][-1]) if len(index) else 0
+        else:
+            self._file.truncate(0)
+            self._file.write(HEADER.pack(MAGIC, started))
+            self._offset = HEADER.size
+            index = np.array([], dtype=INDEX)
+        with open(index_path(path), "wb") as f:
+            f.write(index.tobytes())
+        self._index = open(index_path(path), "ab")
+
+        self.started = started
+        # monotonic time that corresponds to the session start
+        self._base = clock_ns() - (time.time_ns() - started)
+        self._flushed = time.monotonic()
+
+    def record(self, data, direction, at_ns=None):
+        """
+        Append a datagram, from any thread.
+        """
+        at = (self.clock_ns() if at_ns is None else at_ns) - self._base
+        with self._lock:
+            if self._file.closed:
+                return
+            # times never go backwards, the index stays sorted
+            at = max(at, self._last)
+            self._file.write(RECORD.pack(at, direction, len(data)))
+            self._file.write(data)
+            self._index.write(INDEX_ENTRY.pack(at, self._offset, direction, len(data)))
+            self._offset += RECORD.size + len(data)
+            self._last = at
+            self._count += 1
+            if time.monotonic() - self._flushed > self.flush_interval:
+                self._flush()
+
+    def received(self, data):
+        self.record(data, RECEIVED)
+
+    def sent(self, data):
+        self.record(data, SENT)
+
+    def stats(self):
+        return {"records": self._count, "bytes": self._offset}
+
+    def close(self):
+        with self._lock:
+            if self._file.closed:
+                return
+            self._flush()
+            self._file.close()
+            self._index.close()
+
+    def _flush(self):
+        # records first, so the index never points past the end of the session
+        self._file.flush()
+        self._index.flush()
+        self._flushed = time.monotonic()
+
+
+class RecordingClient():
+    """
+    SimpleUDPClient wrapper that records everything it sends.
+    """
+
+    def __init__(self, client, recorder):
+        self.client = client
+        self.recorder = recorder
+
+    def send_message(self, address, value):
+        message = encode_message(address, value)
+        self.recorder.sent(message.dgram)
+        self.client.send(message)
+
+    def send(self, content):
+        self.recorder.sent(content.dgram)
+        self.client.send(content)
+
+
+class OSCSession():
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.started = HEADER.unpack_from(self._data)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not an OSC session file")
+        self.index = self._load_index()
+
+    def __len__(self):
+        return len(self.index)
+
+    @property
+    def duration(self):
+        return int(self.index["time"][-1]) / 1e9 if len(self.index) else 0.0
+
+    def select(self, direction=None, start=0.0, end=None):
+        """
+        Index entries of ``direction`` between ``start`` and ``end`` seconds.
+        """
+        times = self.index["time"]
+        first = np.searchsorted(times, int(start * 1e9), side="left")
+        last = len(times) if end is None else np.searchsorted(times, int(end * 1e9), side="right")
+        entries = self.index[first:last]
+        if direction is not None:
+            entries = entries[entries["direction"] == direction]
+        return entries
+
+    def datagram(self, entry):
+        offset = int(entry["offset"]) + RECORD.size
+        return self._data[offset:offset + int(entry["length"])]
+
+    def records(self, direction=None, start=0.0, end=None):
+        """
+        Yield ``(seconds, direction, datagram)``.
+        """
+        for entry in self.select(direction, start, end):
+            yield int(entry["time"]) / 1e9, int(entry["direction"]), self.datagram(entry)
+
+    def replay(self, send, direction=RECEIVED, speed=1.0, start=0.0, end=None, pacer=None):
+        """
+        Call ``send(datagram)`` for every selected record, ``speed`` times as
+        fast as recorded; ``speed=0`` sends as fast as possible. Returns
+        the send rate and how late the datagrams went out.
+        """
+        entries = self.select(direction, start, end)
+        if not len(entries):
+            return {"sent": 0, "seconds": 0.0, "per_second": 0.0}
+        # waits between consecutive records, computed for all records at once
+        waits = np.diff(entries["time"].astype(np.int64), prepend=int(entries["time"][0])) / 1e9
+        waits = waits / speed if speed else np.zeros(len(entries))
+        pacer = pacer or Pacer()
+
+        began = time.perf_counter()
+        pacer.start()
+        for entry, wait in zip(entries, waits.tolist()):
+            if wait:
+                pacer.wait(wait)
+            send(self.datagram(entry))
+        seconds = time.perf_counter() - began
+        stats = {"sent": len(entries), "seconds": seconds, "per_second": len(entries) / max(seconds, 1e-9)}
+        if pacer.jitter.count:
+            jitter = pacer.stats()
+            stats.update(late_p50=jitter["p50"], late_p99=jitter["p99"], late_max=jitter["max"],
+                         resyncs=jitter["resyncs"])
+        return stats
+
+    def close(self):
+        self._data.close()
+        self._file.close()
+
+    def _load_index(self):
+        try:
+            index = np.fromfile(index_path(self.path), dtype=INDEX)
+        except (OSError, ValueError):
+            index = None
+        if index is not None and self._index_matches(index):
+            return index
+        print(f"[OSCSession] Rebuilding the index of {self.path}")
+        return scan(self._data)[0]
+
+    def _index_matches(self, index):
+        if not len(index):
+            return len(self._data) == HEADER.size
+        offset = int(index["offset"][-1])
+        if offset + RECORD.size > len(self._data):
+            return False
+        at, direction, length = RECORD.unpack_from(self._data, offset)
+        last = index[-1]
+        return (at == last["time"] and direction == last["direction"] and length == last["length"]
+                and offset + RECORD.size + length == len(self._data))
+
+
+def address(datagram):
+    return datagram[:datagram.find(b"\x00")].decode(errors="replace")
+
+
+def info(session):
+    print(f"{session.path}: {len(session)} records over {session.duration:.1f}s, "
+          f"started {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(session.started / 1e9))}")
+    for name, direction in DIRECTIONS.items():
+        entries = session.select(direction)
+        counts = Counter(address(session.datagram(entry)) for entry in entries)
+        print(f"  {name}: {len(entries)} datagrams, {int(entries['length'].sum())} bytes")
+        for osc_address, count in counts.most_common(10):
+            print(f"    {count:8d}  {osc_address}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    info_parser = subparsers.add_parser("info", help="Summarize a session file")
+    info_parser.add_argument("path")
+    replay_parser = subparsers.add_parser("replay", help="Send a session's datagrams again")
+    replay_parser.add_argument("path")
+    replay_parser.add_argument("--to", default=None,
+                               help="host:port to send to, default 127.0.0.1:9001 for received and 127.0.0.1:9000 for sent")
+    replay_parser.add_argument("--direction", choices=list(DIRECTIONS), default="received")
+    replay_parser.add_argument("--speed", type=float, default=1.0, help="Timing scale, 0 sends as fast as possible")
+    replay_parser.add_argument("--start", type=float, default=0.0, help="Seconds into the session to start at")
+    replay_parser.add_argument("--end", type=float, default=None, help="Seconds into the session to stop at")
+    replay_parser.add_argument("--loop", type=int, default=1, help="Number of times to replay")
+    args = parser.parse_args()
+
+    session = OSCSession(args.path)
+    if args.command == "info":
+        info(session)
+    else:
+        direction = DIRECTIONS[args.direction]
+        host, port = (args.to or f"127.0.0.1:{9001 if direction == RECEIVED else 9000}").rsplit(":", 1)
+        sender = OSCSender(host, int(port))
+        for _ in range(args.loop):
+            stats = session.replay(lambda data: sender.send((data,)), direction=direction, speed=args.speed,
+                                   start=args.start, end=args.end)
+            print(f"[OSCSession] Sent {stats['sent']} datagrams to {host}:{port} in {stats['seconds']:.2f}s "
+                  f"({stats['per_second']:,.0f}/s)"
+                  + (f", late p99 {stats['late_p99'] * 1000:.2f}ms" if "late_p99" in stats else ""))
+    session.close()
@@ -0,0 +1,65 @@
+"""Drift-free pacing for hold loops and timed sequences
+
+``send(); time.sleep(interval)`` makes every step last the interval plus the
+send time plus the sleep overshoot, and the error adds up, so a repeating
+sequence slowly changes shape. Pacer keeps absolute ``monotonic_ns``
+deadlines instead: each step ends ``interval`` after the previous deadline,
+however long the step itself took. It sleeps until shortly before the
+deadline and spins for the rest, so deadlines are hit to well below a
+millisecond. How late each deadline was met goes into a LatencyHistogram.
+"""
+import time
+
+from metrics import LatencyHistogram
+
+
+class Pacer():
+    def __init__(self, spin_seconds=0.001, max_lag_seconds=0.1, clock_ns=time.monotonic_ns):
+        """
+        The last ``spin_seconds`` before a deadline are spun instead of slept.
+        When a deadline is missed by more than ``max_lag_seconds`` (machine
+        suspended, process stalled) the schedule restarts from now instead of
+        rushing through the missed steps.
+        """
+        self.spin_ns = int(spin_seconds * 1_000_000_000)
+        self.max_lag_ns = int(max_lag_seconds * 1_000_000_000)
+        self.clock_ns = clock_ns
+        self.jitter = LatencyHistogram()
+        self.resyncs = 0
+        self._deadline = None
+
+    def start(self):
+        """
+        Start the schedule now, the first wait() ends one interval from here.
+        """
+        self._deadline = self.clock_ns()
+
+    def wait(self, seconds):
+        """
+        Wait until ``seconds`` after the previous deadline. Returns how late
+        the deadline was met, in seconds.
+        """
+        if self._deadline is None:
+            self.start()
+        self._deadline += int(seconds * 1_000_000_000)
+        deadline = self._deadline
+        remaining = deadline - self.clock_ns()
+        if remaining > self.spin_ns:
+            time.sleep((remaining - self.spin_ns) / 1_000_000_000)
+        now = self.clock_ns()
+        while now < deadline:
+            # sleep(0) releases the GIL, the Tk thread keeps running while we spin
+            time.sleep(0)
+            now = self.clock_ns()
+
+        late = now - deadline
+        self.jitter.record(late / 1_000_000_000)
+        if late > self.max_lag_ns:
+            self._deadline = now
+            self.resyncs += 1
+        return late / 1_000_000_000
+
+    def stats(self):
+        stats = self.jitter.summary()
+        stats["resyncs"] = self.resyncs
+        return stats
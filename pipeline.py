@@ -0,0 +1,230 @@
+"""Threaded speech-to-chatbox pipeline used by main.py and the continuous mode of vrc-chatbot.py
+
+collect_audio -> audio_queue -> process_sound -> RecognitionPool -> process_text
+-> output_queue -> send_output -> ChatboxScheduler
+
+The audio source, recognizer, translator and chatbox are passed in, so the
+same logic runs against a live microphone and Google/DeepL in main.py or
+against WAV files and local stand-ins in bench_pipeline.py.
+"""
+import queue
+import threading
+
+from speech_recognition import UnknownValueError
+
+from audio_queue import AudioQueue, DROP_STALE_PARTIALS
+from metrics import (metrics as default_metrics, CAPTURE_START, SPEECH_END, RECOGNIZE_REQUEST, RECOGNIZE_RESPONSE,
+                     TRANSLATE_REQUEST, TRANSLATE_RESPONSE, READY, OSC_SEND)
+from recognition_pool import RecognitionPool
+from vad import StreamingVAD, VAD_START, VAD_PARTIAL, VAD_END
+
+
+class SpeechPipeline():
+    def __init__(self, open_stream, recognize, chatbox, batch_translator=None, from_lang="en-US", to_lang="en-US",
+                 recognize_workers=4, recognize_timeout=10, limiter=None, metrics=default_metrics, active=True,
+                 audio_queue_size=8, audio_queue_policy=DROP_STALE_PARTIALS, audio_max_age=None,
+                 vad_options=None, format_output=None, on_output=None, dedupe=True, send_untranslated=True):
+        """
+        ``open_stream()`` returns a MicrophoneStream-like context manager and
+        ``recognize(audio)`` returns the text of one utterance.
+        ``active`` tells whether speech should go to the chatbox from the start,
+        see set_active().
+        The ``audio_queue_*`` and ``audio_max_age`` options configure the
+        AudioQueue between the audio and processing threads.
+        ``vad_options`` are passed to StreamingVAD, which follows the stream's
+        ``noise_floor`` when it has one.
+        ``format_output(text, translation)`` replaces format_translation() and
+        ``on_output(text)`` is called for every text queued for the chatbox.
+        Like main.py always did, ``dedupe`` skips an utterance with the same
+        text as the one before and ``send_untranslated`` sends the recognized
+        text when its translation fails. Without it a failed or empty
+        translation is not sent, on_output() gets "Translation failed".
+        """
+        self.open_stream = open_stream
+        self.recognize = recognize
+        self.chatbox = chatbox
+        self.batch_translator = batch_translator
+        self.from_lang = from_lang
+        self.to_lang = to_lang
+        self.metrics = metrics
+        self.vad_options = vad_options or {}
+        if format_output is not None:
+            self.format_translation = format_output
+        self.on_output = on_output
+        self.dedupe = dedupe
+        self.send_untranslated = send_untranslated
+        self.active = threading.Event()
+        if active:
+            self.active.set()
+
+        self.audio_queue = AudioQueue(maxsize=audio_queue_size, policy=audio_queue_policy, max_age=audio_max_age)
+        self.output_queue = queue.Queue()
+        self.last_text = ""
+        self.recognition_pool = RecognitionPool(self._recognize, self.process_text,
+                                                workers=recognize_workers, timeout=recognize_timeout,
+                                                limiter=limiter)
+
+    @property
+    def translating(self):
+        return self.batch_translator is not None and self.from_lang.lower() != self.to_lang.lower()
+
+    def start(self, daemon=False):
+        """
+        Start the capture, processing and output threads and return them.
+        """
+        threads = [
+            threading.Thread(target=self.process_sound, name="ProcessThread", daemon=daemon),
+            threading.Thread(target=self.collect_audio, name="AudioThread", daemon=daemon),
+            threading.Thread(target=self.send_output, name="OutputThread", daemon=daemon),
+        ]
+        for thread in threads:
+            thread.start()
+        return threads
+
+    def set_active(self, active):
+        """
+        Pause or resume capture, e.g. from the MuteSelf OSC handler.
+        While paused the audio thread sleeps and no frames are analyzed.
+        """
+        if active:
+            self.active.set()
+        else:
+            self.active.clear()
+
+    # Audio collection thread
+
+    def collect_audio(self):
+        print("[AudioThread] Starting audio collection!")
+        with self.open_stream() as stream:
+            print("[AudioThread] Using", stream.device_name(), "as Microphone!")
+            vad = StreamingVAD(stream.sample_rate, noise_floor=getattr(stream, "noise_floor", None), **self.vad_options)
+            trace = None
+            for chunk in stream:
+                if not self.active.is_set():
+                    self._pause(stream, vad)
+                    continue
+                for event in vad.process(chunk):
+                    trace = self._queue_event(event, trace)
+            for event in vad.flush():
+                self._queue_event(event, trace)
+        print("[AudioThread] Audio stream ended!")
+
+    def _pause(self, stream, vad):
+        # drop the utterance in progress, sleep until resumed, then continue
+        # with the pre-roll the stream kept meanwhile
+        if vad.active:
+            self.chatbox.set_typing(False)
+        vad.reset()
+        if hasattr(stream, "pause"):
+            stream.pause()
+        print("[AudioThread] Capture paused!")
+        self.active.wait()
+        print("[AudioThread] Capture resumed!")
+        if hasattr(stream, "resume"):
+            stream.resume()
+
+    def _queue_event(self, event, trace):
+        if event.kind == VAD_START:
+            trace = self.metrics.trace().mark(CAPTURE_START)
+        elif event.kind == VAD_PARTIAL:
+            self.audio_queue.put(event.audio, False, trace)
+        elif event.kind == VAD_END:
+            trace.mark(SPEECH_END)
+            self.audio_queue.put(event.audio, True, trace)
+        return trace
+
+    # Processing threads
+
+    def process_sound(self):
+        print("[ProcessThread] Starting audio processing!")
+        while True:
+            ad, final, trace = self.audio_queue.get()
+
+            if not self.active.is_set():
+                print("[ProcessThread] Capture paused, dropping audio data!")
+                continue
+
+            print("[ProcessThread] Received audio data, final:", final)
+            self.chatbox.set_typing(not final)
+
+            if not final:
+                print("[ProcessThread] Partial audio, waiting for the final segment!")
+                continue
+
+            seq = self.recognition_pool.submit((ad, trace), trace)
+            print("[ProcessThread] Queued utterance", seq, "for recognition,", self.recognition_pool.pending(), "pending")
+
+    def _recognize(self, item):
+        ad, trace = item
+        with trace.span(RECOGNIZE_REQUEST, RECOGNIZE_RESPONSE):
+            return self.recognize(ad)
+
+    def process_text(self, seq, text, error, trace):
+        """
+        Called by the recognition pool for every final utterance, in speaking order.
+        """
+        if isinstance(error, UnknownValueError):
+            print("[ResultThread] Could not understand audio", seq, "!")
+            return
+        elif isinstance(error, TimeoutError):
+            print("[ResultThread] Timeout Error when recognizing speech", seq, "!")
+            return
+        elif error is not None:
+            print("[ResultThread] Exception!", error)
+            return
+
+        print("[ResultThread] Recognized text", seq, ":", text)
+        if text is None or text == "":
+            print("[ResultThread] No text recognized!")
+            return
+
+        current_text = text
+
+        if self.dedupe and self.last_text == current_text:
+            print("[ResultThread] Text is the same as last time, skipping!")
+            return
+
+        self.last_text = current_text
+
+        future = None
+        if self.translating:
+            print("[ResultThread] Translating text:", current_text)
+            trace.mark(TRANSLATE_REQUEST)
+            future = self.batch_translator.submit(source_lang=self.from_lang, target_lang=self.to_lang, text=current_text)
+            future.add_done_callback(lambda _: trace.mark(TRANSLATE_RESPONSE))
+        self.output_queue.put((current_text, future, trace))
+
+    def send_output(self):
+        """
+        Waits for translations in speaking order and queues them for the chatbox.
+        Translations of queued utterances are batched by the BatchTranslator meanwhile.
+        """
+        print("[OutputThread] Starting output!")
+        while True:
+            current_text, future, trace = self.output_queue.get()
+
+            if future is not None:
+                try:
+                    trans = future.result()
+                except Exception as e:
+                    print("[OutputThread] Translating ran into an error!", e)
+                    trans = None
+                if trans or (trans is not None and self.send_untranslated):
+                    origin = current_text
+                    current_text = self.format_translation(origin, trans)
+                    print("[OutputThread] Recognized:", origin, "->", current_text)
+                elif not self.send_untranslated:
+                    print("[OutputThread] No translation for:", current_text)
+                    if self.on_output is not None:
+                        self.on_output("Translation failed")
+                    continue
+            else:
+                print("[OutputThread] Recognized:", current_text)
+
+            trace.mark(READY)
+            self.chatbox.send(current_text, on_sent=lambda trace=trace: trace.mark(OSC_SEND))
+            if self.on_output is not None:
+                self.on_output(current_text)
+
+    def format_translation(self, text, translation):
+        return translation + " [%s->%s]" % (self.from_lang, self.to_lang)
@@ -0,0 +1,127 @@
+"""Token bucket rate limiting shared by the translation, recognition and chatbox paths
+
+Each resource gets its own bucket. Callers either take a token if one is free
+(``try_acquire``), reserve the earliest free slot (``wait_until``), or hand the
+work to ``schedule`` which runs it at that slot on a single timer thread
+instead of sleeping the caller or dropping the request.
+"""
+from concurrent.futures import Future
+import heapq
+import itertools
+import threading
+import time
+
+TRANSLATION_API = "translation"
+RECOGNITION_API = "recognition"
+CHATBOX = "chatbox"
+
+# (tokens per second, burst size)
+DEFAULT_LIMITS = {
+    TRANSLATION_API: (0.5, 3),
+    RECOGNITION_API: (2.0, 4),
+    CHATBOX: (0.5, 1),
+}
+
+
+class TokenBucket():
+    def __init__(self, rate, capacity=1, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self.clock = clock
+        self._tokens = float(capacity)
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self, tokens=1):
+        """
+        Take ``tokens`` if they are available right now.
+        """
+        with self._lock:
+            self._refill(self.clock())
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return True
+            return False
+
+    def wait_until(self, tokens=1):
+        """
+        Reserve ``tokens`` and return the clock time at which they may be used.
+        Reservations are handed out in call order, so callers that honour the
+        returned time keep their order.
+        """
+        with self._lock:
+            now = self.clock()
+            self._refill(now)
+            self._tokens -= tokens
+            if self._tokens >= 0:
+                return now
+            return now - self._tokens / self.rate
+
+    def delay(self, tokens=1):
+        """
+        Seconds until ``tokens`` would be available, without reserving them.
+        """
+        with self._lock:
+            self._refill(self.clock())
+            missing = tokens - self._tokens
+            return max(0.0, missing / self.rate)
+
+
+class RateLimiter():
+    def __init__(self, limits=DEFAULT_LIMITS, clock=time.monotonic):
+        self.clock = clock
+        self._buckets = {name: TokenBucket(rate, capacity, clock) for name, (rate, capacity) in limits.items()}
+        self._heap = []
+        self._counter = itertools.count()
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def bucket(self, name):
+        return self._buckets[name]
+
+    def try_acquire(self, name, tokens=1):
+        return self._buckets[name].try_acquire(tokens)
+
+    def wait_until(self, name, tokens=1):
+        return self._buckets[name].wait_until(tokens)
+
+    def schedule(self, name, fn, *args, **kwargs):
+        """
+        Run ``fn`` at the earliest slot of ``name`` and return a Future for its result.
+        Callbacks run on the limiter's timer thread and should be short.
+        """
+        future = Future()
+        at = self.wait_until(name)
+        with self._cond:
+            heapq.heappush(self._heap, (at, next(self._counter), future, fn, args, kwargs))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="RateLimiter", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+        return future
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._heap:
+                    self._cond.wait()
+                at = self._heap[0][0]
+                delay = at - self.clock()
+                if delay > 0:
+                    self._cond.wait(delay)
+                    continue
+                _, _, future, fn, args, kwargs = heapq.heappop(self._heap)
+
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(fn(*args, **kwargs))
+            except Exception as e:
+                future.set_exception(e)
+
+
+limiter = RateLimiter()
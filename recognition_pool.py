@@ -0,0 +1,124 @@
+"""Parallel speech recognition with in-order delivery
+
+Utterances are numbered as they are submitted and recognized on a bounded
+thread pool. A single delivery thread hands results to the callback strictly
+in submission order, so a slow request only delays the utterances behind it
+until its timeout instead of stalling them indefinitely.
+"""
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+import threading
+import time
+
+from rate_limiter import RECOGNITION_API
+
+
+class RecognitionPool():
+    def __init__(self, recognize, on_result, workers=4, timeout=10, max_pending=16, limiter=None):
+        """
+        ``recognize(audio)`` returns the text for one utterance and runs on a worker.
+        ``on_result(seq, text, error, context)`` is called in order on the delivery
+        thread, with ``error`` set (e.g. TimeoutError) when recognition failed and
+        ``context`` as passed to ``submit``.
+        With a ``limiter`` requests are started at the next RECOGNITION_API slot.
+        """
+        self.recognize = recognize
+        self.on_result = on_result
+        self.timeout = timeout
+        self.limiter = limiter
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="Recognizer")
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._pending = deque()
+        self._cond = threading.Condition()
+        self._next_seq = 0
+        self._closed = False
+        self._thread = threading.Thread(target=self._deliver, name="RecognitionDelivery", daemon=True)
+        self._thread.start()
+
+    def submit(self, audio, context=None):
+        """
+        Queue an utterance for recognition and return its sequence number.
+        Blocks while ``max_pending`` utterances are already in flight.
+        """
+        self._slots.acquire()
+        with self._cond:
+            seq = self._next_seq
+            self._next_seq += 1
+            job = _Job(seq, context)
+            if self.limiter is None:
+                self._executor.submit(self._run, job, audio)
+            else:
+                self.limiter.schedule(RECOGNITION_API, self._executor.submit, self._run, job, audio)
+            self._pending.append(job)
+            self._cond.notify()
+        return seq
+
+    def pending(self):
+        with self._cond:
+            return len(self._pending)
+
+    def close(self, wait=True):
+        """
+        Stop accepting work. With ``wait`` all queued utterances are delivered first.
+        """
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        if wait:
+            self._thread.join()
+        self._executor.shutdown(wait=wait, cancel_futures=not wait)
+
+    def _run(self, job, audio):
+        if not job.future.set_running_or_notify_cancel():
+            return
+        job.started = time.monotonic()
+        try:
+            job.future.set_result(self.recognize(audio))
+        except Exception as e:
+            job.future.set_exception(e)
+
+    def _wait(self, job):
+        # The timeout starts once a worker picks the job up, not while it is queued
+        while True:
+            remaining = self.timeout
+            if job.started is not None:
+                remaining = job.started + self.timeout - time.monotonic()
+            try:
+                return job.future.result(timeout=max(0.0, remaining)), None
+            except TimeoutError as e:
+                if job.future.done():
+                    # the recognizer itself raised TimeoutError
+                    return None, e
+                if job.started is not None and time.monotonic() >= job.started + self.timeout:
+                    return None, TimeoutError(f"Recognition of utterance {job.seq} timed out after {self.timeout}s")
+            except Exception as e:
+                return None, e
+
+    def _deliver(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if not self._pending:
+                    return
+                job = self._pending[0]
+
+            seq = job.seq
+            text, error = self._wait(job)
+
+            with self._cond:
+                self._pending.popleft()
+            self._slots.release()
+
+            try:
+                self.on_result(seq, text, error, job.context)
+            except Exception as e:
+                print("[RecognitionPool] Result handler failed for utterance", seq, e)
+
+
+class _Job():
+    def __init__(self, seq, context=None):
+        self.seq = seq
+        self.context = context
+        self.future = Future()
+        self.started = None
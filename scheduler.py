@@ -0,0 +1,68 @@
+"""Single timer thread for short delayed callbacks
+
+Replaces one sleeping thread per timeout: callbacks are kept in a heap
+ordered by their monotonic deadline and run one after another on a single
+daemon thread, so they should be short and hand longer work to an executor.
+"""
+from concurrent.futures import Future
+import heapq
+import itertools
+import threading
+import time
+
+
+class Scheduler():
+    def __init__(self, clock=time.monotonic, name="Scheduler"):
+        self.clock = clock
+        self.name = name
+        self._heap = []
+        self._counter = itertools.count()
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def call_at(self, at, fn, *args, **kwargs):
+        """
+        Run ``fn`` at clock time ``at`` and return a Future for its result.
+        Cancelling the Future before then removes the call.
+        """
+        future = Future()
+        with self._cond:
+            heapq.heappush(self._heap, (at, next(self._counter), future, fn, args, kwargs))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+            self._cond.notify()
+        return future
+
+    def call_later(self, delay, fn, *args, **kwargs):
+        return self.call_at(self.clock() + delay, fn, *args, **kwargs)
+
+    def call_soon(self, fn, *args, **kwargs):
+        return self.call_at(self.clock(), fn, *args, **kwargs)
+
+    def pending(self):
+        with self._cond:
+            return len(self._heap)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._heap:
+                    self._cond.wait()
+                at, _, future, fn, args, kwargs = self._heap[0]
+                if future.cancelled():
+                    heapq.heappop(self._heap)
+                    continue
+                delay = at - self.clock()
+                if delay > 0:
+                    self._cond.wait(delay)
+                    continue
+                heapq.heappop(self._heap)
+
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(fn(*args, **kwargs))
+            except Exception as e:
+                print(f"[{self.name}] Scheduled call failed!", e)
+                future.set_exception(e)
@@ -1,10 +1,13 @@
 import threading
 import speech_recognition as sr
-from speech_recognition import UnknownValueError, WaitTimeoutError, AudioData
+from speech_recognition import UnknownValueError, WaitTimeoutError
 import queue
+from audio_buffer import AudioRingBuffer
+from google_speech import GoogleRecognizer
 
 # Initialize recognizer class (for recognizing the speech)
 r = sr.Recognizer()
+google = GoogleRecognizer()
 audio_queue = queue.Queue()
 
 def collect_audio():
@@ -13,31 +16,20 @@ def collect_audio():
     did = mic.get_pyaudio().PyAudio().get_default_input_device_info()
     print("[AudioThread] Using", did.get('name'), "as Microphone!")
     with mic as source:
-        audio_buf = None
-        buf_size = 0
+        audio_buf = AudioRingBuffer(source.SAMPLE_RATE, source.SAMPLE_WIDTH)
         while True:
             audio = None
             try:
                 audio = r.listen(source, phrase_time_limit=1, timeout=0.1)
             except WaitTimeoutError:
-                if audio_buf is not None:
-                    audio_queue.put((audio_buf, True))
-                    audio_buf = None
-                    buf_size = 0
+                if len(audio_buf) > 0:
+                    audio_queue.put((audio_buf.segment(), True))
+                    audio_buf.reset()
                 continue
 
             if audio is not None:
-                if audio_buf is None:
-                    audio_buf = audio
-                else:
-                    buf_size += 1
-                    if buf_size > 10:
-                        audio_buf = audio
-                        buf_size = 0
-                    else:
-                        audio_buf = AudioData(audio_buf.frame_data + audio.frame_data, audio.sample_rate, audio.sample_width)
-
-                audio_queue.put((audio_buf, False))
+                audio_buf.append(audio.frame_data)
+                audio_queue.put((audio_buf.segment(), False))
 
 cat = threading.Thread(target=collect_audio)
 cat.start()
@@ -45,7 +37,7 @@ cat.start()
 while True:
     ad, final = audio_queue.get()
     print("Received audio data, final:", final)
-    print(r.recognize_google(ad, language = 'en-US', show_all = True))
+    print(google.recognize(ad, language = 'en-US', show_all = True))
 
 with sr.Microphone() as mic:
     print("Please speak something...")
@@ -1,14 +1,157 @@
 import deepl
+import os
+import queue
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+from rate_limiter import TRANSLATION_API
+from metrics import metrics
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "translation_cache.db")
+
+
+class TranslationCache():
+    """
+    Two-tier translation cache: an in-memory LRU in front of a SQLite store
+    that survives restarts. The store evicts least recently used entries once
+    the cached text exceeds ``max_disk_bytes``.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, memory_size=512, max_disk_bytes=4 * 1024 * 1024):
+        self.memory_size = memory_size
+        self.max_disk_bytes = max_disk_bytes
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS translations ("
+            " source TEXT NOT NULL, target TEXT NOT NULL, text TEXT NOT NULL,"
+            " result TEXT NOT NULL, size INTEGER NOT NULL, last_used REAL NOT NULL,"
+            " PRIMARY KEY (source, target, text))"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS translations_last_used ON translations (last_used)")
+        self._db.commit()
+        self._disk_bytes = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM translations").fetchone()[0]
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._miss_latency = 0.0
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        # whitespace only: case can change the translation ("US", "Turkey")
+        return " ".join(text.split())
+
+    def get(self, source, target, text):
+        key = (source, target, self.normalize(text))
+        with self._lock:
+            result = self._memory.get(key)
+            if result is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return result
+
+            row = self._db.execute(
+                "SELECT result FROM translations WHERE source = ? AND target = ? AND text = ?", key
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            result = row[0]
+            self._db.execute(
+                "UPDATE translations SET last_used = ? WHERE source = ? AND target = ? AND text = ?",
+                (time.time(),) + key,
+            )
+            self._db.commit()
+            self.disk_hits += 1
+            self._remember(key, result)
+            return result
+
+    def put(self, source, target, text, result, latency=0.0):
+        """
+        Store a translation. ``latency`` is how long the API call took and is
+        used to estimate the time saved by later hits.
+        """
+        key = (source, target, self.normalize(text))
+        size = len(key[2].encode()) + len(result.encode())
+        with self._lock:
+            self._miss_latency += latency
+            self._remember(key, result)
+
+            old = self._db.execute(
+                "SELECT size FROM translations WHERE source = ? AND target = ? AND text = ?", key
+            ).fetchone()
+            self._db.execute(
+                "INSERT OR REPLACE INTO translations (source, target, text, result, size, last_used)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                key + (result, size, time.time()),
+            )
+            self._disk_bytes += size - (old[0] if old else 0)
+            if self._disk_bytes > self.max_disk_bytes:
+                self._evict()
+            self._db.commit()
+
+    def stats(self):
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            avg_latency = self._miss_latency / self.misses if self.misses else 0.0
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": hits / (hits + self.misses) if hits + self.misses else 0.0,
+                "latency_saved": hits * avg_latency,
+                "disk_bytes": self._disk_bytes,
+            }
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def _remember(self, key, result):
+        self._memory[key] = result
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def _evict(self):
+        # Trim to 90% so eviction does not run on every insert once the store is full
+        goal = self.max_disk_bytes * 0.9
+        rows = self._db.execute("SELECT source, target, text, size FROM translations ORDER BY last_used").fetchall()
+        for source, target, text, size in rows:
+            if self._disk_bytes <= goal:
+                break
+            self._db.execute(
+                "DELETE FROM translations WHERE source = ? AND target = ? AND text = ?", (source, target, text)
+            )
+            self._memory.pop((source, target, text), None)
+            self._disk_bytes -= size
+
 
 class DeepLTranslator():
-    def __init__(self, api_key):
+    def __init__(self, api_key, cache_path=DEFAULT_CACHE_PATH, server_url=None):
         self.dtranslator = None
+        self.cache = None
         try:
-            self.dtranslator = deepl.Translator(api_key)
+            # the SDK keeps one requests.Session, so connections are reused
+            # between translations without going through HttpPool
+            self.dtranslator = deepl.Translator(api_key, server_url=server_url)
             print("[Translator] Initialized DeepL Translator!")
         except deepl.exceptions.DeepLException as e:
             raise Exception("Failed to initalize DeepL!", e)
-    
+
+        if cache_path is not None:
+            try:
+                self.cache = TranslationCache(cache_path)
+            except sqlite3.Error as e:
+                print("[Translator] Translation cache disabled!", e)
+
     def convert_language(self, lang_code: str, specific = False) -> str:
         """
         Convert a language code to the format used by DeepL.
@@ -19,16 +162,132 @@ class DeepLTranslator():
         return lang_code[:2].upper()
 
     def translate(self, source_lang, target_lang, text) -> str:
-        output = None
+        return self.translate_batch(source_lang, target_lang, [text])[0]
+
+    def translate_batch(self, source_lang, target_lang, texts) -> list:
+        """
+        Translate several texts with a single DeepL request. Cached texts are
+        not sent again.
+        """
+        results = [None] * len(texts)
         try:
             source = self.convert_language(source_lang)
             target = self.convert_language(target_lang, True)
-            print(f"[Translator] Translating from {source} to {target}...")
-            output = self.dtranslator.translate_text(text=text, source_lang=source, target_lang=target)
-            print(f"[Translator] {text} -> {output.text}")
+            missing = []
+            for i, text in enumerate(texts):
+                cached = self.cache.get(source, target, text) if self.cache is not None else None
+                if cached is not None:
+                    print(f"[Translator] (cached) {text} -> {cached}")
+                    results[i] = cached
+                else:
+                    missing.append(i)
+            if not missing:
+                return results
+
+            print(f"[Translator] Translating {len(missing)} text(s) from {source} to {target}...")
+            start = time.monotonic()
+            outputs = self.dtranslator.translate_text(text=[texts[i] for i in missing], source_lang=source, target_lang=target)
+            elapsed = time.monotonic() - start
+            metrics.record("deepl_api", elapsed)
+            latency = elapsed / len(missing)
+            for i, output in zip(missing, outputs):
+                print(f"[Translator] {texts[i]} -> {output.text}")
+                results[i] = output.text
+                if self.cache is not None:
+                    try:
+                        self.cache.put(source, target, texts[i], output.text, latency)
+                    except sqlite3.Error as e:
+                        print("[Translator] Failed to cache translation!", e)
         except Exception as e:
             raise Exception("Failed to translate text!", e)
-        if output is not None:
-            return output.text
-        else:
-            return ""
\ No newline at end of file
+        return [result if result is not None else "" for result in results]
+
+    def cache_stats(self):
+        return self.cache.stats() if self.cache is not None else None
+
+
+class BatchTranslator():
+    """
+    Coalesces translation requests that arrive within ``window`` seconds of
+    each other into one DeepL request of up to ``max_batch`` texts.
+    Callers get a Future per text. With a ``limiter`` each request waits for a
+    TRANSLATION_API slot, and texts arriving meanwhile join the batch.
+    """
+
+    def __init__(self, translator, window=0.05, max_batch=25, limiter=None):
+        self.translator = translator
+        self.window = window
+        self.max_batch = max_batch
+        self.limiter = limiter
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="BatchTranslator", daemon=True)
+        self._thread.start()
+
+    def submit(self, source_lang, target_lang, text) -> Future:
+        future = Future()
+        self._queue.put((source_lang, target_lang, text, future))
+        return future
+
+    def translate(self, source_lang, target_lang, text) -> str:
+        return self.submit(source_lang, target_lang, text).result()
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+
+    def _collect(self):
+        item = self._queue.get()
+        if item is None:
+            return None, True
+        batch = [item]
+        slot = self._reserve()
+        deadline = max(time.monotonic() + self.window, slot)
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                return batch, True
+            batch.append(item)
+        self._wait(slot)
+        return batch, False
+
+    def _reserve(self):
+        if self.limiter is None:
+            return 0.0
+        return self.limiter.wait_until(TRANSLATION_API)
+
+    def _wait(self, slot):
+        delay = slot - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+    def _run(self):
+        closed = False
+        while not closed:
+            batch, closed = self._collect()
+            if not batch:
+                continue
+
+            groups = OrderedDict()
+            for source_lang, target_lang, text, future in batch:
+                # callers may have given up (e.g. cancelled asyncio wrappers) while queued
+                if not future.set_running_or_notify_cancel():
+                    continue
+                groups.setdefault((source_lang, target_lang), []).append((text, future))
+
+            for i, ((source_lang, target_lang), items) in enumerate(groups.items()):
+                if i > 0:
+                    self._wait(self._reserve())
+                try:
+                    results = self.translator.translate_batch(source_lang, target_lang, [text for text, _ in items])
+                except Exception as e:
+                    for _, future in items:
+                        future.set_exception(e)
+                    continue
+                for (_, future), result in zip(items, results):
+                    future.set_result(result)
@@ -0,0 +1,115 @@
+"""GUI updates from worker threads
+
+Tk widgets may only be touched from the thread running the mainloop, and
+every config() call schedules another redraw. Workers post their updates
+here instead. Only the latest value per widget option (or per key for other
+calls) is kept, and the Tk thread applies whatever is pending at most
+``fps`` times per second from ``root.after``. GUI work stays bounded however
+often the pipeline reports.
+"""
+import threading
+
+
+class UIUpdates():
+    def __init__(self, fps=20):
+        self.interval_ms = max(1, int(1000 / fps))
+        self._options = {}
+        self._calls = {}
+        self._lock = threading.Lock()
+        self._root = None
+        self._after = None
+        self._tk_thread = None
+        self._stats = {"posted": 0, "coalesced": 0, "applied": 0, "drains": 0, "failed": 0}
+
+    def attach(self, root):
+        """
+        Start draining on ``root``'s mainloop. Call from the Tk thread.
+        """
+        self._root = root
+        self._tk_thread = threading.get_ident()
+        self._after = root.after(self.interval_ms, self._drain)
+
+    def close(self):
+        """
+        Stop draining, pending updates are dropped. Call before root.destroy().
+        """
+        if self._root is not None and self._after is not None:
+            self._root.after_cancel(self._after)
+        self._root = None
+        self._after = None
+        with self._lock:
+            self._options.clear()
+            self._calls.clear()
+
+    def config(self, widget, **options):
+        """
+        ``widget.config(**options)`` from any thread. On the Tk thread it is
+        applied right away, replacing pending values for the same options.
+        """
+        if widget is None:
+            return
+        if self._on_tk_thread():
+            with self._lock:
+                pending = self._options.get(widget)
+                for option in options:
+                    if pending:
+                        pending.pop(option, None)
+            self._apply(widget.config, (), options)
+            return
+        with self._lock:
+            pending = self._options.setdefault(widget, {})
+            self._stats["posted"] += len(options)
+            self._stats["coalesced"] += len(pending.keys() & options.keys())
+            pending.update(options)
+
+    def post(self, key, fn, *args):
+        """
+        Call ``fn(*args)`` on the Tk thread. A later post with the same ``key``
+        replaces one that has not run yet.
+        """
+        if self._on_tk_thread():
+            with self._lock:
+                self._calls.pop(key, None)
+            self._apply(fn, args)
+            return
+        with self._lock:
+            self._stats["posted"] += 1
+            if key in self._calls:
+                self._stats["coalesced"] += 1
+            self._calls[key] = (fn, args)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["pending"] = sum(len(options) for options in self._options.values()) + len(self._calls)
+        return stats
+
+    def _on_tk_thread(self):
+        return self._tk_thread == threading.get_ident()
+
+    def _drain(self):
+        with self._lock:
+            options, self._options = self._options, {}
+            calls, self._calls = self._calls, {}
+            self._stats["drains"] += 1
+        for widget, values in options.items():
+            if values:
+                self._apply(widget.config, (), values)
+        for fn, args in calls.values():
+            self._apply(fn, args)
+        if self._root is not None:
+            self._after = self._root.after(self.interval_ms, self._drain)
+
+    def _apply(self, fn, args, kwargs=None):
+        try:
+            fn(*args, **(kwargs or {}))
+        except Exception as e:
+            with self._lock:
+                self._stats["failed"] += 1
+            print("[UI] Update failed!", e)
+            return
+        with self._lock:
+            self._stats["applied"] += 1
+
+
+ui = UIUpdates()
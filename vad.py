@@ -0,0 +1,353 @@
+"""Streaming voice activity detection
+
+Splits a stream of 16 bit mono PCM into utterances using per-frame energy and
+zero-crossing rate, emitting start/partial/end events.
+The audio source is either a live microphone (PyAudio callback stream) or a
+WAV file, so phrase detection can be checked without a microphone:
+
+    python vad.py fixture.wav
+"""
+from collections import deque, namedtuple
+import argparse
+import queue
+import threading
+import time
+import wave
+
+import numpy as np
+
+from audio_buffer import AudioRingBuffer
+
+VAD_START = "start"
+VAD_PARTIAL = "partial"
+VAD_END = "end"
+
+VADEvent = namedtuple("VADEvent", ["kind", "audio", "offset"])
+
+SAMPLE_WIDTH = 2
+ZCR_THRESHOLD = 0.25
+
+
+def frame_features(samples, frame_len):
+    """
+    Return per-frame RMS energy and zero-crossing rate for an int16 sample array
+    whose length is a multiple of ``frame_len``.
+    """
+    frames = samples.reshape(-1, frame_len).astype(np.float32)
+    rms = np.sqrt(np.mean(frames * frames, axis=1))
+    zcr = np.mean(frames[:, 1:] * frames[:, :-1] < 0, axis=1)
+    return rms, zcr
+
+
+def speech_frames(rms, zcr, energy_threshold, zcr_threshold=ZCR_THRESHOLD):
+    # Quiet frames with a high crossing rate are usually unvoiced consonants
+    return (rms >= energy_threshold) | ((rms >= energy_threshold * 0.5) & (zcr >= zcr_threshold))
+
+
+class StreamingVAD():
+    def __init__(self, sample_rate, frame_ms=20, energy_threshold=300, zcr_threshold=ZCR_THRESHOLD,
+                 start_ms=60, hangover_ms=400, preroll_ms=200, partial_ms=1000, max_phrase_seconds=30,
+                 noise_floor=None):
+        """
+        With a ``noise_floor`` (see noise_floor.py) the energy threshold follows
+        its estimate instead of staying at ``energy_threshold``.
+        """
+        self.sample_rate = sample_rate
+        self.frame_len = int(sample_rate * frame_ms / 1000)
+        self.frame_bytes = self.frame_len * SAMPLE_WIDTH
+        self.frame_seconds = self.frame_len / sample_rate
+        self.energy_threshold = noise_floor.threshold if noise_floor is not None else energy_threshold
+        self.noise_floor = noise_floor
+        self.zcr_threshold = zcr_threshold
+
+        self.start_frames = max(1, round(start_ms / frame_ms))
+        self.hangover_frames = max(1, round(hangover_ms / frame_ms))
+        self.partial_frames = max(1, round(partial_ms / frame_ms)) if partial_ms else 0
+        self.max_phrase_bytes = int(max_phrase_seconds * sample_rate) * SAMPLE_WIDTH
+
+        self.buffer = AudioRingBuffer(sample_rate, SAMPLE_WIDTH, max_seconds=max_phrase_seconds + 1,
+                                      capacity_seconds=(max_phrase_seconds + 1) * 4)
+        self._preroll = deque(maxlen=max(1, round(preroll_ms / frame_ms)))
+        self._remainder = b""
+        self._frames_seen = 0
+        self._active = False
+        self._voiced = 0
+        self._silence = 0
+        self._since_partial = 0
+
+    @property
+    def active(self):
+        return self._active
+
+    def analyze(self, samples):
+        return frame_features(samples, self.frame_len)
+
+    def is_speech(self, rms, zcr):
+        return speech_frames(rms, zcr, self.energy_threshold, self.zcr_threshold)
+
+    def process(self, data):
+        """
+        Feed raw PCM bytes and return the list of VADEvents they complete.
+        """
+        if self._remainder:
+            data = self._remainder + bytes(data)
+        usable = len(data) - len(data) % self.frame_bytes
+        self._remainder = bytes(data[usable:])
+        if usable == 0:
+            return []
+
+        if self.noise_floor is not None:
+            self.energy_threshold = self.noise_floor.threshold
+        view = memoryview(data)[:usable]
+        rms, zcr = self.analyze(np.frombuffer(view, dtype="<i2"))
+        speech = self.is_speech(rms, zcr)
+
+        events = []
+        for i in range(len(speech)):
+            frame = view[i * self.frame_bytes:(i + 1) * self.frame_bytes]
+            self._frames_seen += 1
+            if not self._active:
+                self._preroll.append(bytes(frame))
+                self._voiced = self._voiced + 1 if speech[i] else 0
+                if self._voiced >= self.start_frames:
+                    self._start()
+                    events.append(VADEvent(VAD_START, None, self.offset))
+                continue
+
+            self.buffer.append(frame)
+            self._silence = 0 if speech[i] else self._silence + 1
+            self._since_partial += 1
+            if self._silence >= self.hangover_frames or len(self.buffer) >= self.max_phrase_bytes:
+                events.append(VADEvent(VAD_END, self.buffer.segment(), self.offset))
+                self._stop()
+            elif self.partial_frames and self._since_partial >= self.partial_frames:
+                self._since_partial = 0
+                events.append(VADEvent(VAD_PARTIAL, self.buffer.segment(), self.offset))
+        return events
+
+    def flush(self):
+        """
+        End the current utterance, e.g. when the stream closes mid-phrase.
+        """
+        if not self._active:
+            return []
+        event = VADEvent(VAD_END, self.buffer.segment(), self.offset)
+        self._stop()
+        return [event]
+
+    def reset(self):
+        """
+        Drop the current utterance and any buffered pre-roll without emitting events.
+        """
+        self._stop()
+        self._preroll.clear()
+        self._remainder = b""
+
+    @property
+    def offset(self):
+        """
+        Stream time in seconds of the last processed frame.
+        """
+        return self._frames_seen * self.frame_seconds
+
+    def _start(self):
+        self._active = True
+        self._silence = 0
+        self._since_partial = 0
+        self.buffer.reset()
+        for frame in self._preroll:
+            self.buffer.append(frame)
+        self._preroll.clear()
+
+    def _stop(self):
+        self._active = False
+        self._voiced = 0
+        self.buffer.reset()
+
+
+class MicrophoneStream():
+    """
+    Single PyAudio input stream delivering 16 bit mono chunks from its callback.
+    While paused, chunks are not delivered; only the last ``preroll_ms`` are
+    kept and handed out first on resume().
+    """
+
+    def __init__(self, sample_rate=16000, chunk_size=1024, device_index=None, on_chunk=None, preroll_ms=300):
+        """
+        Chunks are queued for iteration, or passed to ``on_chunk(data)`` on the
+        PyAudio thread when given.
+        """
+        self.sample_rate = sample_rate
+        self.sample_width = SAMPLE_WIDTH
+        self.chunk_size = chunk_size
+        self.device_index = device_index
+        self.on_chunk = on_chunk
+        self._queue = queue.Queue()
+        self._preroll = deque(maxlen=max(1, round(preroll_ms / 1000 * sample_rate / chunk_size)))
+        self._paused = False
+        self._lock = threading.Lock()
+        self._pa = None
+        self._stream = None
+
+    def device_name(self):
+        if self.device_index is None:
+            return self._pa.get_default_input_device_info().get('name')
+        return self._pa.get_device_info_by_index(self.device_index).get('name')
+
+    def __enter__(self):
+        # same import path speech_recognition uses, so the error message matches
+        import speech_recognition as sr
+        pyaudio = sr.Microphone.get_pyaudio()
+        self._paContinue = pyaudio.paContinue
+        self._pa = pyaudio.PyAudio()
+        self._stream = self._pa.open(
+            format=pyaudio.paInt16, channels=1, rate=self.sample_rate, input=True,
+            frames_per_buffer=self.chunk_size, input_device_index=self.device_index,
+            stream_callback=self._callback,
+        )
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self._stream is not None:
+            self._stream.stop_stream()
+            self._stream.close()
+            self._stream = None
+        if self._pa is not None:
+            self._pa.terminate()
+            self._pa = None
+        self._queue.put(None)
+
+    @property
+    def paused(self):
+        return self._paused
+
+    def pause(self):
+        """
+        Stop delivering chunks and drop the ones not consumed yet.
+        """
+        with self._lock:
+            self._paused = True
+            self._preroll.clear()
+            while True:
+                try:
+                    data = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if data is None:
+                    self._queue.put(None)
+                    break
+
+    def resume(self):
+        """
+        Deliver chunks again, starting with the pre-roll recorded while paused.
+        """
+        with self._lock:
+            if not self._paused:
+                return
+            self._paused = False
+            for data in self._preroll:
+                self._deliver(data)
+            self._preroll.clear()
+
+    def _callback(self, in_data, frame_count, time_info, status):
+        with self._lock:
+            if self._paused:
+                self._preroll.append(in_data)
+            else:
+                self._deliver(in_data)
+        return (None, self._paContinue)
+
+    def _deliver(self, data):
+        if self.on_chunk is not None:
+            self.on_chunk(data)
+        else:
+            self._queue.put(data)
+
+    def __iter__(self):
+        while True:
+            data = self._queue.get()
+            if data is None:
+                return
+            yield data
+
+
+class WavStream():
+    """
+    Drop-in replacement for MicrophoneStream that reads a 16 bit WAV file.
+    Multi-channel audio is downmixed to mono. With ``realtime`` the chunks are
+    paced like a live microphone, ``speed`` times faster than real time.
+    """
+
+    def __init__(self, path, chunk_size=1024, realtime=False, speed=1.0):
+        self.path = path
+        self.chunk_size = chunk_size
+        self.realtime = realtime
+        self.speed = speed
+        self.sample_width = SAMPLE_WIDTH
+        with wave.open(path, "rb") as wav:
+            if wav.getsampwidth() != SAMPLE_WIDTH:
+                raise ValueError(f"{path}: only 16 bit WAV files are supported")
+            self.sample_rate = wav.getframerate()
+            self.channels = wav.getnchannels()
+        self._wav = None
+
+    def device_name(self):
+        return self.path
+
+    def __enter__(self):
+        self._wav = wave.open(self.path, "rb")
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self._wav is not None:
+            self._wav.close()
+            self._wav = None
+
+    def __iter__(self):
+        chunk_seconds = self.chunk_size / self.sample_rate / self.speed
+        next_time = time.monotonic()
+        while self._wav is not None:
+            data = self._wav.readframes(self.chunk_size)
+            if not data:
+                return
+            if self.channels > 1:
+                samples = np.frombuffer(data, dtype="<i2").reshape(-1, self.channels)
+                data = samples.mean(axis=1).astype("<i2").tobytes()
+            if self.realtime:
+                next_time += chunk_seconds
+                time.sleep(max(0.0, next_time - time.monotonic()))
+            yield data
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("wav", help="16 bit WAV file to run through the detector")
+    parser.add_argument("--frame-ms", type=int, default=20, help="Analysis frame length")
+    parser.add_argument("--hangover-ms", type=int, default=400, help="Silence before an utterance ends")
+    parser.add_argument("--energy", type=float, default=300, help="RMS energy threshold")
+    parser.add_argument("--adaptive", action="store_true",
+                        help="Track the threshold with a NoiseFloor, starting from --energy")
+    args = parser.parse_args()
+
+    with WavStream(args.wav) as stream:
+        noise_floor = None
+        if args.adaptive:
+            from noise_floor import NoiseFloor
+            noise_floor = NoiseFloor(stream.sample_rate, frame_ms=args.frame_ms, default_threshold=args.energy,
+                                     path=None)
+        vad = StreamingVAD(stream.sample_rate, frame_ms=args.frame_ms, energy_threshold=args.energy,
+                           hangover_ms=args.hangover_ms, noise_floor=noise_floor)
+        for chunk in stream:
+            if noise_floor is not None:
+                noise_floor.update(chunk)
+            for event in vad.process(chunk):
+                length = len(event.audio.frame_data) / (stream.sample_rate * SAMPLE_WIDTH) if event.audio else 0
+                print(f"{event.offset:8.2f}s  {event.kind:<8} {length:.2f}s")
+        for event in vad.flush():
+            print(f"{event.offset:8.2f}s  {event.kind:<8} (stream ended)")
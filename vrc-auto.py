@@ -1,13 +1,25 @@
 import tkinter as tk
 from tkinter import ttk, scrolledtext
+import os
 import threading
-import time
-from pythonosc import udp_client
+from osc_sender import OSCSender, compile_actions
+from curves import Ramp, compile_sequences
+from pacer import Pacer
+from log_buffer import LogBuffer, LogView
+from osc_session import OSCRecorder
 
 VRCHAT_IP = "127.0.0.1"
 VRCHAT_PORT = 9000
 
-osc_client = udp_client.SimpleUDPClient(VRCHAT_IP, VRCHAT_PORT)
+# Session file that all sent OSC messages are recorded to, see osc_session.py
+OSC_RECORD = os.getenv("OSC_RECORD")
+osc_recorder = OSCRecorder(OSC_RECORD) if OSC_RECORD else None
+
+# Lines kept in the log widget, and lines buffered between two flushes
+LOG_MAX_LINES = 500
+LOG_BUFFER_LINES = 2000
+
+osc_client = OSCSender(VRCHAT_IP, VRCHAT_PORT, recorder=osc_recorder)
 
 # Each action is a list of (address, value) tuples
 ACTIONS = {
@@ -49,6 +61,7 @@ ACTIONS = {
 
 # Timed sequences: list of (duration_seconds, [(address, value), ...])
 # Each step fully specifies its input state so transitions are clean.
+# Ramp(duration, {address: value}, curve) eases axes to new values instead.
 TIMED_SEQUENCES = {
     "Large Circle": [
         # Run straight forward
@@ -64,8 +77,32 @@ TIMED_SEQUENCES = {
             ("/input/LookHorizontal", 1.0),
         ]),
     ],
+    "Smooth Circle": [
+        # Ease out of the turn into running straight forward
+        Ramp(0.2, {"/input/LookHorizontal": 0.0}, curve="ease-in-out"),
+        (0.4, [
+            ("/input/Run", 1.0),
+            ("/input/Vertical", 1.0),
+        ]),
+        # Ease into turning right
+        Ramp(0.2, {"/input/LookHorizontal": 1.0}, curve="sine"),
+        (0.2, [
+            ("/input/Run", 0.0),
+            ("/input/Vertical", 1.0),
+        ]),
+    ],
 }
 
+# Samples per second sent while a Ramp is playing
+RAMP_RATE = 60
+
+# Every step is encoded once; sending an action only replays the datagrams.
+# Bundling a step into a single datagram is off until VRChat is confirmed to
+# apply bundled inputs like separate messages.
+BUNDLE_STEPS = False
+ACTION_PACKETS = compile_actions(ACTIONS, bundle=BUNDLE_STEPS)
+SEQUENCE_PACKETS = compile_sequences(TIMED_SEQUENCES, rate=RAMP_RATE, bundle=BUNDLE_STEPS)
+
 _hold_thread = None
 _holding = False
 
@@ -119,6 +156,10 @@ class App(tk.Tk):
         self.interval_var = tk.StringVar(value="0.1")
         ttk.Entry(hold_frame, textvariable=self.interval_var, width=5).grid(row=0, column=3, padx=(4, 8))
 
+        self.hold_var.trace_add("write", self._on_hold_settings)
+        self.interval_var.trace_add("write", self._on_hold_settings)
+        self._on_hold_settings()
+
         self.hold_btn = ttk.Button(hold_frame, text="Start Hold", command=self._toggle_hold)
         self.hold_btn.grid(row=0, column=4)
 
@@ -142,21 +183,27 @@ class App(tk.Tk):
 
         self.log = scrolledtext.ScrolledText(log_frame, width=36, height=18, state="disabled", font=("Courier", 9))
         self.log.pack()
+        self.log_view = LogView(self.log, LogBuffer(capacity=LOG_BUFFER_LINES), max_lines=LOG_MAX_LINES)
+        self.log_view.start()
 
         ttk.Button(self, text="Clear Log", command=self._clear_log).grid(row=4, column=1, padx=(0, 10), pady=(0, 8), sticky="e")
 
     # ── Helpers ──────────────────────────────────────────────────────────
 
     def _log(self, msg: str):
-        self.log.config(state="normal")
-        self.log.insert("end", msg + "\n")
-        self.log.see("end")
-        self.log.config(state="disabled")
+        # safe from any thread, the widget is updated in batches by log_view
+        self.log_view.buffer.append(msg)
 
     def _clear_log(self):
-        self.log.config(state="normal")
-        self.log.delete("1.0", "end")
-        self.log.config(state="disabled")
+        self.log_view.clear()
+
+    def _on_hold_settings(self, *args):
+        # Tk variables are read here on the Tk thread, the hold loop only reads the attributes
+        self.hold_action = self.hold_var.get()
+        try:
+            self.hold_interval = float(self.interval_var.get())
+        except ValueError:
+            self.hold_interval = 0.1
 
     def _apply_connection(self):
         global osc_client
@@ -166,13 +213,17 @@ class App(tk.Tk):
         except ValueError:
             self._log("! Invalid port number")
             return
-        osc_client = udp_client.SimpleUDPClient(ip, port)
+        try:
+            # not closing the old client, the hold loop may still be sending on it
+            osc_client = OSCSender(ip, port, recorder=osc_recorder)
+        except OSError as e:
+            self._log(f"! Invalid address: {e}")
+            return
         self._log(f"→ Connected to {ip}:{port}")
 
     def _send_action(self, action: str):
-        messages = ACTIONS[action]
-        for address, value in messages:
-            osc_client.send_message(address, value)
+        osc_client.send(ACTION_PACKETS[action])
+        for address, value in ACTIONS[action]:
             self._log(f"[{action}] {address}  {value}")
 
     def _send_custom(self):
@@ -202,30 +253,35 @@ class App(tk.Tk):
 
     def _hold_loop(self):
         global _holding
-        action = self.hold_var.get()
+        action = self.hold_action
+        # absolute deadlines: send time and sleep overshoot do not accumulate
+        pacer = Pacer()
+        pacer.start()
         if action in TIMED_SEQUENCES:
-            steps = TIMED_SEQUENCES[action]
+            steps = SEQUENCE_PACKETS[action]
             step_idx = 0
             while _holding:
-                duration, messages = steps[step_idx % len(steps)]
-                for address, value in messages:
-                    osc_client.send_message(address, value)
-                    self.after(0, self._log, f"[Hold:{action}] {address}  {value}")
-                time.sleep(max(0.01, duration))
+                duration, packets, lines = steps[step_idx % len(steps)]
+                osc_client.send(packets)
+                for line in lines:
+                    self._log(f"[Hold:{action}] {line}")
+                pacer.wait(duration)
                 step_idx += 1
         else:
             while _holding:
-                action = self.hold_var.get()
-                try:
-                    interval = float(self.interval_var.get())
-                except ValueError:
-                    interval = 0.1
+                action = self.hold_action
+                interval = self.hold_interval
+                osc_client.send(ACTION_PACKETS[action])
                 for address, value in ACTIONS[action]:
-                    osc_client.send_message(address, value)
-                    self.after(0, self._log, f"[Hold:{action}] {address}  {value}")
-                time.sleep(max(0.01, interval))
+                    self._log(f"[Hold:{action}] {address}  {value}")
+                pacer.wait(max(0.01, interval))
+        stats = pacer.stats()
+        self._log(f"[Hold:{action}] {stats['count']} steps, late p50 {stats['p50'] * 1000:.2f}ms  "
+                  f"p99 {stats['p99'] * 1000:.2f}ms  max {stats['max'] * 1000:.2f}ms")
 
 
 if __name__ == "__main__":
     app = App()
     app.mainloop()
+    if osc_recorder:
+        osc_recorder.close()
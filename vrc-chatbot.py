@@ -4,16 +4,27 @@
 import os
 import time
 from dotenv import load_dotenv
-from pythonosc import osc_server, udp_client
-from pythonosc.dispatcher import Dispatcher
+from pythonosc import udp_client
 from tkinter import Tk, Label, Button, ttk, StringVar, Frame
 import speech_recognition as sr
 import threading
-import datetime
-from translator import DeepLTranslator
+from translator import DeepLTranslator, BatchTranslator
+from google_speech import GoogleRecognizer
+from http_pool import pool as http_pool
+from osc_receiver import OSCReceiver
+from osc_session import OSCRecorder, RecordingClient
+from rate_limiter import limiter
+from chatbox import ChatboxScheduler
+from gestures import GestureRecognizer, DOUBLE_TAP
+from mic_service import microphone
+from pipeline import SpeechPipeline
+from ui_updates import ui
+from metrics import (metrics, CAPTURE_START, SPEECH_END, RECOGNIZE_REQUEST, RECOGNIZE_RESPONSE,
+                     TRANSLATE_REQUEST, TRANSLATE_RESPONSE, READY, OSC_SEND)
 
 load_dotenv()
 deepl = DeepLTranslator(os.getenv('DEEPL_API'))
+batch_translator = BatchTranslator(deepl, limiter=limiter)
 
 LANGUAGES = [
     'en-US',
@@ -34,19 +45,26 @@ VRCHAT_IP = "127.0.0.1"
 VRCHAT_PORT = 9000
 LISTEN_PORT = 9001
 MIC_TIMEOUT = 6
+# audio from before the mute toggle that is kept for push-to-talk
+PUSH_TO_TALK_PREROLL = 0.5
+METRICS_JSON = "metrics.json"
+METRICS_PROM = "metrics.prom"
+# Session file that all OSC traffic is recorded to, see osc_session.py
+OSC_RECORD = os.getenv('OSC_RECORD')
+osc_recorder = OSCRecorder(OSC_RECORD) if OSC_RECORD else None
 osc_client = udp_client.SimpleUDPClient(VRCHAT_IP, VRCHAT_PORT)
+if osc_recorder:
+    osc_client = RecordingClient(osc_client, osc_recorder)
+chatbox = ChatboxScheduler(osc_client, limiter=limiter)
 
-dispatcher = Dispatcher()
 server = None
 
-recognizer = sr.Recognizer()
-last_request_time = datetime.datetime.now() - datetime.timedelta(seconds=5)
-received_mute = False
+google = GoogleRecognizer()
 input_lang = 'en-US'
 target_lang = 'en-US'
 is_recording = False
 continuous_mode = False
-continuous_thread = None
+continuous_pipeline = None
 continuous_running = False
 
 # GUI variables
@@ -60,27 +78,23 @@ continuous_checkbox = None
 output_label = None
 
 
-def check_limit():
-    global last_request_time
-
-    now = datetime.datetime.now()
-    diff_in_sec = (now - last_request_time).total_seconds()
-    if diff_in_sec < 5:
-        return False
-
-    last_request_time = datetime.datetime.now()
-    return True
-
-
-def transcribe_audio(language_code, use_timeout=True):
+def transcribe_audio(language_code, use_timeout=True, trace=None, pressed_at=None):
+    trace = trace or metrics.trace()
     try:
         print("Listening for audio input...")
-        with sr.Microphone() as source:
-            if use_timeout:
-                audio = recognizer.listen(source, timeout=MIC_TIMEOUT)
-            else:
-                audio = recognizer.listen(source, timeout=MIC_TIMEOUT, phrase_time_limit=None)
-        text = recognizer.recognize_google(audio, language=language_code)
+        trace.mark(CAPTURE_START)
+        # the shared stream is already open, so the phrase starts with audio from before the press,
+        # even when the gesture was only recognized a moment later
+        preroll = PUSH_TO_TALK_PREROLL
+        if pressed_at is not None:
+            preroll += max(0.0, time.monotonic() - pressed_at)
+        if use_timeout:
+            audio = microphone.listen(timeout=MIC_TIMEOUT, preroll_seconds=preroll)
+        else:
+            audio = microphone.listen(timeout=MIC_TIMEOUT, phrase_time_limit=None, preroll_seconds=preroll)
+        trace.mark(SPEECH_END)
+        with trace.span(RECOGNIZE_REQUEST, RECOGNIZE_RESPONSE):
+            text = google.recognize(audio, language=language_code)
         return text
     except sr.WaitTimeoutError:
         print("No speech detected within the timeout period.")
@@ -93,152 +107,133 @@ def transcribe_audio(language_code, use_timeout=True):
         return None
 
 
-def continuous_translation_loop():
-    global continuous_running
-    
-    print("Starting continuous translation loop...")
-    
-    with sr.Microphone() as source:
-        recognizer.adjust_for_ambient_noise(source, duration=1)
-        
-        while continuous_running:
-            try:
-                update_status("Listening (Continuous)...")
-                print("Continuous mode: Listening for speech...")
-                
-                # Listen for speech with automatic phrase detection
-                audio = recognizer.listen(source, timeout=2, phrase_time_limit=30)
-                
-                update_status("Processing...")
-                print("Continuous mode: Speech detected, processing...")
-                
-                # Transcribe the audio
-                text = recognizer.recognize_google(audio, language=input_lang)
-                
-                if text:
-                    print(f"Continuous mode: Transcribed: {text}")
-                    send_translation(text, input_lang, target_lang)
-                
-                # Small delay before next listen
-                time.sleep(0.5)
-                
-            except sr.WaitTimeoutError:
-                # No speech detected, continue listening
-                continue
-            except sr.UnknownValueError:
-                print("Continuous mode: Could not understand audio")
-                continue
-            except Exception as e:
-                print(f"Continuous mode error: {e}")
-                time.sleep(1)
-        
-    print("Continuous translation loop ended.")
-    update_status("Ready")
+def create_continuous_pipeline():
+    """
+    Capture keeps running while earlier phrases are recognized and translated,
+    results still reach the chatbox in speaking order.
+    """
+    return SpeechPipeline(
+        microphone.subscribe,
+        lambda audio: google.recognize(audio, language=input_lang),
+        chatbox, batch_translator, from_lang=input_lang, to_lang=target_lang, limiter=limiter,
+        vad_options={"hangover_ms": 600, "partial_ms": 0},
+        format_output=lambda text, translation: f'{translation} ({text})',
+        on_output=update_output,
+        dedupe=False,
+        send_untranslated=False,
+    )
+
+
+def sync_continuous_languages():
+    if continuous_pipeline is not None:
+        continuous_pipeline.from_lang = input_lang
+        continuous_pipeline.to_lang = target_lang
+
 
 def start_continuous_mode():
-    global continuous_running, continuous_thread
+    global continuous_running, continuous_pipeline
     
     if continuous_running:
         return
     
     continuous_running = True
-    if record_button:
-        record_button.config(state="disabled")
-    continuous_thread = threading.Thread(target=continuous_translation_loop, daemon=True)
-    continuous_thread.start()
-    update_status("Continuous Mode Active")
+    ui.config(record_button, state="disabled")
+    if continuous_pipeline is None:
+        continuous_pipeline = create_continuous_pipeline()
+        continuous_pipeline.start(daemon=True)
+    else:
+        sync_continuous_languages()
+        continuous_pipeline.set_active(True)
+    update_status("Listening (Continuous)...")
 
 
 def stop_continuous_mode():
     global continuous_running
     
     continuous_running = False
-    if record_button:
-        record_button.config(state="normal")
+    if continuous_pipeline is not None:
+        continuous_pipeline.set_active(False)
+    ui.config(record_button, state="normal")
     update_status("Ready")
 
 
-def translate_text(text, input_language, target_language):
-    if not check_limit():
-        return "Testing limit reached. Contact the developer for more access."
+def translate_text(text, input_language, target_language, trace=None):
+    trace = trace or metrics.trace()
     try:
-        return deepl.translate(input_language, target_language, text)
+        # Waits for the next free translation slot instead of rejecting the request
+        with trace.span(TRANSLATE_REQUEST, TRANSLATE_RESPONSE):
+            return batch_translator.translate(input_language, target_language, text)
     except Exception as e:
         print(f"Error during translation: {e}")
         return None
 
 
-def send_to_chatbox(output_text):
+def send_to_chatbox(output_text, trace=None):
     try:
         if not output_text:
             return
-        osc_client.send_message("/chatbox/input", [output_text, True])
-        print(f"Sent to Chatbox: {output_text}")
+        on_sent = None
+        if trace is not None:
+            trace.mark(READY)
+            on_sent = lambda: trace.mark(OSC_SEND)
+        chatbox.send(output_text, on_sent=on_sent)
+        print(f"Queued for Chatbox: {output_text}")
     except Exception as e:
         print(f"Error sending to Chatbox: {e}")
 
 
-def start_translation(input_language, target_language):
+def start_translation(input_language, target_language, pressed_at=None):
     global is_recording
     
-    osc_client.send_message("/chatbox/typing", True)
+    chatbox.set_typing(True)
     update_status("Recording...")
-    input_text = transcribe_audio(input_language)
+    trace = metrics.trace()
+    input_text = transcribe_audio(input_language, trace=trace, pressed_at=pressed_at)
 
     if not input_text:
-        osc_client.send_message("/chatbox/typing", False)
+        chatbox.set_typing(False)
         is_recording = False
         update_status("Ready")
-        if record_button:
-            record_button.config(text="Start Recording", bg="green")
+        ui.config(record_button, text="Start Recording", bg="green")
         return
 
-    send_translation(input_text, input_language, target_language)
+    send_translation(input_text, input_language, target_language, trace)
 
 
-def send_translation(input_text, input_language, target_language):
+def send_translation(input_text, input_language, target_language, trace=None):
     global is_recording
     
     if input_language == target_language:
         output_text = f'{input_text}'
-        send_to_chatbox(output_text)
+        send_to_chatbox(output_text, trace)
     else:
-        translated_text = translate_text(input_text, input_language, target_language)
+        translated_text = translate_text(input_text, input_language, target_language, trace)
         if translated_text:
             output_text = f'{translated_text} ({input_text})'
-            send_to_chatbox(output_text)
+            send_to_chatbox(output_text, trace)
         else:
             print("Translation failed.")
             output_text = "Translation failed"
 
-    osc_client.send_message("/chatbox/typing", False)
+    chatbox.set_typing(False)
     is_recording = False
     update_status("Ready")
     update_output(output_text)
     
     # Update button state if in recording mode
-    if record_button:
-        record_button.config(text="Start Recording", bg="green")
+    ui.config(record_button, text="Start Recording", bg="green")
+
 
+def push_to_talk(gesture, at):
+    start_translation(input_lang, target_lang, pressed_at=at)
 
-def reset_mute():
-    global received_mute
 
-    time.sleep(TOGGLE_THRESHOLD)
-    received_mute = False
-    print("Resetting mute state.")
+gestures = GestureRecognizer({DOUBLE_TAP: push_to_talk}, tap_seconds=TOGGLE_THRESHOLD)
 
 
 def handle_mute(url, is_mute):
-    global received_mute
     print(f"Received {url}: {is_mute}")
-
-    if not is_mute and not received_mute:
-        received_mute = True
-        threading.Thread(target=reset_mute).start()
-    elif is_mute and received_mute:
-        received_mute = False
-        threading.Thread(target=start_translation, args=(input_lang, target_lang)).start()
+    gestures.toggle(is_mute)
 
 
 def set_input_language(value):
@@ -251,12 +246,13 @@ def set_input_language(value):
 
     input_lang = lang
     target_lang = lang
+    sync_continuous_languages()
     
     # Update GUI
     if input_lang_var:
-        input_lang_var.set(LANGUAGE_TEXT[value])
+        ui.post("input_lang_var", input_lang_var.set, LANGUAGE_TEXT[value])
     if target_lang_var:
-        target_lang_var.set(LANGUAGE_TEXT[value])
+        ui.post("target_lang_var", target_lang_var.set, LANGUAGE_TEXT[value])
     
     send_to_chatbox(f'[CHAT] {LANGUAGE_TEXT[value]}')
 
@@ -270,10 +266,11 @@ def set_translate_language(value):
     print(f"Setting translate language to {lang} with input {input_lang}")
 
     target_lang = lang
+    sync_continuous_languages()
     
     # Update GUI
     if target_lang_var:
-        target_lang_var.set(LANGUAGE_TEXT[value])
+        ui.post("target_lang_var", target_lang_var.set, LANGUAGE_TEXT[value])
     
     send_to_chatbox(f'[CHAT] {LANGUAGE_TEXT[LANGUAGES.index(input_lang)]} -> {lang}')
 
@@ -285,6 +282,7 @@ def on_input_lang_change(*args):
         index = LANGUAGE_TEXT.index(selected)
         input_lang = LANGUAGES[index]
         target_lang = LANGUAGES[index]
+        sync_continuous_languages()
         print(f"Input language changed to: {input_lang}")
         # Update the target language dropdown to match
         if target_lang_var:
@@ -297,6 +295,7 @@ def on_target_lang_change(*args):
     if selected in LANGUAGE_TEXT:
         index = LANGUAGE_TEXT.index(selected)
         target_lang = LANGUAGES[index]
+        sync_continuous_languages()
         print(f"Target language changed to: {target_lang}")
 
 
@@ -318,27 +317,24 @@ def toggle_recording():
     
     if is_recording:
         is_recording = False
-        record_button.config(text="Start Recording", bg="green")
+        ui.config(record_button, text="Start Recording", bg="green")
         update_status("Ready")
     else:
         is_recording = True
-        record_button.config(text="Stop Recording", bg="red")
+        ui.config(record_button, text="Stop Recording", bg="red")
         threading.Thread(target=start_translation, args=(input_lang, target_lang)).start()
 
 
 def update_status(text):
-    if status_label:
-        status_label.config(text=f"Status: {text}")
+    # safe from any thread, applied by the Tk mainloop
+    ui.config(status_label, text=f"Status: {text}")
 
 
 def update_output(text):
-    if output_label:
-        output_label.config(text=text)
+    ui.config(output_label, text=text)
 
 
 def start_osc_server():
-    global server
-    server = osc_server.ThreadingOSCUDPServer((VRCHAT_IP, LISTEN_PORT), dispatcher)
     print(f"OSC Server serving on {server.server_address}")
     server.serve_forever()
 
@@ -347,8 +343,19 @@ def on_closing():
     global server, continuous_running
     print("Shutting down...")
     continuous_running = False
+    metrics.print_summary()
+    metrics.export(METRICS_JSON, METRICS_PROM)
+    print("[HttpPool]", http_pool.stats())
+    print("[Gestures]", gestures.stats())
+    print("[UI]", ui.stats())
+    microphone.close()
     if server:
+        print("[OSC]", server.stats())
         server.shutdown()
+    if osc_recorder:
+        print("[OSCRecorder]", osc_recorder.stats())
+        osc_recorder.close()
+    ui.close()
     root.destroy()
 
 
@@ -456,17 +463,29 @@ def create_gui():
     )
     info_label.pack(side="bottom", pady=5)
     
+    # Worker threads post widget updates, the mainloop applies them
+    ui.attach(root)
+    
     return root
 
 
 def main():
-    global dispatcher
+    global server
     
-    # Set up OSC dispatcher
-    dispatcher.map("/avatar/parameters/MuteSelf", handle_mute)
-    dispatcher.map("/avatar/parameters/Language", lambda url, value: set_input_language(value-1))
-    dispatcher.map("/avatar/parameters/Translate", lambda url, value: set_translate_language(value-1))
+    # Set up OSC receiver, every other avatar parameter is dropped unparsed
+    server = OSCReceiver((VRCHAT_IP, LISTEN_PORT), recorder=osc_recorder)
+    server.map("/avatar/parameters/MuteSelf", handle_mute)
+    server.map("/avatar/parameters/Language", lambda url, value: set_input_language(value-1))
+    server.map("/avatar/parameters/Translate", lambda url, value: set_translate_language(value-1))
     
+    metrics.start_export(METRICS_JSON, METRICS_PROM)
+
+    # Open the microphone once up front instead of on every push-to-talk press
+    try:
+        microphone.start()
+    except Exception as e:
+        print(f"Could not open the microphone: {e}")
+
     # Start OSC server in a separate thread
     osc_thread = threading.Thread(target=start_osc_server, daemon=True)
     osc_thread.start()